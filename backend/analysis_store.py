@@ -0,0 +1,277 @@
+"""
+Scoring a stored resume and persisting the Analysis with its Skill rows.
+
+Shared by the synchronous /analyze endpoint and the background analysis job,
+so both produce identical records and responses. Results are memoized by
+(resume, role, level, ENGINE_VERSION): a repeat request returns the stored
+analysis instead of scoring again and inserting a duplicate, and a change to
+the requirement tables or scoring code changes ENGINE_VERSION, which leaves
+older results unused. An in-process LRU sits in front of the analyses table.
+
+An analysis and its skills are written in one transaction, the skills as a
+single executemany INSERT.
+
+With SKILL_WRITE_BEHIND=1 the skill rows are instead handed to a background
+writer that combines the rows of many concurrent analyses into one INSERT,
+trading a short delay (SKILL_FLUSH_INTERVAL_MS) before skills are visible for
+fewer statements and commits under load.
+"""
+import json
+import os
+import threading
+
+from sqlalchemy import insert
+from sqlalchemy.exc import OperationalError
+
+from analytics_engine import analyze_resume, ENGINE_VERSION, ROLE_REQUIREMENTS
+from cache import LRUCache
+from database import SessionLocal
+from job_queue import PermanentJobError
+from metrics import current_endpoint, score_seconds
+from models import Analysis, Resume, Skill
+from resume_features import resume_extracted_data
+from skill_bitmask import apply_skill_mask
+
+ANALYSIS_JOB = "analysis"
+
+SKILL_WRITE_BEHIND = os.getenv("SKILL_WRITE_BEHIND", "0") == "1"
+SKILL_BATCH_SIZE = int(os.getenv("SKILL_BATCH_SIZE", "500"))
+SKILL_FLUSH_INTERVAL_MS = float(os.getenv("SKILL_FLUSH_INTERVAL_MS", "50"))
+SKILL_WRITE_ATTEMPTS = int(os.getenv("SKILL_WRITE_ATTEMPTS", "5"))
+ANALYSIS_MEMO_SIZE = int(os.getenv("ANALYSIS_MEMO_SIZE", "1024"))
+
+_analysis_memo = LRUCache(maxsize=ANALYSIS_MEMO_SIZE)
+
+class SkillWriteBatcher:
+    """
+    Write-behind buffer for Skill rows, flushed by a background thread every
+    interval seconds or as soon as batch_size rows are waiting.
+
+    Rows that fail with an OperationalError (database locked, connection lost)
+    are retried on later flushes, up to attempts times; any other error, or
+    running out of attempts, drops them with a logged error.
+    """
+
+    def __init__(self, session_factory=SessionLocal, batch_size=SKILL_BATCH_SIZE,
+                 interval=SKILL_FLUSH_INTERVAL_MS / 1000, attempts=SKILL_WRITE_ATTEMPTS):
+        self.session_factory = session_factory
+        self.batch_size = batch_size
+        self.interval = interval
+        self.attempts = attempts
+        # (row, failed attempts) pairs
+        self._rows = []
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._wakeup = threading.Event()
+        self._stop = threading.Event()
+        self._thread = None
+
+    def add(self, rows):
+        if not rows:
+            return
+        with self._lock:
+            self._rows.extend((row, 0) for row in rows)
+            full = len(self._rows) >= self.batch_size
+            if self._thread is None:
+                self._stop.clear()
+                self._thread = threading.Thread(target=self._run, name="skill-writer", daemon=True)
+                self._thread.start()
+        if full:
+            self._wakeup.set()
+
+    def has_pending(self, analysis_id):
+        with self._lock:
+            return any(row["analysis_id"] == analysis_id for row, _ in self._rows)
+
+    def flush(self):
+        """Insert every buffered row in one statement and commit; rows failing transiently stay buffered."""
+        with self._flush_lock:
+            with self._lock:
+                pending, self._rows = self._rows, []
+            if not pending:
+                return
+            db = self.session_factory()
+            try:
+                db.execute(insert(Skill), [row for row, _ in pending])
+                db.commit()
+            except Exception as e:
+                db.rollback()
+                transient = isinstance(e, OperationalError)
+                retry, dropped = [], set()
+                for row, failures in pending:
+                    if transient and failures + 1 < self.attempts:
+                        retry.append((row, failures + 1))
+                    else:
+                        dropped.add(row["analysis_id"])
+                print(f"Warning: Could not write {len(pending)} skill rows: {str(e)}")
+                if dropped:
+                    print(f"Error: Dropped {len(pending) - len(retry)} skill rows of analyses {sorted(dropped)}")
+                with self._lock:
+                    self._rows[:0] = retry
+            finally:
+                db.close()
+
+    def _run(self):
+        while not self._stop.is_set():
+            self._wakeup.wait(self.interval)
+            self._wakeup.clear()
+            self.flush()
+
+    def stop(self):
+        """Stop the writer thread and flush what is left."""
+        with self._lock:
+            thread, self._thread = self._thread, None
+        if thread is not None:
+            self._stop.set()
+            self._wakeup.set()
+            thread.join()
+        self.flush()
+
+skill_writer = SkillWriteBatcher()
+
+def _memo_key(resume_id, role, level):
+    return (resume_id, role, level, ENGINE_VERSION)
+
+def stored_analysis_result(db, resume, role, level):
+    """
+    Latest result for resume/role/level under the current ENGINE_VERSION,
+    from the in-process LRU or else the analyses table, or None.
+    """
+    key = _memo_key(resume.id, role, level)
+    result = _analysis_memo.get(key)
+    if result is not None:
+        return result
+
+    analysis = db.query(Analysis).filter(
+        Analysis.resume_id == resume.id,
+        Analysis.role == role,
+        Analysis.level == level,
+        Analysis.engine_version == ENGINE_VERSION
+    ).order_by(Analysis.created_at.desc()).first()
+    if not analysis:
+        return None
+
+    if skill_writer.has_pending(analysis.id):
+        skill_writer.flush()
+    skills = db.query(Skill.skill_name, Skill.category).filter(Skill.analysis_id == analysis.id).all()
+    result = {
+        "analysis_id": analysis.id,
+        "overall_score": analysis.overall_score,
+        "skill_match_score": analysis.skill_match_score,
+        "ats_score": analysis.ats_score,
+        "found_required_skills": [name for name, category in skills if category == "required"],
+        "found_preferred_skills": [name for name, category in skills if category == "preferred"],
+        "missing_skills": json.loads(analysis.missing_skills or "[]"),
+        "word_count": resume_extracted_data(resume)["word_count"],
+        "all_extracted_skills": json.loads(analysis.extracted_skills or "{}"),
+        "timestamp": analysis.created_at
+    }
+    _analysis_memo.set(key, result)
+    return result
+
+def _role_label(role):
+    """Metric label for a role; unknown roles share one series."""
+    return role if role in ROLE_REQUIREMENTS else "other"
+
+def analysis_result(db, resume, role, level):
+    """
+    analyze_resume output for resume/role/level, scored only when no result is
+    stored. A fresh result is memoized in process but not written to the
+    database, so read-only callers such as /compare add nothing to history.
+    """
+    result = stored_analysis_result(db, resume, role, level)
+    if result is None:
+        with score_seconds.time(current_endpoint.get(), _role_label(role)):
+            analysis_results = analyze_resume(resume_extracted_data(resume), role=role, level=level)
+        result = {
+            **analysis_results,
+            "analysis_id": None,
+            "timestamp": None
+        }
+        _analysis_memo.set(_memo_key(resume.id, role, level), result)
+    return result
+
+def _persist_analysis(db, resume, role, level, analysis_results):
+    analysis_record = Analysis(
+        resume_id=resume.id,
+        overall_score=analysis_results["overall_score"],
+        skill_match_score=analysis_results["skill_match_score"],
+        ats_score=analysis_results["ats_score"],
+        role=role,
+        level=level,
+        extracted_skills=json.dumps(analysis_results["all_extracted_skills"]),
+        missing_skills=json.dumps(analysis_results["missing_skills"]),
+        ats_issues=json.dumps({"status": "checked"}),
+        engine_version=ENGINE_VERSION
+    )
+    apply_skill_mask(analysis_record, analysis_results["all_extracted_skills"])
+    db.add(analysis_record)
+    # The flush assigns the ID (INSERT ... RETURNING on PostgreSQL) and the
+    # created_at default without ending the transaction
+    db.flush()
+    analysis_id = analysis_record.id
+    timestamp = analysis_record.created_at
+
+    skill_rows = [
+        {"analysis_id": analysis_id, "skill_name": skill_name, "category": category, "proficiency": "found"}
+        for category, skill_names in (
+            ("required", analysis_results["found_required_skills"]),
+            ("preferred", analysis_results["found_preferred_skills"])
+        )
+        for skill_name in skill_names
+    ]
+    if SKILL_WRITE_BEHIND:
+        db.commit()
+        skill_writer.add(skill_rows)
+    else:
+        if skill_rows:
+            db.execute(insert(Skill), skill_rows)
+        db.commit()
+
+    return {**analysis_results, "analysis_id": analysis_id, "timestamp": timestamp}
+
+def store_analysis(db, resume, role, level):
+    """
+    Return the stored analysis of resume for role/level as the API response,
+    analyzing it and committing the Analysis and Skill rows only on a miss.
+    """
+    result = stored_analysis_result(db, resume, role, level)
+    if result is None or result["analysis_id"] is None:
+        analysis_results = result
+        if analysis_results is None:
+            with score_seconds.time(current_endpoint.get(), _role_label(role)):
+                analysis_results = analyze_resume(resume_extracted_data(resume), role=role, level=level)
+        result = _persist_analysis(db, resume, role, level, analysis_results)
+        _analysis_memo.set(_memo_key(resume.id, role, level), result)
+
+    return {
+        "analysis_id": result["analysis_id"],
+        "resume_id": resume.id,
+        "overall_score": round(result["overall_score"], 2),
+        "skill_match_score": round(result["skill_match_score"], 2),
+        "ats_score": round(result["ats_score"], 2),
+        "found_required_skills": result["found_required_skills"],
+        "found_preferred_skills": result["found_preferred_skills"],
+        "missing_skills": result["missing_skills"],
+        "word_count": result["word_count"],
+        "role": role,
+        "level": level,
+        "timestamp": result["timestamp"].isoformat()
+    }
+
+def run_analysis_job(payload):
+    """Job handler for POST /analyze?async=1."""
+    db = SessionLocal()
+    try:
+        resume = db.query(Resume).filter(
+            Resume.id == payload["resume_id"],
+            Resume.user_id == payload["user_id"]
+        ).first()
+        if not resume:
+            raise PermanentJobError("Resume not found")
+        return store_analysis(db, resume, payload["role"], payload["level"])
+    except Exception:
+        db.rollback()
+        raise
+    finally:
+        db.close()
@@ -1,7 +1,13 @@
 from sklearn.feature_extraction.text import TfidfVectorizer
 from sklearn.metrics.pairwise import cosine_similarity
+import numpy as np
+import hashlib
+import inspect
+import json
 import re
 
+from resume_parser import SKILL_DICTIONARY, PARSER_VERSION
+
 ROLE_REQUIREMENTS = {
     "data_analyst": {
         "fresher": {
@@ -528,29 +534,41 @@ def calculate_overall_score(skill_match_score, ats_score, word_count, role, leve
     
     return min(100, max(0, overall))
 
-def calculate_ats_score(text, filename):
+ATS_SECTIONS = ["education", "experience", "skills"]
+ATS_BAD_PATTERNS = ["photograph", "image", "fancy"]
+
+def extract_ats_features(text):
+    """Reduce resume text to the few facts the ATS score depends on, so they can be stored."""
     text_lower = text.lower()
+    return {
+        "sections_found": [section for section in ATS_SECTIONS if section in text_lower],
+        "bad_pattern_count": sum(1 for pattern in ATS_BAD_PATTERNS if pattern in text_lower),
+        "char_count": len(text),
+        "has_at_sign": "@" in text,
+        "has_digit": any(char.isdigit() for char in text)
+    }
+
+def ats_score_from_features(features, filename):
     score = 50
     
     if not filename.endswith((".pdf", ".docx")):
         score -= 30
     
-    required_sections = ["education", "experience", "skills"]
-    sections_found = sum(1 for section in required_sections if section in text_lower)
-    score += (sections_found / 3) * 30
+    score += (len(features["sections_found"]) / len(ATS_SECTIONS)) * 30
     
-    bad_patterns = ["photograph", "image", "fancy"]
-    found_bad = sum(1 for pattern in bad_patterns if pattern in text_lower)
-    score -= found_bad * 5
+    score -= features["bad_pattern_count"] * 5
     
-    if len(text) < 200:
+    if features["char_count"] < 200:
         score -= 20
     
-    if "@" not in text or not any(char.isdigit() for char in text):
+    if not features["has_at_sign"] or not features["has_digit"]:
         score -= 10
     
     return min(100, max(0, score))
 
+def calculate_ats_score(text, filename):
+    return ats_score_from_features(extract_ats_features(text), filename)
+
 def get_missing_skills(extracted_skills, role, level="intermediate"):
     if role not in ROLE_REQUIREMENTS or level not in ROLE_REQUIREMENTS[role]:
         role = "data_analyst"
@@ -569,11 +587,12 @@ def get_missing_skills(extracted_skills, role, level="intermediate"):
 
 def analyze_resume(extracted_data, role="data_analyst", level="intermediate"):
     skills = extracted_data["skills"]
-    text = extracted_data["raw_text"]
     word_count = extracted_data["word_count"]
+    # Features stored at upload time avoid rescanning the full text
+    ats_features = extracted_data.get("ats_features") or extract_ats_features(extracted_data["raw_text"])
     
     skill_match_score, found_required, found_preferred = calculate_skill_match(skills, role, level)
-    ats_score = calculate_ats_score(text, "resume.pdf")
+    ats_score = ats_score_from_features(ats_features, "resume.pdf")
     overall_score = calculate_overall_score(skill_match_score, ats_score, word_count, role, level)
     
     missing_skills = get_missing_skills(skills, role, level)
@@ -588,3 +607,184 @@ def analyze_resume(extracted_data, role="data_analyst", level="intermediate"):
         "word_count": word_count,
         "all_extracted_skills": skills
     }
+
+def _engine_version():
+    # Covers the requirement tables, the skill extraction they are matched
+    # against, and the source of every function on the analyze_resume path
+    scoring_code = "".join(inspect.getsource(func) for func in (
+        calculate_skill_match, calculate_overall_score, extract_ats_features,
+        ats_score_from_features, get_missing_skills, analyze_resume
+    ))
+    fingerprint = json.dumps(
+        [ROLE_REQUIREMENTS, ATS_SECTIONS, ATS_BAD_PATTERNS, PARSER_VERSION, scoring_code],
+        sort_keys=True
+    )
+    return hashlib.sha256(fingerprint.encode()).hexdigest()[:16]
+
+# Stored analyses are reused only while this matches their engine_version
+ENGINE_VERSION = _engine_version()
+
+# Blend of exact skill overlap and TF-IDF text similarity in job description matching
+JD_SKILL_WEIGHT = 0.75
+JD_TEXT_WEIGHT = 0.25
+
+def fit_level_for(match_percentage):
+    if match_percentage >= 80:
+        return "Excellent Match"
+    elif match_percentage >= 60:
+        return "Good Match"
+    elif match_percentage >= 40:
+        return "Moderate Match"
+    return "Poor Match"
+
+def match_job_skills(resume_skills, job_desc_skills):
+    """Exact dictionary-skill overlap between a resume and a job description."""
+    resume_tech = set(resume_skills.get("technical", []))
+    job_tech = set(job_desc_skills.get("technical", []))
+    
+    resume_business = set(resume_skills.get("business", []))
+    job_business = set(job_desc_skills.get("business", []))
+    
+    tech_match = len(resume_tech & job_tech)
+    tech_required = len(job_tech)
+    business_match = len(resume_business & job_business)
+    business_required = len(job_business)
+    
+    total_job_skills = tech_required + business_required
+    matched_skills = tech_match + business_match
+    
+    match_percentage = (matched_skills / total_job_skills * 100) if total_job_skills > 0 else 0
+    
+    return {
+        "match_percentage": match_percentage,
+        "fit_level": fit_level_for(match_percentage),
+        "technical_skills": {
+            "matched": list(resume_tech & job_tech),
+            "missing": list(job_tech - resume_tech),
+            "match_count": tech_match,
+            "required_count": tech_required
+        },
+        "business_skills": {
+            "matched": list(resume_business & job_business),
+            "missing": list(job_business - resume_business),
+            "match_count": business_match,
+            "required_count": business_required
+        }
+    }
+
+def combined_job_match(match_percentage, text_similarity):
+    return match_percentage * JD_SKILL_WEIGHT + text_similarity * JD_TEXT_WEIGHT
+
+class RoleScoringMatrix:
+    """
+    ROLE_REQUIREMENTS compiled into skills x (role, level) matrices.
+
+    Scores a batch of resumes against every role and level with a couple of
+    matrix products. The arithmetic mirrors calculate_skill_match and
+    calculate_overall_score step for step, so results are bit-identical.
+    """
+
+    def __init__(self, role_requirements, skill_dictionary):
+        vocabulary = {skill for skills in skill_dictionary.values() for skill in skills}
+        for levels in role_requirements.values():
+            for requirements in levels.values():
+                vocabulary.update(requirements["required_skills"])
+                vocabulary.update(requirements["preferred_skills"])
+
+        self.skills = sorted(vocabulary)
+        self.skill_index = {skill: index for index, skill in enumerate(self.skills)}
+        self.keys = [(role, level) for role, levels in role_requirements.items() for level in levels]
+
+        shape = (len(self.keys), len(self.skills))
+        self.required = np.zeros(shape)
+        self.preferred = np.zeros(shape)
+        self.technical_weight = np.zeros(len(self.keys))
+        self.business_weight = np.zeros(len(self.keys))
+        self.soft_weight = np.zeros(len(self.keys))
+        self.min_words = np.zeros(len(self.keys))
+
+        for row, (role, level) in enumerate(self.keys):
+            requirements = role_requirements[role][level]
+            for skill in requirements["required_skills"]:
+                self.required[row, self.skill_index[skill]] = 1
+            for skill in requirements["preferred_skills"]:
+                self.preferred[row, self.skill_index[skill]] = 1
+            self.technical_weight[row] = requirements["technical_weight"]
+            self.business_weight[row] = requirements["business_weight"]
+            self.soft_weight[row] = requirements["soft_weight"]
+            self.min_words[row] = requirements["min_words"]
+
+        self.required_count = self.required.sum(axis=1)
+        self.preferred_count = self.preferred.sum(axis=1)
+        self.wanted = np.maximum(self.required, self.preferred)
+
+    def skill_matrix(self, skills_list):
+        """One 0/1 row per extracted-skills dict; skills outside the vocabulary are ignored."""
+        matrix = np.zeros((len(skills_list), len(self.skills)))
+        for row, extracted_skills in enumerate(skills_list):
+            for category in extracted_skills.values():
+                for skill in category:
+                    index = self.skill_index.get(skill)
+                    if index is not None:
+                        matrix[row, index] = 1
+        return matrix
+
+    def score(self, skills_list, ats_scores, word_counts):
+        """
+        Score resumes against every (role, level).
+
+        Returns (skill_match, overall, found), where skill_match and overall are
+        (resumes x keys) arrays and found is the resumes x skills 0/1 matrix.
+        """
+        found = self.skill_matrix(skills_list)
+        ats_scores = np.asarray(ats_scores, dtype=float)[:, None]
+        word_counts = np.asarray(word_counts, dtype=float)[:, None]
+
+        required_match = np.divide(found @ self.required.T, self.required_count,
+                                   out=np.zeros((len(skills_list), len(self.keys))), where=self.required_count > 0)
+        preferred_match = np.divide(found @ self.preferred.T, self.preferred_count,
+                                    out=np.zeros((len(skills_list), len(self.keys))), where=self.preferred_count > 0)
+        skill_match = np.clip((required_match * 0.7 + preferred_match * 0.3) * 100, 0, 100)
+
+        length_score = np.where(word_counts >= self.min_words, 100, (word_counts / self.min_words) * 100)
+        overall = (
+            skill_match * self.technical_weight +
+            ats_scores * self.business_weight +
+            length_score * self.soft_weight
+        )
+        overall = np.clip(overall, 0, 100)
+
+        return skill_match, overall, found
+
+    def missing_skills(self, found_row, key_index):
+        missing = self.wanted[key_index] * (1 - found_row)
+        return [self.skills[index] for index in np.flatnonzero(missing)]
+
+ROLE_SCORING_MATRIX = RoleScoringMatrix(ROLE_REQUIREMENTS, SKILL_DICTIONARY)
+
+def rank_roles(extracted_data, levels=None, limit=None):
+    """Score one resume against every role/level and return them best first."""
+    ats_features = extracted_data.get("ats_features") or extract_ats_features(extracted_data["raw_text"])
+    ats_score = ats_score_from_features(ats_features, "resume.pdf")
+    matrix = ROLE_SCORING_MATRIX
+
+    skill_match, overall, found = matrix.score([extracted_data["skills"]], [ats_score], [extracted_data["word_count"]])
+    skill_match, overall, found = skill_match[0], overall[0], found[0]
+
+    ranked = []
+    for key_index in np.argsort(-overall, kind="stable"):
+        role, level = matrix.keys[key_index]
+        if levels and level not in levels:
+            continue
+        ranked.append({
+            "role": role,
+            "level": level,
+            "overall_score": float(overall[key_index]),
+            "skill_match_score": float(skill_match[key_index]),
+            "ats_score": ats_score,
+            "missing_skills": matrix.missing_skills(found, key_index)
+        })
+        if limit and len(ranked) >= limit:
+            break
+
+    return ranked
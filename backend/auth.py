@@ -1,11 +1,20 @@
 from passlib.context import CryptContext
 from jose import JWTError, jwt
 from datetime import datetime, timedelta
-from typing import Optional
+from typing import NamedTuple, Optional
+from concurrent.futures import ThreadPoolExecutor
+import asyncio
+import hashlib
 import os
+import secrets
+import threading
 from dotenv import load_dotenv
 import re
 
+from cache import TTLCache
+from metrics import password_hash_rejected, password_hash_seconds
+from rate_limit import login_limiter
+
 load_dotenv()
 
 # Configuration
@@ -14,11 +23,39 @@ ACCESS_TOKEN_EXPIRE_MINUTES = 60
 REFRESH_TOKEN_EXPIRE_DAYS = 7
 ALGORITHM = "HS256"
 
+# Verified-token and user caches
+TOKEN_CACHE_SIZE = int(os.getenv("TOKEN_CACHE_SIZE", "4096"))
+USER_CACHE_SIZE = int(os.getenv("USER_CACHE_SIZE", "1024"))
+USER_CACHE_TTL_SECONDS = float(os.getenv("USER_CACHE_TTL_SECONDS", "300"))
+
 # Password hashing
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+BCRYPT_ROUNDS = int(os.getenv("BCRYPT_ROUNDS", "12"))
+PASSWORD_HASH_WORKERS = int(os.getenv("PASSWORD_HASH_WORKERS", "2"))
+PASSWORD_HASH_QUEUE = int(os.getenv("PASSWORD_HASH_QUEUE", "16"))
+
+# Hashes made with a different cost count as needing an update, so
+# verify_and_update rehashes them at the next successful login
+pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto", bcrypt__rounds=BCRYPT_ROUNDS)
+
+# bcrypt runs on its own threads so a login burst cannot occupy the threadpool
+# every sync endpoint shares. Running plus waiting jobs are capped, and calls
+# past the cap fail at once instead of queueing.
+_hash_executor = ThreadPoolExecutor(max_workers=PASSWORD_HASH_WORKERS, thread_name_prefix="password-hash")
+PASSWORD_HASH_SLOTS = PASSWORD_HASH_WORKERS + PASSWORD_HASH_QUEUE
+_hash_slots_in_use = 0
+_hash_slots_lock = threading.Lock()
 
-# Rate limiting (in-memory)
-login_attempts = {}
+class PasswordHasherBusy(Exception):
+    """Raised when every password hashing slot is taken."""
+
+def password_hasher_stats() -> dict:
+    return {
+        "workers": PASSWORD_HASH_WORKERS,
+        "max_pending": PASSWORD_HASH_SLOTS,
+        "in_use": _hash_slots_in_use,
+        "rejected": sum(password_hash_rejected.values().values()),
+        "bcrypt_rounds": BCRYPT_ROUNDS
+    }
 
 def hash_password(password: str) -> str:
     """Hash password using bcrypt."""
@@ -28,6 +65,48 @@ def verify_password(plain_password: str, hashed_password: str) -> bool:
     """Verify password against hash."""
     return pwd_context.verify(plain_password, hashed_password)
 
+def _timed_hasher(operation, func, *args):
+    with password_hash_seconds.time(operation):
+        return func(*args)
+
+def _take_hash_slot() -> bool:
+    global _hash_slots_in_use
+    with _hash_slots_lock:
+        if _hash_slots_in_use >= PASSWORD_HASH_SLOTS:
+            return False
+        _hash_slots_in_use += 1
+        return True
+
+def _release_hash_slot(*_):
+    global _hash_slots_in_use
+    with _hash_slots_lock:
+        _hash_slots_in_use -= 1
+
+async def _run_hasher(operation, func, *args):
+    if not _take_hash_slot():
+        password_hash_rejected.inc(operation)
+        raise PasswordHasherBusy()
+    try:
+        future = _hash_executor.submit(_timed_hasher, operation, func, *args)
+    except BaseException:
+        _release_hash_slot()
+        raise
+    # The slot is freed when bcrypt finishes, even if the request is cancelled first
+    future.add_done_callback(_release_hash_slot)
+    return await asyncio.wrap_future(future)
+
+async def hash_password_async(password: str) -> str:
+    """hash_password on the password hashing executor; raises PasswordHasherBusy when saturated."""
+    return await _run_hasher("hash", hash_password, password)
+
+async def verify_and_update_password(plain_password: str, hashed_password: str) -> tuple[bool, Optional[str]]:
+    """
+    Verify a password on the password hashing executor. Returns (valid, new_hash),
+    where new_hash is a rehash at the current BCRYPT_ROUNDS when the stored one
+    used another cost. Raises PasswordHasherBusy when saturated.
+    """
+    return await _run_hasher("verify", pwd_context.verify_and_update, plain_password, hashed_password)
+
 def validate_password_strength(password: str) -> tuple[bool, str]:
     """
     Validate password strength.
@@ -73,7 +152,8 @@ def create_refresh_token(data: dict, expires_delta: Optional[timedelta] = None)
     else:
         expire = datetime.utcnow() + timedelta(days=REFRESH_TOKEN_EXPIRE_DAYS)
     
-    to_encode.update({"exp": expire, "type": "refresh"})
+    # jti keeps two logins within the same second from issuing identical tokens
+    to_encode.update({"exp": expire, "type": "refresh", "jti": secrets.token_hex(8)})
     encoded_jwt = jwt.encode(to_encode, SECRET_KEY, algorithm=ALGORITHM)
     return encoded_jwt
 
@@ -86,34 +166,59 @@ def verify_token(token: str) -> Optional[dict]:
         print(f"Token verification error: {str(e)}")
         return None
 
-def check_rate_limit(email: str, max_attempts: int = 5, window_minutes: int = 5) -> tuple[bool, str]:
+class UserPrincipal(NamedTuple):
+    """Immutable snapshot of the User columns that request handlers read."""
+    id: int
+    email: str
+    created_at: datetime
+
+# Access tokens already verified against an existing user, keyed by digest and
+# kept until the token's own exp, so repeat requests skip the JWT decode and
+# the User lookup
+_verified_tokens = TTLCache(maxsize=TOKEN_CACHE_SIZE)
+_principals = TTLCache(maxsize=USER_CACHE_SIZE, ttl=USER_CACHE_TTL_SECONDS)
+
+def token_digest(token: str) -> str:
+    return hashlib.sha256(token.encode()).hexdigest()
+
+def cached_token_user_id(token: str) -> Optional[int]:
+    """User ID of a previously verified, unexpired access token, or None."""
+    return _verified_tokens.get(token_digest(token))
+
+def remember_verified_token(token: str, user_id: int, expires_at: float):
+    _verified_tokens.set(token_digest(token), user_id, expires_at=expires_at)
+
+def forget_token(token: str):
+    _verified_tokens.pop(token_digest(token))
+
+def cached_principal(user_id: int) -> Optional[UserPrincipal]:
+    return _principals.get(user_id)
+
+def remember_principal(user) -> UserPrincipal:
+    principal = UserPrincipal(id=user.id, email=user.email, created_at=user.created_at)
+    _principals.set(user.id, principal)
+    return principal
+
+def evict_user(user_id: int):
+    """Drop a user's principal and every cached token for them, e.g. after deleting the user."""
+    _principals.pop(user_id)
+    _verified_tokens.pop_matching(lambda cached_user_id: cached_user_id == user_id)
+
+def check_rate_limit(email: str) -> tuple[bool, str]:
     """
     Check login rate limiting.
-    Max 5 attempts per email per 5 minutes.
+    Max RATE_LIMIT_LOGIN failed attempts per email (default 5 per 5 minutes).
     """
-    now = datetime.utcnow()
-    
-    if email not in login_attempts:
-        login_attempts[email] = []
-    
-    # Remove old attempts outside the window
-    login_attempts[email] = [
-        attempt_time for attempt_time in login_attempts[email]
-        if (now - attempt_time).total_seconds() < (window_minutes * 60)
-    ]
-    
-    if len(login_attempts[email]) >= max_attempts:
-        return False, f"Too many login attempts. Try again in {window_minutes} minutes."
+    allowed, retry_after = login_limiter.check(email.lower())
+    if not allowed:
+        return False, f"Too many login attempts. Try again in {max(1, round(retry_after / 60))} minutes."
     
     return True, "OK"
 
 def record_login_attempt(email: str):
     """Record a login attempt for rate limiting."""
-    if email not in login_attempts:
-        login_attempts[email] = []
-    login_attempts[email].append(datetime.utcnow())
+    login_limiter.record(email.lower())
 
 def clear_login_attempts(email: str):
     """Clear login attempts after successful login."""
-    if email in login_attempts:
-        login_attempts[email] = []
+    login_limiter.reset(email.lower())
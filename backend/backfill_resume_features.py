@@ -0,0 +1,128 @@
+"""
+Backfill stored skill/text features and skill masks on existing rows, and
+replace raw refresh tokens with their digests
+Run this once after upgrading; it is safe to re-run
+"""
+import json
+import re
+
+from sqlalchemy import BigInteger, Boolean, Integer, LargeBinary, String, Text, func, inspect, or_, text
+from sqlalchemy.orm import undefer
+
+from auth import token_digest
+from database import engine, SessionLocal, Base
+from models import Resume, Analysis, RefreshToken
+from resume_features import compute_resume_features
+from skill_bitmask import SKILL_MASK_WORDS, apply_skill_mask
+
+MASK_COLUMNS = {f"skill_mask_{index}": BigInteger() for index in range(SKILL_MASK_WORDS)}
+FEATURE_COLUMNS = {
+    "resumes": {
+        "skills": Text(),
+        "word_count": Integer(),
+        "has_email": Boolean(),
+        "has_phone": Boolean(),
+        "ats_features": Text(),
+        **MASK_COLUMNS,
+        "text_vector": LargeBinary(),
+    },
+    "analyses": {**MASK_COLUMNS, "engine_version": String(16)},
+}
+BATCH_SIZE = 200
+TOKEN_DIGEST_PATTERN = re.compile(r"[0-9a-f]{64}")
+
+def add_missing_columns():
+    """Add feature columns and indexes to tables created before they existed."""
+    Base.metadata.create_all(bind=engine)
+    for index in [*Analysis.__table__.indexes, *RefreshToken.__table__.indexes]:
+        index.create(bind=engine, checkfirst=True)
+    inspector = inspect(engine)
+    with engine.begin() as connection:
+        for table, columns in FEATURE_COLUMNS.items():
+            existing = {column["name"] for column in inspector.get_columns(table)}
+            for name, column_type in columns.items():
+                if name not in existing:
+                    print(f"Adding column {table}.{name}")
+                    type_sql = column_type.compile(dialect=engine.dialect)
+                    connection.execute(text(f"ALTER TABLE {table} ADD COLUMN {name} {type_sql}"))
+
+def backfill():
+    """Compute features for every resume that has none, committing in batches."""
+    db = SessionLocal()
+    total = 0
+    try:
+        while True:
+            batch = (
+                db.query(Resume)
+                .options(undefer(Resume.original_text), undefer(Resume.cleaned_text))
+                .filter(or_(Resume.skills.is_(None), Resume.skill_mask_0.is_(None), Resume.text_vector.is_(None)))
+                .order_by(Resume.id)
+                .limit(BATCH_SIZE)
+                .all()
+            )
+            if not batch:
+                break
+            for resume in batch:
+                compute_resume_features(resume)
+            db.commit()
+            total += len(batch)
+            print(f"Backfilled {total} resumes...")
+    finally:
+        db.close()
+    print(f"✅ Backfill complete ({total} resumes updated)")
+
+def backfill_analysis_masks():
+    """Encode the stored extracted_skills JSON of older analyses as skill masks."""
+    db = SessionLocal()
+    total = 0
+    try:
+        while True:
+            batch = db.query(Analysis).filter(Analysis.skill_mask_0.is_(None)).order_by(Analysis.id).limit(BATCH_SIZE).all()
+            if not batch:
+                break
+            for analysis in batch:
+                apply_skill_mask(analysis, json.loads(analysis.extracted_skills or "{}"))
+            db.commit()
+            total += len(batch)
+            print(f"Backfilled masks for {total} analyses...")
+    finally:
+        db.close()
+    print(f"✅ Analysis mask backfill complete ({total} analyses updated)")
+
+def hash_refresh_tokens():
+    """
+    Replace refresh tokens stored in the clear with their SHA-256 digests,
+    which is what session_store looks them up by. The Python counterpart of
+    the UPDATE in init_tables.sql, for SQLite and deployments that skip it.
+    Values that already are 64-character hex digests are left alone.
+    """
+    db = SessionLocal()
+    total = 0
+    last_id = 0
+    try:
+        while True:
+            batch = (
+                db.query(RefreshToken)
+                .filter(RefreshToken.id > last_id, func.length(RefreshToken.token_hash) != 64)
+                .order_by(RefreshToken.id)
+                .limit(BATCH_SIZE)
+                .all()
+            )
+            if not batch:
+                break
+            for refresh_token in batch:
+                if not TOKEN_DIGEST_PATTERN.fullmatch(refresh_token.token_hash):
+                    refresh_token.token_hash = token_digest(refresh_token.token_hash)
+                    total += 1
+            last_id = batch[-1].id
+            db.commit()
+            print(f"Hashed {total} refresh tokens...")
+    finally:
+        db.close()
+    print(f"✅ Refresh token backfill complete ({total} tokens hashed)")
+
+if __name__ == "__main__":
+    add_missing_columns()
+    hash_refresh_tokens()
+    backfill()
+    backfill_analysis_masks()
@@ -0,0 +1,209 @@
+"""
+Batch resume ingest for /upload/batch.
+
+Accepts any mix of PDF/DOCX files and ZIP archives. Archive entries are read
+one at a time straight from the uploaded archive, and at most
+BATCH_PARSE_CONCURRENCY entries are read or parsing at once. Parsed files
+go through a queue of BATCH_COMMIT_SIZE entries to a writer that inserts
+and commits each chunk of BATCH_COMMIT_SIZE as soon as it fills, so memory
+stays bounded by those two settings rather than by the size of the batch.
+Resume rows are written in multi-row INSERTs. Every file gets its own
+result, so a corrupt file does not fail the rest of the batch.
+"""
+import asyncio
+import hashlib
+import itertools
+import os
+import threading
+import zipfile
+
+from starlette.concurrency import run_in_threadpool
+
+from metrics import current_endpoint, upload_bytes
+from models import Resume
+from parse_cache import get_cached_parse, store_parses
+from parse_pool import PARSE_POOL_SIZE, parse_resume_bytes_async
+from resume_features import apply_resume_features
+from text_similarity import count_documents
+from uploads import MAX_UPLOAD_BYTES, matches_signature, size_limit_message
+
+BATCH_MAX_FILES = int(os.getenv("BATCH_MAX_FILES", "500"))
+BATCH_PARSE_CONCURRENCY = int(os.getenv("BATCH_PARSE_CONCURRENCY", str(PARSE_POOL_SIZE * 2)))
+BATCH_COMMIT_SIZE = int(os.getenv("BATCH_COMMIT_SIZE", "100"))
+
+RESUME_FILE_TYPES = {".pdf": "pdf", ".docx": "docx"}
+
+def _read_limited(file_obj):
+    data = file_obj.read(MAX_UPLOAD_BYTES + 1)
+    if len(data) > MAX_UPLOAD_BYTES:
+        raise ValueError(size_limit_message(MAX_UPLOAD_BYTES))
+    return data
+
+def _read_zip_entry(archive, info):
+    # Check the declared size first, then cap the actual read against lying headers
+    if info.file_size > MAX_UPLOAD_BYTES:
+        raise ValueError(size_limit_message(MAX_UPLOAD_BYTES))
+    with archive.open(info) as entry:
+        return _read_limited(entry)
+
+def _raise(message):
+    raise ValueError(message)
+
+def _entry(filename, read):
+    file_type = RESUME_FILE_TYPES.get(os.path.splitext(filename or "")[1].lower())
+    if file_type is None:
+        return filename, None, lambda: _raise("File must be PDF or DOCX")
+    return filename, file_type, read
+
+def iter_batch_entries(files):
+    """Yield (filename, file_type, read) for every file in the request, expanding ZIP archives lazily."""
+    for upload in files:
+        if os.path.splitext(upload.filename or "")[1].lower() != ".zip":
+            yield _entry(upload.filename, lambda upload=upload: _read_limited(upload.file))
+            continue
+
+        try:
+            archive = zipfile.ZipFile(upload.file)
+        except zipfile.BadZipFile:
+            yield upload.filename, None, lambda: _raise("Not a valid ZIP archive")
+            continue
+
+        for info in archive.infolist():
+            basename = os.path.basename(info.filename)
+            if info.is_dir() or not basename or basename.startswith(".") or info.filename.startswith("__MACOSX/"):
+                continue
+            yield _entry(info.filename, lambda archive=archive, info=info: _read_zip_entry(archive, info))
+
+def count_batch_entries(files):
+    """Number of entries ingest_batch would process, up to BATCH_MAX_FILES; reads only ZIP directories."""
+    return sum(1 for _ in itertools.islice(iter_batch_entries(files), BATCH_MAX_FILES))
+
+def _read_and_hash(read):
+    data = read()
+    return data, hashlib.sha256(data).hexdigest()
+
+def _locked(lock, func, *args):
+    with lock:
+        return func(*args)
+
+async def _parse_entry(db, db_lock, result, file_type, read):
+    """
+    Read and parse one entry. Returns (result, content_hash, parsed_data,
+    is_new_parse), or None after marking result as failed.
+    """
+    try:
+        data, content_hash = await run_in_threadpool(_read_and_hash, read)
+        upload_bytes.observe(len(data), current_endpoint.get(), file_type)
+        # Reject mislabelled files before they reach a parser
+        if not matches_signature(data, file_type):
+            raise ValueError(f"File content is not a valid {file_type.upper()}")
+        # Entries look up the cache from threadpool threads; the session must only be used by one at a time
+        parsed_data = await run_in_threadpool(_locked, db_lock, get_cached_parse, db, content_hash)
+        if parsed_data is not None:
+            return result, content_hash, parsed_data, False
+
+        parsed_data = await parse_resume_bytes_async(data, file_type)
+        return result, content_hash, parsed_data, True
+    except asyncio.TimeoutError:
+        result.update({"status": "failed", "error": "Timed out while parsing"})
+    except Exception as e:
+        result.update({"status": "failed", "error": str(e)})
+    return None
+
+def _insert_chunk(db, user_id, chunk):
+    """Write one chunk of parsed files in a single transaction and fill in their results."""
+    resumes = []
+    new_parses = {}
+    try:
+        for result, content_hash, parsed_data, is_new_parse in chunk:
+            resume = Resume(
+                user_id=user_id,
+                filename=os.path.basename(result["filename"]),
+                original_text=parsed_data["raw_text"],
+                cleaned_text=parsed_data["cleaned_text"],
+                role="data_analyst",
+                level="intermediate"
+            )
+            apply_resume_features(resume, parsed_data)
+            resumes.append(resume)
+            if is_new_parse:
+                new_parses[content_hash] = parsed_data
+
+        store_parses(db, new_parses)
+        db.add_all(resumes)
+        # Flush batches the INSERTs and returns ids before commit expires the objects
+        db.flush()
+        resume_ids = [resume.id for resume in resumes]
+        text_vectors = [resume.text_vector for resume in resumes]
+        db.commit()
+    except Exception as e:
+        db.rollback()
+        for result, _, _, _ in chunk:
+            result.update({"status": "failed", "error": f"Database error: {str(e)}"})
+        return
+    count_documents(text_vectors)
+
+    for (result, _, parsed_data, _), resume_id in zip(chunk, resume_ids):
+        result.update({
+            "status": "uploaded",
+            "resume_id": resume_id,
+            "word_count": parsed_data["word_count"]
+        })
+
+async def ingest_batch(db, user_id, files):
+    """
+    Parse and store every resume in files.
+
+    Returns (results, truncated): one result dict per file in input order, and
+    whether entries beyond BATCH_MAX_FILES were left unprocessed.
+    """
+    semaphore = asyncio.Semaphore(BATCH_PARSE_CONCURRENCY)
+    # Lookups and inserts run in threadpool threads but share the request's session
+    db_lock = threading.Lock()
+    parsed_entries = asyncio.Queue(maxsize=BATCH_COMMIT_SIZE)
+    results = []
+    running = set()
+    truncated = False
+
+    async def parse(result, file_type, read):
+        try:
+            entry = await _parse_entry(db, db_lock, result, file_type, read)
+            if entry is not None:
+                # Blocks while the writer is behind, which holds the parse slot
+                await parsed_entries.put(entry)
+        finally:
+            semaphore.release()
+
+    async def write():
+        chunk = []
+        while (entry := await parsed_entries.get()) is not None:
+            chunk.append(entry)
+            if len(chunk) >= BATCH_COMMIT_SIZE:
+                await run_in_threadpool(_locked, db_lock, _insert_chunk, db, user_id, chunk)
+                chunk = []
+        if chunk:
+            await run_in_threadpool(_locked, db_lock, _insert_chunk, db, user_id, chunk)
+
+    writer = asyncio.create_task(write())
+    try:
+        for filename, file_type, read in iter_batch_entries(files):
+            if len(results) >= BATCH_MAX_FILES:
+                truncated = True
+                break
+            # Backpressure: the next entry is not read until a parse slot frees up
+            await semaphore.acquire()
+            result = {"filename": filename}
+            results.append(result)
+            task = asyncio.create_task(parse(result, file_type, read))
+            running.add(task)
+            task.add_done_callback(running.discard)
+
+        await asyncio.gather(*running)
+        await parsed_entries.put(None)
+        await writer
+    finally:
+        writer.cancel()
+        for task in running:
+            task.cancel()
+
+    return results, truncated
@@ -0,0 +1,5 @@
+"""
+Offline benchmarks for the backend. Run modules from the backend directory, e.g.
+
+    python -m benchmarks.pool_benchmark
+"""
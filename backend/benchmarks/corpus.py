@@ -0,0 +1,125 @@
+"""
+Deterministic synthetic resumes and job descriptions.
+
+Text is assembled from SKILL_DICTIONARY vocabulary and filler prose with a
+seeded random.Random, so the same (size, seed) always gives the same document
+on every machine. Documents can be written as txt, DOCX or PDF to exercise the
+real extractors.
+
+    python -m benchmarks.corpus --out /tmp/corpus
+"""
+import argparse
+import os
+import random
+
+from docx import Document
+from reportlab.lib.pagesizes import letter
+from reportlab.lib.styles import getSampleStyleSheet
+from reportlab.platypus import Paragraph, SimpleDocTemplate
+
+from resume_parser import SKILL_DICTIONARY
+
+# Approximate word counts
+SIZES = {"small": 150, "medium": 600, "large": 2500}
+FILE_TYPES = ("txt", "docx", "pdf")
+
+FIRST_NAMES = ["Alex", "Priya", "Jordan", "Wei", "Maria", "Samuel", "Aisha", "Lucas"]
+LAST_NAMES = ["Rivera", "Sharma", "Chen", "Okafor", "Novak", "Haddad", "Silva", "Kim"]
+COMPANIES = ["Northwind", "Contoso", "Globex", "Initech", "Umbrella Analytics", "Hooli"]
+TITLES = ["Data Analyst", "Software Engineer", "Data Scientist", "Backend Developer", "QA Engineer"]
+VERBS = ["Built", "Designed", "Led", "Automated", "Migrated", "Optimized", "Maintained", "Delivered"]
+FILLER = (
+    "the team delivered reliable features for customers across several regions while keeping "
+    "costs predictable and improving the quality of weekly releases through careful review"
+).split()
+
+def _skills(rng, count):
+    vocabulary = [skill for skills in SKILL_DICTIONARY.values() for skill in skills]
+    return rng.sample(vocabulary, min(count, len(vocabulary)))
+
+def _sentence(rng, skills):
+    words = [rng.choice(VERBS)] + rng.sample(FILLER, rng.randint(6, 12))
+    words.insert(rng.randint(1, len(words)), "using " + " and ".join(skills))
+    return " ".join(words) + "."
+
+def generate_resume(size="medium", seed=0):
+    """Resume text of roughly SIZES[size] words, as lines."""
+    rng = random.Random(f"resume:{size}:{seed}")
+    target = SIZES[size]
+    skills = _skills(rng, max(8, target // 25))
+    name = f"{rng.choice(FIRST_NAMES)} {rng.choice(LAST_NAMES)}"
+
+    lines = [
+        name,
+        f"{name.lower().replace(' ', '.')}@example.com | +1 555-{rng.randint(100, 999)}-{rng.randint(1000, 9999)}",
+        "Summary",
+        _sentence(rng, skills[:2]),
+        "Skills",
+        ", ".join(skills),
+        "Experience"
+    ]
+    words = sum(len(line.split()) for line in lines)
+    while words < target - 20:
+        lines.append(f"{rng.choice(TITLES)} at {rng.choice(COMPANIES)} ({rng.randint(2012, 2024)})")
+        for _ in range(rng.randint(2, 4)):
+            line = "- " + _sentence(rng, rng.sample(skills, 2))
+            lines.append(line)
+            words += len(line.split())
+    lines += ["Education", f"B.Sc. Computer Science, State University ({rng.randint(2008, 2018)})"]
+    return lines
+
+def generate_job_description(size="medium", seed=0):
+    """Job description text of roughly a quarter of SIZES[size] words."""
+    rng = random.Random(f"jd:{size}:{seed}")
+    skills = _skills(rng, max(5, SIZES[size] // 60))
+    sentences = [f"We are hiring a {rng.choice(TITLES)} at {rng.choice(COMPANIES)}."]
+    sentences.append("Required: " + ", ".join(skills[: len(skills) // 2 + 1]) + ".")
+    sentences.append("Nice to have: " + ", ".join(skills[len(skills) // 2 + 1:]) + ".")
+    while sum(len(sentence.split()) for sentence in sentences) < SIZES[size] // 4:
+        sentences.append(_sentence(rng, rng.sample(skills, 2)))
+    return " ".join(sentences)
+
+def write_resume(lines, path, file_type):
+    """Write resume lines to path as txt, docx or pdf."""
+    if file_type == "txt":
+        with open(path, "w", encoding="utf-8") as f:
+            f.write("\n".join(lines) + "\n")
+    elif file_type == "docx":
+        document = Document()
+        for line in lines:
+            document.add_paragraph(line)
+        document.save(path)
+    elif file_type == "pdf":
+        style = getSampleStyleSheet()["Normal"]
+        SimpleDocTemplate(path, pagesize=letter, invariant=1).build([Paragraph(line, style) for line in lines])
+    else:
+        raise ValueError(f"Unsupported file type: {file_type}")
+
+def write_corpus(directory, sizes=SIZES, seeds=1):
+    """Write every size in every format (plus job descriptions) to directory; returns the paths."""
+    os.makedirs(directory, exist_ok=True)
+    paths = []
+    for size in sizes:
+        for seed in range(seeds):
+            lines = generate_resume(size, seed)
+            for file_type in FILE_TYPES:
+                path = os.path.join(directory, f"resume_{size}_{seed}.{file_type}")
+                write_resume(lines, path, file_type)
+                paths.append(path)
+            path = os.path.join(directory, f"jd_{size}_{seed}.txt")
+            with open(path, "w", encoding="utf-8") as f:
+                f.write(generate_job_description(size, seed) + "\n")
+            paths.append(path)
+    return paths
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--out", required=True, help="directory to write the corpus to")
+    parser.add_argument("--seeds", type=int, default=1, help="documents per size")
+    args = parser.parse_args()
+
+    for path in write_corpus(args.out, seeds=args.seeds):
+        print(path)
+
+if __name__ == "__main__":
+    main()
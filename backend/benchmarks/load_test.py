@@ -0,0 +1,266 @@
+"""
+In-process load test of the API against a throwaway SQLite database.
+
+Drives the real FastAPI app through httpx's ASGI transport, or with --uvicorn
+through a uvicorn server on 127.0.0.1, so it needs no network. Each virtual
+user registers, logs in, uploads two synthetic PDF resumes and then runs
+--iterations rounds of analyze, history, report, compare and
+match-job-description; --concurrency users are active at a time.
+
+Reports throughput and p50/p95/p99 latency per endpoint, and the number of
+database statements each request executed (background workers excluded).
+Rate limits are lifted for the run; bcrypt uses BCRYPT_ROUNDS unless
+--bcrypt-rounds is given.
+
+    python -m benchmarks.load_test --users 50 --concurrency 10
+"""
+import argparse
+import asyncio
+import contextvars
+import itertools
+import json
+import os
+import random
+import sys
+import tempfile
+import time
+from collections import defaultdict
+
+import httpx
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from benchmarks.corpus import generate_job_description, generate_resume, write_resume
+
+ROLES = ["data_analyst", "data_scientist", "data_engineer", "backend_developer", "ml_engineer"]
+LEVELS = ["fresher", "intermediate", "senior"]
+PASSWORD = "LoadTest123"
+RESUME_VARIANTS = [("small", seed) for seed in range(4)] + [("medium", seed) for seed in range(4)]
+UNLIMITED = "1000000000/60"
+
+_request_queries = contextvars.ContextVar("load_test_queries", default=None)
+
+def _percentile(values, q):
+    return values[min(len(values) - 1, int(q * len(values)))]
+
+def configure_environment(directory, bcrypt_rounds=None):
+    """Point the app at files in directory and lift rate limits; must run before main is imported."""
+    os.chdir(directory)
+    os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(directory, 'load_test.sqlite')}"
+    os.environ["JOB_QUEUE_PATH"] = os.path.join(directory, "job_queue.sqlite")
+    os.environ["RATE_LIMIT_BACKEND"] = "memory"
+    os.environ.pop("REPORT_CACHE_DIR", None)
+    for name in ("LOGIN", "UPLOAD", "ANALYZE", "REPORT"):
+        os.environ[f"RATE_LIMIT_{name}"] = UNLIMITED
+    if bcrypt_rounds:
+        os.environ["BCRYPT_ROUNDS"] = str(bcrypt_rounds)
+
+class QueryCountingApp:
+    """
+    ASGI wrapper that counts the statements each request executes. The count
+    is stored under the request's X-Load-Id header once the response is done.
+    """
+
+    def __init__(self, app, engine):
+        from sqlalchemy import event
+
+        self.app = app
+        self.counts = {}
+        event.listen(engine, "before_cursor_execute", self._on_execute)
+
+    @staticmethod
+    def _on_execute(*args):
+        box = _request_queries.get()
+        if box is not None:
+            box[0] += 1
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        load_id = dict(scope["headers"]).get(b"x-load-id")
+        box = [0]
+        token = _request_queries.set(box)
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            _request_queries.reset(token)
+            if load_id is not None:
+                self.counts[load_id.decode()] = box[0]
+
+class LoadRecorder:
+    def __init__(self, query_counts):
+        self.query_counts = query_counts
+        self.samples = defaultdict(list)
+        self.errors = defaultdict(lambda: defaultdict(int))
+        self._ids = itertools.count()
+
+    async def request(self, client, endpoint, method, url, **kwargs):
+        load_id = str(next(self._ids))
+        headers = {**kwargs.pop("headers", {}), "X-Load-Id": load_id}
+        started = time.perf_counter()
+        try:
+            response = await client.request(method, url, headers=headers, **kwargs)
+        except Exception as e:
+            self.errors[endpoint][type(e).__name__] += 1
+            return None
+        self.samples[endpoint].append((time.perf_counter() - started, load_id))
+        if response.status_code >= 400:
+            self.errors[endpoint][response.status_code] += 1
+            return None
+        return response
+
+    def summary(self, elapsed):
+        endpoints = {}
+        for endpoint, samples in sorted(self.samples.items()):
+            latencies = sorted(seconds for seconds, _ in samples)
+            queries = [self.query_counts[load_id] for _, load_id in samples if load_id in self.query_counts]
+            endpoints[endpoint] = {
+                "requests": len(samples),
+                "errors": dict(self.errors.get(endpoint, {})),
+                "requests_per_s": round(len(samples) / elapsed, 2),
+                "p50_ms": round(_percentile(latencies, 0.5) * 1000, 2),
+                "p95_ms": round(_percentile(latencies, 0.95) * 1000, 2),
+                "p99_ms": round(_percentile(latencies, 0.99) * 1000, 2),
+                "queries_per_request": round(sum(queries) / len(queries), 2) if queries else None,
+                "max_queries": max(queries) if queries else None
+            }
+        total = sum(endpoint["requests"] for endpoint in endpoints.values())
+        return {"elapsed_s": round(elapsed, 2), "requests": total, "requests_per_s": round(total / elapsed, 2), "endpoints": endpoints}
+
+async def user_flow(client, recorder, user_index, resumes, job_description, iterations, rng):
+    email = f"load{user_index}@example.com"
+    credentials = {"email": email, "password": PASSWORD}
+    if not await recorder.request(client, "POST /register", "POST", "/register", json=credentials):
+        return
+    response = await recorder.request(client, "POST /login", "POST", "/login", json=credentials)
+    if not response:
+        return
+    headers = {"Authorization": f"Bearer {response.json()['access_token']}"}
+
+    resume_ids = []
+    for name, data in rng.sample(resumes, 2):
+        response = await recorder.request(
+            client, "POST /upload", "POST", "/upload", headers=headers,
+            files={"file": (name, data, "application/pdf")}
+        )
+        if response:
+            resume_ids.append(response.json()["resume_id"])
+    if len(resume_ids) < 2:
+        return
+
+    for _ in range(iterations):
+        role, level = rng.choice(ROLES), rng.choice(LEVELS)
+        response = await recorder.request(
+            client, "POST /analyze", "POST", "/analyze", headers=headers,
+            json={"resume_id": resume_ids[0], "role": role, "level": level}
+        )
+        await recorder.request(client, "GET /history", "GET", "/history", headers=headers)
+        if response:
+            await recorder.request(
+                client, "GET /report/{id}", "GET", f"/report/{response.json()['analysis_id']}", headers=headers
+            )
+        await recorder.request(
+            client, "POST /compare", "POST", "/compare", headers=headers,
+            json={"resume_id_1": resume_ids[0], "resume_id_2": resume_ids[1], "role": role, "level": level}
+        )
+        await recorder.request(
+            client, "POST /match-job-description", "POST", "/match-job-description", headers=headers,
+            json={"resume_id": rng.choice(resume_ids), "job_description": job_description}
+        )
+
+def build_resumes(directory):
+    resumes = []
+    for size, seed in RESUME_VARIANTS:
+        path = os.path.join(directory, f"resume_{size}_{seed}.pdf")
+        write_resume(generate_resume(size, seed), path, "pdf")
+        with open(path, "rb") as f:
+            resumes.append((os.path.basename(path), f.read()))
+    return resumes
+
+async def run(users, concurrency, iterations, use_uvicorn, seed, directory):
+    import database
+    from main import app
+
+    counting_app = QueryCountingApp(app, database.engine)
+    recorder = LoadRecorder(counting_app.counts)
+    resumes = build_resumes(directory)
+    job_description = generate_job_description("medium", seed)
+
+    server = None
+    if use_uvicorn:
+        import uvicorn
+
+        server = uvicorn.Server(uvicorn.Config(counting_app, host="127.0.0.1", port=0, log_level="warning"))
+        serve_task = asyncio.create_task(server.serve())
+        while not server.started:
+            if serve_task.done():
+                serve_task.result()
+            await asyncio.sleep(0.05)
+        port = server.servers[0].sockets[0].getsockname()[1]
+        client = httpx.AsyncClient(base_url=f"http://127.0.0.1:{port}", timeout=120)
+    else:
+        # The ASGI transport does not send lifespan events, so run startup here
+        await app.router.startup()
+        client = httpx.AsyncClient(transport=httpx.ASGITransport(app=counting_app), base_url="http://loadtest", timeout=120)
+
+    slots = asyncio.Semaphore(concurrency)
+
+    async def one_user(index):
+        async with slots:
+            await user_flow(client, recorder, index, resumes, job_description, iterations, random.Random(f"{seed}:{index}"))
+
+    try:
+        started = time.perf_counter()
+        await asyncio.gather(*(one_user(index) for index in range(users)))
+        elapsed = time.perf_counter() - started
+    finally:
+        await client.aclose()
+        if server is not None:
+            server.should_exit = True
+            await serve_task
+        else:
+            await app.router.shutdown()
+
+    return recorder.summary(elapsed)
+
+def print_summary(summary):
+    print(f"{'endpoint':<28}{'reqs':>7}{'errors':>8}{'req/s':>9}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}{'queries':>9}")
+    for name, endpoint in summary["endpoints"].items():
+        queries = endpoint["queries_per_request"]
+        print(
+            f"{name:<28}{endpoint['requests']:>7}{sum(endpoint['errors'].values()):>8}{endpoint['requests_per_s']:>9.1f}"
+            f"{endpoint['p50_ms']:>10.1f}{endpoint['p95_ms']:>10.1f}{endpoint['p99_ms']:>10.1f}"
+            f"{queries if queries is not None else '-':>9}"
+        )
+        for error, count in endpoint["errors"].items():
+            print(f"{'':<4}{count} x {error}")
+    print(f"\n{summary['requests']} requests in {summary['elapsed_s']}s ({summary['requests_per_s']} req/s)")
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--users", type=int, default=20)
+    parser.add_argument("--concurrency", type=int, default=5)
+    parser.add_argument("--iterations", type=int, default=3, help="analyze/history/report/compare/match rounds per user")
+    parser.add_argument("--uvicorn", action="store_true", help="serve over HTTP on 127.0.0.1 instead of the ASGI transport")
+    parser.add_argument("--bcrypt-rounds", type=int)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--json", metavar="PATH", help="also write the results as JSON")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as directory:
+        previous_directory = os.getcwd()
+        configure_environment(directory, args.bcrypt_rounds)
+        try:
+            summary = asyncio.run(run(args.users, args.concurrency, args.iterations, args.uvicorn, args.seed, directory))
+        finally:
+            os.chdir(previous_directory)
+
+    print_summary(summary)
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(summary, f, indent=2)
+            f.write("\n")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,181 @@
+"""
+Per-stage throughput and allocations of the parse/score/report pipeline.
+
+Every stage runs on the synthetic corpus from benchmarks.corpus at each size:
+text extraction from PDF and DOCX, clean_text, extract_skills,
+calculate_ats_score, analyze_resume and both PDF report generators. A stage
+is reported as ops/s, the median over several timed rounds, and the peak
+memory allocated by one call, measured with tracemalloc in a separate run so
+tracing does not slow the timed rounds.
+
+Results can be saved as a JSON baseline and later checked against it; a
+stage that got slower or allocates more than --threshold (relative) fails
+the check with exit status 1. Throughput depends on the machine, so record
+the baseline on the machine you compare on.
+
+    python -m benchmarks.pipeline_benchmark --save-baseline benchmarks/pipeline_baseline.json
+    python -m benchmarks.pipeline_benchmark --check benchmarks/pipeline_baseline.json
+"""
+import argparse
+import json
+import os
+import platform
+import statistics
+import sys
+import tempfile
+import time
+import tracemalloc
+from datetime import datetime
+
+from analytics_engine import analyze_resume, calculate_ats_score
+from benchmarks.corpus import SIZES, generate_resume, write_resume
+from report_generator import generate_analysis_report, generate_comparison_report
+from resume_parser import clean_text, extract_skills, extract_text
+
+DEFAULT_BASELINE = os.path.join(os.path.dirname(__file__), "pipeline_baseline.json")
+REPORT_TIME = datetime(2024, 1, 1, 12, 0)
+# Allocation changes below this are noise, whatever the relative change
+ALLOC_SLACK_KB = 16
+
+def _report_data(result, role, level):
+    return {
+        "overall_score": result["overall_score"],
+        "skill_match_score": result["skill_match_score"],
+        "ats_score": result["ats_score"],
+        "extracted_skills": result["all_extracted_skills"],
+        "missing_skills": result["missing_skills"],
+        "role_display": role.replace("_", " ").title(),
+        "level_display": level.title(),
+        "word_count": result["word_count"]
+    }
+
+def build_stages(size, directory):
+    """(name, callable) pairs for one corpus size; the inputs are prepared up front."""
+    lines = generate_resume(size, seed=0)
+    paths = {}
+    for file_type in ("pdf", "docx"):
+        paths[file_type] = os.path.join(directory, f"resume_{size}.{file_type}")
+        write_resume(lines, paths[file_type], file_type)
+
+    raw_text = "\n".join(lines)
+    cleaned = clean_text(raw_text)
+    extracted = {"raw_text": raw_text, "skills": extract_skills(cleaned), "word_count": len(cleaned.split())}
+    result = analyze_resume(extracted, role="data_analyst", level="intermediate")
+    report_data = _report_data(result, "data_analyst", "intermediate")
+    other_data = _report_data(
+        analyze_resume(extracted, role="data_scientist", level="intermediate"), "data_scientist", "intermediate"
+    )
+
+    return [
+        ("extract_text[pdf]", lambda: extract_text(paths["pdf"], "pdf")),
+        ("extract_text[docx]", lambda: extract_text(paths["docx"], "docx")),
+        ("clean_text", lambda: clean_text(raw_text)),
+        ("extract_skills", lambda: extract_skills(cleaned)),
+        ("calculate_ats_score", lambda: calculate_ats_score(raw_text, "resume.pdf")),
+        ("analyze_resume", lambda: analyze_resume(extracted, role="data_analyst", level="intermediate")),
+        ("generate_analysis_report", lambda: generate_analysis_report(report_data, "resume.pdf", REPORT_TIME)),
+        ("generate_comparison_report", lambda: generate_comparison_report(report_data, other_data, "a.pdf", "b.pdf"))
+    ]
+
+def measure(func, rounds, round_time):
+    """Return (ops_per_s, peak_alloc_kb) for func."""
+    func()  # Warm caches and lazy imports
+
+    # Calls per round so each round lasts about round_time
+    calls = 1
+    while True:
+        started = time.perf_counter()
+        for _ in range(calls):
+            func()
+        elapsed = time.perf_counter() - started
+        if elapsed >= round_time / 4 or calls >= 1_000_000:
+            break
+        calls *= 4
+    calls = max(1, int(calls * round_time / max(elapsed, 1e-9)))
+
+    round_times = []
+    for _ in range(rounds):
+        started = time.perf_counter()
+        for _ in range(calls):
+            func()
+        round_times.append((time.perf_counter() - started) / calls)
+
+    tracemalloc.start()
+    try:
+        tracemalloc.reset_peak()
+        baseline, _ = tracemalloc.get_traced_memory()
+        func()
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+
+    return 1 / statistics.median(round_times), (peak - baseline) / 1024
+
+def run(sizes, rounds, round_time, stage_filter=None):
+    results = {}
+    with tempfile.TemporaryDirectory() as directory:
+        for size in sizes:
+            for name, func in build_stages(size, directory):
+                if stage_filter and stage_filter not in name:
+                    continue
+                ops_per_s, peak_kb = measure(func, rounds, round_time)
+                results[f"{name}/{size}"] = {"ops_per_s": round(ops_per_s, 2), "peak_alloc_kb": round(peak_kb, 1)}
+                print(f"{name:<28}{size:<8}{ops_per_s:>12.1f}{peak_kb:>14.1f}", flush=True)
+    return results
+
+def compare(results, baseline, threshold):
+    """Return a list of regression messages for results against baseline."""
+    regressions = []
+    for key, result in results.items():
+        previous = baseline.get(key)
+        if previous is None:
+            continue
+        if result["ops_per_s"] < previous["ops_per_s"] * (1 - threshold):
+            regressions.append(
+                f"{key}: {result['ops_per_s']:.1f} ops/s, baseline {previous['ops_per_s']:.1f} "
+                f"({result['ops_per_s'] / previous['ops_per_s'] - 1:+.0%})"
+            )
+        allowed_kb = max(previous["peak_alloc_kb"] * (1 + threshold), previous["peak_alloc_kb"] + ALLOC_SLACK_KB)
+        if result["peak_alloc_kb"] > allowed_kb:
+            regressions.append(
+                f"{key}: {result['peak_alloc_kb']:.1f} KB allocated, baseline {previous['peak_alloc_kb']:.1f} KB"
+            )
+    return regressions
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", nargs="+", choices=list(SIZES), default=list(SIZES))
+    parser.add_argument("--stage", help="only run stages whose name contains this")
+    parser.add_argument("--rounds", type=int, default=5)
+    parser.add_argument("--round-time", type=float, default=0.2, help="seconds per timed round")
+    parser.add_argument("--save-baseline", metavar="PATH", nargs="?", const=DEFAULT_BASELINE)
+    parser.add_argument("--check", metavar="PATH", nargs="?", const=DEFAULT_BASELINE)
+    parser.add_argument("--threshold", type=float, default=0.25, help="allowed relative regression")
+    args = parser.parse_args()
+
+    print(f"{'stage':<28}{'size':<8}{'ops/s':>12}{'peak KB':>14}")
+    results = run(args.sizes, args.rounds, args.round_time, args.stage)
+
+    if args.save_baseline:
+        with open(args.save_baseline, "w") as f:
+            json.dump({
+                "python": platform.python_version(),
+                "machine": platform.machine(),
+                "results": results
+            }, f, indent=2, sort_keys=True)
+            f.write("\n")
+        print(f"\nBaseline saved to {args.save_baseline}")
+
+    if args.check:
+        with open(args.check) as f:
+            baseline = json.load(f)["results"]
+        regressions = compare(results, baseline, args.threshold)
+        if regressions:
+            print(f"\n{len(regressions)} regression(s) beyond {args.threshold:.0%}:")
+            for message in regressions:
+                print(f"  {message}")
+            sys.exit(1)
+        print(f"\nNo regressions beyond {args.threshold:.0%} against {args.check}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,95 @@
+"""
+NullPool vs pooled (QueuePool) request latency.
+
+Each simulated request opens a session, runs the same primary-key lookup as
+get_current_user, and closes it, from several threads at once. Runs against a
+throwaway SQLite file always, and against PostgreSQL when BENCH_POSTGRES_URL
+is set or a local server accepts connections.
+
+    python -m benchmarks.pool_benchmark --threads 16 --requests 200
+"""
+import argparse
+import os
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from sqlalchemy import text
+from sqlalchemy.orm import sessionmaker
+
+from database import Base, create_db_engine, pool_stats, warm_pool
+from models import User
+
+LOCAL_POSTGRES_URL = "postgresql://postgres@localhost:5432/postgres"
+
+def _percentile(values, q):
+    return values[min(len(values) - 1, int(q * len(values)))]
+
+def run(url, pool_mode, threads, requests):
+    engine = create_db_engine(url, pool_mode)
+    Base.metadata.create_all(bind=engine, tables=[User.__table__])
+    Session = sessionmaker(bind=engine)
+    warm_pool(engine)
+
+    def one_request(_):
+        started = time.perf_counter()
+        db = Session()
+        try:
+            db.query(User).filter(User.id == 1).first()
+        finally:
+            db.close()
+        return time.perf_counter() - started
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=threads) as executor:
+        latencies = sorted(executor.map(one_request, range(threads * requests)))
+    elapsed = time.perf_counter() - started
+
+    stats = pool_stats(engine)
+    engine.dispose()
+    return {
+        "requests_per_s": len(latencies) / elapsed,
+        "p50_ms": _percentile(latencies, 0.5) * 1000,
+        "p95_ms": _percentile(latencies, 0.95) * 1000,
+        "p99_ms": _percentile(latencies, 0.99) * 1000,
+        "avg_checkout_wait_ms": stats["avg_wait_ms"]
+    }
+
+def postgres_url():
+    url = os.getenv("BENCH_POSTGRES_URL")
+    if url:
+        return url
+    try:
+        engine = create_db_engine(LOCAL_POSTGRES_URL, "null")
+        with engine.connect() as connection:
+            connection.execute(text("SELECT 1"))
+        engine.dispose()
+        return LOCAL_POSTGRES_URL
+    except Exception:
+        return None
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--threads", type=int, default=8)
+    parser.add_argument("--requests", type=int, default=100, help="requests per thread")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as directory:
+        targets = [("sqlite", f"sqlite:///{os.path.join(directory, 'bench.sqlite')}")]
+        url = postgres_url()
+        if url:
+            targets.append(("postgresql", url))
+        else:
+            print("PostgreSQL not reachable; set BENCH_POSTGRES_URL to include it\n")
+
+        print(f"{'database':<12}{'pool':<8}{'req/s':>10}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}{'wait ms':>10}")
+        for name, target_url in targets:
+            for pool_mode in ("null", "queue"):
+                result = run(target_url, pool_mode, args.threads, args.requests)
+                print(
+                    f"{name:<12}{pool_mode:<8}{result['requests_per_s']:>10.0f}{result['p50_ms']:>10.2f}"
+                    f"{result['p95_ms']:>10.2f}{result['p99_ms']:>10.2f}{result['avg_checkout_wait_ms']:>10.3f}"
+                )
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,125 @@
+"""
+Bounded in-process caches shared by the API modules.
+"""
+import threading
+import time
+from collections import OrderedDict
+
+_MISSING = object()
+
+class LRUCache:
+    """Thread-safe mapping that evicts the least recently used entry past maxsize."""
+
+    def __init__(self, maxsize=256):
+        self.maxsize = maxsize
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key, default=None):
+        with self._lock:
+            value = self._data.get(key, _MISSING)
+            if value is _MISSING:
+                return default
+            self._data.move_to_end(key)
+            return value
+
+    def set(self, key, value):
+        with self._lock:
+            self._data[key] = value
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+
+    def pop(self, key, default=None):
+        with self._lock:
+            return self._data.pop(key, default)
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+    def __contains__(self, key):
+        with self._lock:
+            return key in self._data
+
+    def __len__(self):
+        with self._lock:
+            return len(self._data)
+
+class TTLCache(LRUCache):
+    """
+    LRUCache whose entries also expire, either ttl seconds after they are set
+    or at an explicit expires_at (a time.time() timestamp) given to set.
+    """
+
+    def __init__(self, maxsize=256, ttl=None):
+        super().__init__(maxsize)
+        self.ttl = ttl
+
+    def get(self, key, default=None):
+        with self._lock:
+            entry = self._data.get(key, _MISSING)
+            if entry is _MISSING:
+                return default
+            value, expires_at = entry
+            if expires_at is not None and expires_at <= time.time():
+                del self._data[key]
+                return default
+            self._data.move_to_end(key)
+            return value
+
+    def set(self, key, value, expires_at=None):
+        if expires_at is None and self.ttl is not None:
+            expires_at = time.time() + self.ttl
+        super().set(key, (value, expires_at))
+
+    def pop(self, key, default=None):
+        entry = super().pop(key, _MISSING)
+        return default if entry is _MISSING else entry[0]
+
+    def pop_matching(self, predicate):
+        """Drop every entry whose value satisfies predicate; returns how many were dropped."""
+        with self._lock:
+            keys = [key for key, (value, _) in self._data.items() if predicate(value)]
+            for key in keys:
+                del self._data[key]
+            return len(keys)
+
+    def __contains__(self, key):
+        return self.get(key, _MISSING) is not _MISSING
+
+class SizedLRUCache(LRUCache):
+    """LRUCache bounded by the total sizeof(value) of its entries rather than their count."""
+
+    def __init__(self, max_size, sizeof=len):
+        super().__init__(maxsize=None)
+        self.max_size = max_size
+        self.sizeof = sizeof
+        self.size = 0
+
+    def set(self, key, value):
+        value_size = self.sizeof(value)
+        if value_size > self.max_size:
+            return
+        with self._lock:
+            previous = self._data.pop(key, _MISSING)
+            if previous is not _MISSING:
+                self.size -= self.sizeof(previous)
+            self._data[key] = value
+            self.size += value_size
+            while self.size > self.max_size:
+                _, evicted = self._data.popitem(last=False)
+                self.size -= self.sizeof(evicted)
+
+    def pop(self, key, default=None):
+        with self._lock:
+            value = self._data.pop(key, _MISSING)
+            if value is _MISSING:
+                return default
+            self.size -= self.sizeof(value)
+            return value
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+            self.size = 0
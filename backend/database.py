@@ -1,14 +1,119 @@
 import os
-from sqlalchemy import create_engine
+import threading
+import time
+from collections import deque
+from sqlalchemy import create_engine, text
 from sqlalchemy.orm import sessionmaker, declarative_base
 from sqlalchemy.engine.url import make_url
-from sqlalchemy.pool import NullPool
+from sqlalchemy.pool import NullPool, QueuePool
 
 # -------------------------------------------------
 # Get DATABASE_URL from environment (Render)
 # -------------------------------------------------
 DATABASE_URL = os.getenv("DATABASE_URL")
 
+# -------------------------------------------------
+# Pool settings
+# DB_POOL_MODE=null  → new connection per checkout (free tier, spindown-safe)
+# DB_POOL_MODE=queue → persistent pool, warmed at startup
+# Unset keeps the previous defaults: null for PostgreSQL, queue for SQLite
+# -------------------------------------------------
+DB_POOL_MODE = os.getenv("DB_POOL_MODE")
+DB_POOL_SIZE = int(os.getenv("DB_POOL_SIZE", "5"))
+DB_MAX_OVERFLOW = int(os.getenv("DB_MAX_OVERFLOW", "10"))
+DB_POOL_RECYCLE = int(os.getenv("DB_POOL_RECYCLE", "1800"))
+DB_POOL_TIMEOUT = int(os.getenv("DB_POOL_TIMEOUT", "30"))
+
+class PoolStats:
+    """Checkout wait times and in-use counts for one connection pool."""
+
+    def __init__(self, window=1000):
+        self._lock = threading.Lock()
+        self._waits = deque(maxlen=window)
+        self.checkouts = 0
+        self.in_use = 0
+        self.max_in_use = 0
+        self.total_wait = 0.0
+        self.max_wait = 0.0
+
+    def record_checkout(self, wait):
+        with self._lock:
+            self._waits.append(wait)
+            self.checkouts += 1
+            self.in_use += 1
+            self.max_in_use = max(self.max_in_use, self.in_use)
+            self.total_wait += wait
+            self.max_wait = max(self.max_wait, wait)
+
+    def record_checkin(self):
+        with self._lock:
+            self.in_use -= 1
+
+    def snapshot(self):
+        with self._lock:
+            waits = sorted(self._waits)
+            percentile = lambda q: waits[min(len(waits) - 1, int(q * len(waits)))] * 1000 if waits else 0.0
+            return {
+                "checkouts": self.checkouts,
+                "in_use": self.in_use,
+                "max_in_use": self.max_in_use,
+                "avg_wait_ms": (self.total_wait / self.checkouts * 1000) if self.checkouts else 0.0,
+                "p50_wait_ms": percentile(0.5),
+                "p95_wait_ms": percentile(0.95),
+                "max_wait_ms": self.max_wait * 1000
+            }
+
+class TimedPoolMixin:
+    """Times how long each checkout waits (for a free slot or a new connection)."""
+
+    @property
+    def stats(self):
+        if not hasattr(self, "_stats"):
+            self._stats = PoolStats()
+        return self._stats
+
+    def _do_get(self):
+        started = time.perf_counter()
+        connection = super()._do_get()
+        self.stats.record_checkout(time.perf_counter() - started)
+        return connection
+
+    def _do_return_conn(self, record):
+        self.stats.record_checkin()
+        super()._do_return_conn(record)
+
+class TimedQueuePool(TimedPoolMixin, QueuePool):
+    pass
+
+class TimedNullPool(TimedPoolMixin, NullPool):
+    pass
+
+def create_db_engine(url, pool_mode=None):
+    """Create an engine for url with NullPool ("null") or a persistent QueuePool ("queue")."""
+    is_sqlite = url.startswith("sqlite")
+    pool_mode = pool_mode or ("queue" if is_sqlite else "null")
+    # 10 second connection timeout for PostgreSQL
+    connect_args = {"check_same_thread": False} if is_sqlite else {"connect_timeout": 10}
+
+    if pool_mode == "queue":
+        return create_engine(
+            url,
+            poolclass=TimedQueuePool,
+            pool_size=DB_POOL_SIZE,
+            max_overflow=DB_MAX_OVERFLOW,
+            pool_recycle=DB_POOL_RECYCLE,
+            pool_timeout=DB_POOL_TIMEOUT,
+            connect_args=connect_args,
+            pool_pre_ping=True  # Prevents stale DB connections
+        )
+
+    return create_engine(
+        url,
+        poolclass=TimedNullPool,
+        connect_args=connect_args,
+        pool_pre_ping=True
+    )
+
 # -------------------------------------------------
 # If DATABASE_URL exists → Use PostgreSQL (Production)
 # Else → Fallback to SQLite (Local Dev)
@@ -19,22 +124,10 @@ if DATABASE_URL:
     if DATABASE_URL.startswith("postgres://"):
         DATABASE_URL = DATABASE_URL.replace("postgres://", "postgresql://", 1)
 
-    # Use NullPool for free tier to handle spindown better
-    engine = create_engine(
-        DATABASE_URL,
-        poolclass=NullPool,  # No connection pooling for free tier
-        connect_args={"connect_timeout": 10},  # 10 second connection timeout
-        pool_pre_ping=True  # Prevents stale DB connections
-    )
-
 else:
     DATABASE_URL = "sqlite:///./resume_db.sqlite"
 
-    engine = create_engine(
-        DATABASE_URL,
-        connect_args={"check_same_thread": False},
-        pool_pre_ping=True
-    )
+engine = create_db_engine(DATABASE_URL, DB_POOL_MODE)
 
 # -------------------------------------------------
 # Session & Base
@@ -67,5 +160,46 @@ def init_db():
         print(f"Warning: Could not create database tables: {e}")
         # Don't raise - continue without failing
 
+# -------------------------------------------------
+# Pool warm-up and statistics
+# -------------------------------------------------
+def warm_pool(target_engine=None, connections=None):
+    """Open connections up front so the first requests skip the connect handshake."""
+    target_engine = target_engine or engine
+    pool = target_engine.pool
+    if not isinstance(pool, QueuePool):
+        connections = 1  # Nothing to keep; just check the database is reachable
+    elif connections is None:
+        connections = pool.size()
+
+    opened = []
+    try:
+        for _ in range(connections):
+            connection = target_engine.connect()
+            opened.append(connection)
+            connection.execute(text("SELECT 1"))
+    finally:
+        for connection in opened:
+            connection.close()
+    return len(opened)
+
+def pool_stats(target_engine=None):
+    target_engine = target_engine or engine
+    pool = target_engine.pool
+    stats = {
+        "mode": "queue" if isinstance(pool, QueuePool) else "null",
+        **pool.stats.snapshot()
+    }
+    if isinstance(pool, QueuePool):
+        stats.update({
+            "size": pool.size(),
+            "checked_out": pool.checkedout(),
+            "idle": pool.checkedin(),
+            "overflow": max(0, pool.overflow()),
+            # Every queue pool comes from create_db_engine, which sets this limit
+            "max_overflow": DB_MAX_OVERFLOW
+        })
+    return stats
+
 # -------------------------------------------------
 # Debu
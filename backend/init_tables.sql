@@ -14,13 +14,34 @@ CREATE INDEX IF NOT EXISTS ix_users_created_at ON users(created_at);
 CREATE TABLE IF NOT EXISTS refresh_tokens (
     id SERIAL PRIMARY KEY,
     user_id INTEGER NOT NULL REFERENCES users(id),
-    token VARCHAR UNIQUE NOT NULL,
+    token VARCHAR(64) UNIQUE NOT NULL,
     expires_at TIMESTAMP NOT NULL,
     created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
 );
 
 CREATE INDEX IF NOT EXISTS ix_refresh_tokens_user_id ON refresh_tokens(user_id);
+-- Tokens used to be stored in full; hash them in place (existing sessions stay valid)
+UPDATE refresh_tokens SET token = encode(sha256(convert_to(token, 'UTF8')), 'hex') WHERE length(token) > 64;
+ALTER TABLE refresh_tokens ALTER COLUMN token TYPE VARCHAR(64);
+
 CREATE INDEX IF NOT EXISTS ix_refresh_tokens_token ON refresh_tokens(token);
+CREATE INDEX IF NOT EXISTS ix_refresh_tokens_expires_at ON refresh_tokens(expires_at);
+
+CREATE TABLE IF NOT EXISTS parsed_documents (
+    id SERIAL PRIMARY KEY,
+    content_hash VARCHAR(64) NOT NULL,
+    parser_version VARCHAR(16) NOT NULL,
+    raw_text TEXT,
+    cleaned_text TEXT,
+    skills TEXT,
+    email VARCHAR,
+    phone TEXT,
+    word_count INTEGER,
+    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    CONSTRAINT uq_parsed_documents_hash_version UNIQUE (content_hash, parser_version)
+);
+
+CREATE INDEX IF NOT EXISTS ix_parsed_documents_content_hash ON parsed_documents(content_hash);
 
 CREATE TABLE IF NOT EXISTS resumes (
     id SERIAL PRIMARY KEY,
@@ -30,9 +51,31 @@ CREATE TABLE IF NOT EXISTS resumes (
     cleaned_text TEXT,
     role VARCHAR DEFAULT 'data_analyst',
     level VARCHAR DEFAULT 'intermediate',
+    skills TEXT,
+    word_count INTEGER,
+    has_email BOOLEAN,
+    has_phone BOOLEAN,
+    ats_features TEXT,
+    skill_mask_0 BIGINT,
+    skill_mask_1 BIGINT,
+    skill_mask_2 BIGINT,
+    skill_mask_3 BIGINT,
+    text_vector BYTEA,
     created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
 );
 
+-- Columns added after the first release; run backfill_resume_features.py afterwards
+ALTER TABLE resumes ADD COLUMN IF NOT EXISTS skills TEXT;
+ALTER TABLE resumes ADD COLUMN IF NOT EXISTS word_count INTEGER;
+ALTER TABLE resumes ADD COLUMN IF NOT EXISTS has_email BOOLEAN;
+ALTER TABLE resumes ADD COLUMN IF NOT EXISTS has_phone BOOLEAN;
+ALTER TABLE resumes ADD COLUMN IF NOT EXISTS ats_features TEXT;
+ALTER TABLE resumes ADD COLUMN IF NOT EXISTS skill_mask_0 BIGINT;
+ALTER TABLE resumes ADD COLUMN IF NOT EXISTS skill_mask_1 BIGINT;
+ALTER TABLE resumes ADD COLUMN IF NOT EXISTS skill_mask_2 BIGINT;
+ALTER TABLE resumes ADD COLUMN IF NOT EXISTS skill_mask_3 BIGINT;
+ALTER TABLE resumes ADD COLUMN IF NOT EXISTS text_vector BYTEA;
+
 CREATE INDEX IF NOT EXISTS ix_resumes_user_id ON resumes(user_id);
 CREATE INDEX IF NOT EXISTS ix_resumes_filename ON resumes(filename);
 CREATE INDEX IF NOT EXISTS ix_resumes_created_at ON resumes(created_at);
@@ -48,11 +91,25 @@ CREATE TABLE IF NOT EXISTS analyses (
     extracted_skills TEXT,
     missing_skills TEXT,
     ats_issues TEXT,
+    skill_mask_0 BIGINT,
+    skill_mask_1 BIGINT,
+    skill_mask_2 BIGINT,
+    skill_mask_3 BIGINT,
+    engine_version VARCHAR(16),
     created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
 );
 
+-- Added after the first release; run backfill_resume_features.py afterwards
+ALTER TABLE analyses ADD COLUMN IF NOT EXISTS skill_mask_0 BIGINT;
+ALTER TABLE analyses ADD COLUMN IF NOT EXISTS skill_mask_1 BIGINT;
+ALTER TABLE analyses ADD COLUMN IF NOT EXISTS skill_mask_2 BIGINT;
+ALTER TABLE analyses ADD COLUMN IF NOT EXISTS skill_mask_3 BIGINT;
+ALTER TABLE analyses ADD COLUMN IF NOT EXISTS engine_version VARCHAR(16);
+
 CREATE INDEX IF NOT EXISTS ix_analyses_resume_id ON analyses(resume_id);
 CREATE INDEX IF NOT EXISTS ix_analyses_created_at ON analyses(created_at);
+CREATE INDEX IF NOT EXISTS ix_analyses_resume_id_created_at ON analyses(resume_id, created_at);
+CREATE INDEX IF NOT EXISTS ix_analyses_resume_role_level_version ON analyses(resume_id, role, level, engine_version);
 
 CREATE TABLE IF NOT EXISTS skills (
     id SERIAL PRIMARY KEY,
@@ -0,0 +1,275 @@
+"""
+Persistent background job queue on a local SQLite file.
+
+Jobs are rows in JOB_QUEUE_PATH, so they survive restarts without an external
+broker. A worker claims a job by taking a lease on it and renews the lease
+every JOB_LEASE_RENEW_SECONDS while the handler runs; if the process dies
+mid-job the lease runs out and another worker picks the job up again. Each
+claim gets its own lease owner token, and the outcome of a job is only
+recorded under that token, so a worker that lost its lease cannot overwrite
+what the new owner records.
+Failures are retried with exponential backoff up to JOB_MAX_ATTEMPTS, except
+PermanentJobError, which fails the job at once.
+"""
+import json
+import os
+import sqlite3
+import threading
+import time
+import uuid
+
+JOB_QUEUE_PATH = os.getenv("JOB_QUEUE_PATH", "job_queue.sqlite")
+JOB_WORKERS = int(os.getenv("JOB_WORKERS", "2"))
+JOB_MAX_ATTEMPTS = int(os.getenv("JOB_MAX_ATTEMPTS", "3"))
+JOB_RETRY_BASE_SECONDS = float(os.getenv("JOB_RETRY_BASE_SECONDS", "2"))
+JOB_RETRY_MAX_SECONDS = 300
+JOB_LEASE_SECONDS = float(os.getenv("JOB_LEASE_SECONDS", "120"))
+JOB_LEASE_RENEW_SECONDS = JOB_LEASE_SECONDS / 3
+JOB_POLL_SECONDS = 1.0
+
+QUEUED = "queued"
+RUNNING = "running"
+SUCCEEDED = "succeeded"
+FAILED = "failed"
+
+class PermanentJobError(Exception):
+    """Raised by a handler for failures that retrying cannot fix."""
+
+_handlers = {}
+_workers = []
+_stop = threading.Event()
+_wakeup = threading.Event()
+_init_lock = threading.Lock()
+_initialized = False
+
+def register_handler(kind, handler):
+    """Run handler(payload) -> result for jobs of this kind; the result must be JSON-serializable."""
+    _handlers[kind] = handler
+
+def _connect():
+    global _initialized
+    connection = sqlite3.connect(JOB_QUEUE_PATH, timeout=30, isolation_level=None)
+    connection.row_factory = sqlite3.Row
+    if not _initialized:
+        with _init_lock:
+            if not _initialized:
+                connection.execute("PRAGMA journal_mode=WAL")
+                connection.execute("""
+                    CREATE TABLE IF NOT EXISTS jobs (
+                        id TEXT PRIMARY KEY,
+                        kind TEXT NOT NULL,
+                        user_id INTEGER,
+                        payload TEXT NOT NULL,
+                        status TEXT NOT NULL,
+                        attempts INTEGER NOT NULL DEFAULT 0,
+                        max_attempts INTEGER NOT NULL,
+                        run_after REAL NOT NULL,
+                        lease_expires REAL,
+                        lease_owner TEXT,
+                        result TEXT,
+                        error TEXT,
+                        created_at REAL NOT NULL,
+                        updated_at REAL NOT NULL
+                    )
+                """)
+                columns = {row["name"] for row in connection.execute("PRAGMA table_info(jobs)")}
+                if "lease_owner" not in columns:
+                    # Queue files created before leases had owners
+                    connection.execute("ALTER TABLE jobs ADD COLUMN lease_owner TEXT")
+                connection.execute("CREATE INDEX IF NOT EXISTS ix_jobs_status_run_after ON jobs(status, run_after)")
+                _initialized = True
+    return connection
+
+def enqueue(kind, payload, user_id=None, max_attempts=JOB_MAX_ATTEMPTS):
+    """Queue a job and return its ID."""
+    job_id = uuid.uuid4().hex
+    now = time.time()
+    connection = _connect()
+    try:
+        connection.execute(
+            "INSERT INTO jobs (id, kind, user_id, payload, status, max_attempts, run_after, created_at, updated_at) "
+            "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+            (job_id, kind, user_id, json.dumps(payload), QUEUED, max_attempts, now, now, now)
+        )
+    finally:
+        connection.close()
+    _wakeup.set()
+    return job_id
+
+def get_job(job_id):
+    """Return a job as a dict, or None if there is no such job."""
+    connection = _connect()
+    try:
+        row = connection.execute("SELECT * FROM jobs WHERE id = ?", (job_id,)).fetchone()
+    finally:
+        connection.close()
+    if row is None:
+        return None
+    return {
+        "job_id": row["id"],
+        "kind": row["kind"],
+        "user_id": row["user_id"],
+        "status": row["status"],
+        "attempts": row["attempts"],
+        "result": json.loads(row["result"]) if row["result"] else None,
+        "error": row["error"],
+        "created_at": row["created_at"],
+        "updated_at": row["updated_at"]
+    }
+
+def claim_job():
+    """
+    Lease the next runnable job: a queued job that is due, or a running job
+    whose worker stopped renewing its lease. Returns the row as a dict with
+    the new "lease_owner" token, or None.
+    """
+    now = time.time()
+    connection = _connect()
+    try:
+        connection.execute("BEGIN IMMEDIATE")
+        while True:
+            row = connection.execute(
+                "SELECT * FROM jobs WHERE (status = ? AND run_after <= ?) OR (status = ? AND lease_expires < ?) "
+                "ORDER BY run_after LIMIT 1",
+                (QUEUED, now, RUNNING, now)
+            ).fetchone()
+            if row is None:
+                connection.execute("COMMIT")
+                return None
+            if row["status"] == RUNNING and row["attempts"] >= row["max_attempts"]:
+                # The last allowed attempt died with its worker
+                connection.execute(
+                    "UPDATE jobs SET status = ?, error = ?, lease_expires = NULL, lease_owner = NULL, updated_at = ? "
+                    "WHERE id = ?",
+                    (FAILED, "Worker stopped before the job finished", now, row["id"])
+                )
+                continue
+            lease_owner = uuid.uuid4().hex
+            connection.execute(
+                "UPDATE jobs SET status = ?, attempts = attempts + 1, lease_expires = ?, lease_owner = ?, updated_at = ? "
+                "WHERE id = ?",
+                (RUNNING, now + JOB_LEASE_SECONDS, lease_owner, now, row["id"])
+            )
+            connection.execute("COMMIT")
+            return {**dict(row), "lease_owner": lease_owner}
+    except Exception:
+        connection.execute("ROLLBACK")
+        raise
+    finally:
+        connection.close()
+
+def renew_lease(job_id, lease_owner):
+    """Extend a lease held by lease_owner; returns False if the lease was lost to another worker."""
+    now = time.time()
+    connection = _connect()
+    try:
+        cursor = connection.execute(
+            "UPDATE jobs SET lease_expires = ?, updated_at = ? WHERE id = ? AND status = ? AND lease_owner = ?",
+            (now + JOB_LEASE_SECONDS, now, job_id, RUNNING, lease_owner)
+        )
+        return cursor.rowcount == 1
+    finally:
+        connection.close()
+
+class LeaseHeartbeat:
+    """Renews a job's lease from a background thread while its handler runs."""
+
+    def __init__(self, job_id, lease_owner, interval=JOB_LEASE_RENEW_SECONDS):
+        self.job_id = job_id
+        self.lease_owner = lease_owner
+        self.interval = interval
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name=f"job-heartbeat-{job_id[:8]}", daemon=True)
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            try:
+                renewed = renew_lease(self.job_id, self.lease_owner)
+            except sqlite3.Error as e:
+                # The lease is still good until it expires; try again next interval
+                print(f"Warning: Could not renew lease of job {self.job_id}: {str(e)}")
+                continue
+            if not renewed:
+                print(f"Warning: Job {self.job_id} lost its lease; its outcome will be discarded")
+                return
+
+    def __enter__(self):
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc_info):
+        self._stop.set()
+        self._thread.join()
+
+def _finish(job_id, lease_owner, status, result=None, error=None, run_after=None):
+    """Record a job's outcome if lease_owner still holds its lease; returns False if the lease was lost."""
+    now = time.time()
+    connection = _connect()
+    try:
+        cursor = connection.execute(
+            "UPDATE jobs SET status = ?, result = ?, error = ?, run_after = COALESCE(?, run_after), "
+            "lease_expires = NULL, lease_owner = NULL, updated_at = ? WHERE id = ? AND lease_owner = ?",
+            (status, json.dumps(result) if result is not None else None, error, run_after, now, job_id, lease_owner)
+        )
+    finally:
+        connection.close()
+    if cursor.rowcount == 0:
+        print(f"Warning: Job {job_id} lost its lease; not recording its {status} outcome")
+        return False
+    return True
+
+def retry_delay(attempts):
+    """Backoff before the next attempt after `attempts` failed ones."""
+    return min(JOB_RETRY_BASE_SECONDS * 2 ** (attempts - 1), JOB_RETRY_MAX_SECONDS)
+
+def run_job(row):
+    """Run a claimed job, renewing its lease meanwhile, and record its outcome."""
+    attempts = row["attempts"] + 1
+    job_id, lease_owner = row["id"], row["lease_owner"]
+    handler = _handlers.get(row["kind"])
+    try:
+        if handler is None:
+            raise PermanentJobError(f"No handler for job kind '{row['kind']}'")
+        with LeaseHeartbeat(job_id, lease_owner):
+            result = handler(json.loads(row["payload"]))
+    except PermanentJobError as e:
+        _finish(job_id, lease_owner, FAILED, error=str(e))
+    except Exception as e:
+        print(f"Job {job_id} attempt {attempts} failed: {str(e)}")
+        if attempts >= row["max_attempts"]:
+            _finish(job_id, lease_owner, FAILED, error=str(e))
+        else:
+            _finish(job_id, lease_owner, QUEUED, error=str(e), run_after=time.time() + retry_delay(attempts))
+    else:
+        _finish(job_id, lease_owner, SUCCEEDED, result=result)
+
+def _worker_loop():
+    while not _stop.is_set():
+        try:
+            row = claim_job()
+        except sqlite3.Error as e:
+            print(f"Warning: Could not claim job: {str(e)}")
+            row = None
+        if row is None:
+            _wakeup.wait(JOB_POLL_SECONDS)
+            _wakeup.clear()
+            continue
+        run_job(row)
+
+def start_workers(count=JOB_WORKERS):
+    """Start the worker threads; jobs left running by a crashed process are reclaimed once their lease expires."""
+    if _workers:
+        return
+    _stop.clear()
+    for index in range(count):
+        worker = threading.Thread(target=_worker_loop, name=f"job-worker-{index}", daemon=True)
+        worker.start()
+        _workers.append(worker)
+
+def stop_workers(timeout=10):
+    """Signal the workers to stop after their current job and wait for them."""
+    _stop.set()
+    _wakeup.set()
+    for worker in _workers:
+        worker.join(timeout)
+    _workers.clear()
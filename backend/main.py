@@ -1,24 +1,53 @@
-from fastapi import FastAPI, UploadFile, File, Depends, HTTPException, Header
-from fastapi.responses import JSONResponse, StreamingResponse
+from fastapi import FastAPI, UploadFile, File, Depends, HTTPException, Header, Query
+from fastapi.responses import JSONResponse, PlainTextResponse, Response, StreamingResponse
 from fastapi.middleware.cors import CORSMiddleware
+from starlette.concurrency import run_in_threadpool
 from pydantic import BaseModel, EmailStr
-from sqlalchemy.orm import Session
+from sqlalchemy import select, and_, or_, func
+from sqlalchemy.orm import Session, undefer
 from datetime import datetime, timedelta
-import shutil
+import asyncio
+import base64
+import hmac
 import os
 import json
-from typing import Optional
+from typing import List, Optional
 
-from database import engine, SessionLocal, init_db
-from models import Resume, Analysis, Skill, Base, User, RefreshToken
+from database import engine, SessionLocal, init_db, warm_pool, pool_stats
+from models import Resume, Analysis, Skill, Base, User
 from resume_parser import parse_resume, extract_text, extract_skills
-from analytics_engine import analyze_resume
-from report_generator import generate_analysis_report, generate_comparison_report
+from parse_pool import parse_resume_async, parse_resume_bytes_async, shutdown_executor
+from parse_cache import get_cached_parse, store_parse
+from uploads import UploadLimitMiddleware, spool_upload, keep_original, KEEP_UPLOADS
+from resume_features import apply_resume_features, resume_extracted_data
+from batch_upload import ingest_batch, count_batch_entries, BATCH_MAX_FILES
+from text_similarity import count_documents, load_document_frequencies, resume_term_vector, similarity_scores
+from skill_bitmask import RESUME_SKILLS, row_mask, skill_mask_filter, skill_overlap, skills_to_mask, mask_to_skills
+from analysis_store import store_analysis, analysis_result, run_analysis_job, skill_writer, ANALYSIS_JOB
+from job_queue import enqueue, get_job, register_handler, start_workers, stop_workers
+from analytics_engine import rank_roles, match_job_skills, combined_job_match
+from report_generator import render_analysis_report, generate_comparison_report
+from report_cache import analysis_report_data, cached_report, etag_matches, prune_disk_cache, remove_stale_versions, report_key
+from report_export import count_export_reports, iter_export_reports, stream_report_zip
+from rate_limit import upload_limiter, batch_upload_limiter, analyze_limiter, report_limiter
+from request_stats import LatencyMiddleware, latency_stats
+from profiling import ProfilingMiddleware, CPROFILE, list_captures, get_capture
+from metrics import (
+    MetricsMiddleware, current_endpoint, instrument_sessions, render_metrics,
+    report_render_seconds, score_seconds, upload_bytes
+)
+from session_store import (
+    store_refresh_token, active_refresh_token, revoke_refresh_token,
+    revoke_all_sessions, token_sweeper
+)
 from auth import (
-    hash_password, verify_password, validate_password_strength,
+    hash_password_async, verify_and_update_password, PasswordHasherBusy,
+    password_hasher_stats, validate_password_strength,
     create_access_token, create_refresh_token, verify_token,
     check_rate_limit, record_login_attempt, clear_login_attempts,
-    ACCESS_TOKEN_EXPIRE_MINUTES
+    cached_token_user_id, remember_verified_token, forget_token,
+    cached_principal, remember_principal, evict_user, UserPrincipal,
+    ACCESS_TOKEN_EXPIRE_MINUTES, REFRESH_TOKEN_EXPIRE_DAYS
 )
 
 # Pydantic models
@@ -43,6 +72,11 @@ class AnalyzeRequest(BaseModel):
     role: str = "data_analyst"
     level: str = "intermediate"
 
+class AllRolesRequest(BaseModel):
+    resume_id: int
+    level: Optional[str] = None
+    limit: Optional[int] = None
+
 class CompareRequest(BaseModel):
     resume_id_1: int
     resume_id_2: int
@@ -54,8 +88,18 @@ class JobDescriptionRequest(BaseModel):
     job_description: str
     job_title: str = "Not specified"
 
+class PortfolioJobDescriptionRequest(BaseModel):
+    job_description: str
+    job_title: str = "Not specified"
+    resume_ids: Optional[List[int]] = None
+
 app = FastAPI(title="Resume Analytics API")
 
+app.add_middleware(LatencyMiddleware)
+app.add_middleware(MetricsMiddleware)
+app.add_middleware(UploadLimitMiddleware)
+instrument_sessions(SessionLocal)
+
 app.add_middleware(
     CORSMiddleware,
     allow_origins=[
@@ -75,13 +119,24 @@ def get_db():
     finally:
         db.close()
 
-def get_current_user(authorization: Optional[str] = Header(None), db: Session = Depends(get_db)):
-    """Extract user from JWT token."""
+def bearer_token(authorization: Optional[str]) -> str:
     if not authorization:
         raise HTTPException(status_code=401, detail="Not authenticated")
+    return authorization.replace("Bearer ", "").strip()
+
+def get_current_user_id(authorization: Optional[str] = Header(None), db: Session = Depends(get_db)) -> int:
+    """
+    Extract the user ID from a JWT token.
+    
+    Tokens already verified for an existing user are served from the token
+    cache without decoding the JWT or querying the database.
+    """
+    token = bearer_token(authorization)
+    user_id = cached_token_user_id(token)
+    if user_id is not None:
+        return user_id
     
     try:
-        token = authorization.replace("Bearer ", "").strip()
         payload = verify_token(token)
         
         if not payload:
@@ -101,20 +156,61 @@ def get_current_user(authorization: Optional[str] = Header(None), db: Session =
         except (ValueError, TypeError):
             raise HTTPException(status_code=401, detail="Invalid token - bad user ID")
         
-        user = db.query(User).filter(User.id == user_id).first()
-        if not user:
-            raise HTTPException(status_code=401, detail="User not found")
+        if cached_principal(user_id) is None:
+            user = db.query(User).filter(User.id == user_id).first()
+            if not user:
+                raise HTTPException(status_code=401, detail="User not found")
+            remember_principal(user)
         
-        return user
+        if payload.get("exp"):
+            remember_verified_token(token, user_id, payload["exp"])
+        return user_id
     except HTTPException:
         raise
     except Exception as e:
         print(f"Auth error: {str(e)}")
         raise HTTPException(status_code=401, detail="Invalid token")
 
-UPLOAD_DIR = "uploads"
-if not os.path.exists(UPLOAD_DIR):
-    os.makedirs(UPLOAD_DIR)
+def get_current_user(user_id: int = Depends(get_current_user_id), db: Session = Depends(get_db)) -> UserPrincipal:
+    """Extract the user from a JWT token, for endpoints that need more than the ID."""
+    principal = cached_principal(user_id)
+    if principal is not None:
+        return principal
+    
+    user = db.query(User).filter(User.id == user_id).first()
+    if not user:
+        evict_user(user_id)
+        raise HTTPException(status_code=401, detail="User not found")
+    return remember_principal(user)
+
+def enforce_rate_limit(limiter, user_id, cost=1):
+    """Count cost hits against limiter for user_id, raising 429 past the limit; blocking, keep off the event loop."""
+    allowed, retry_after = limiter.acquire(user_id, cost)
+    if not allowed:
+        raise HTTPException(
+            status_code=429,
+            detail="Too many requests. Please slow down.",
+            headers={"Retry-After": str(retry_after)}
+        )
+
+def rate_limited(limiter):
+    """Dependency that counts a request against limiter per user and rejects it with 429 past the limit."""
+    def check_limit(current_user_id: int = Depends(get_current_user_id)):
+        enforce_rate_limit(limiter, current_user_id)
+    return check_limit
+
+# Operational endpoints are disabled unless a token is configured
+INTERNAL_API_TOKEN = os.getenv("INTERNAL_API_TOKEN")
+
+# Requests sent with X-Profile and the internal token are profiled; see profiling.py
+app.add_middleware(ProfilingMiddleware, token=INTERNAL_API_TOKEN)
+
+def require_internal_token(x_internal_token: Optional[str] = Header(None)):
+    """Guard for internal endpoints, checked against INTERNAL_API_TOKEN."""
+    if not INTERNAL_API_TOKEN:
+        raise HTTPException(status_code=404, detail="Not Found")
+    if not x_internal_token or not hmac.compare_digest(x_internal_token, INTERNAL_API_TOKEN):
+        raise HTTPException(status_code=403, detail="Access denied")
 
 @app.on_event("startup")
 def startup_event():
@@ -123,15 +219,94 @@ def startup_event():
     except Exception as e:
         print(f"Warning: Could not initialize database on startup: {e}")
         # Continue without failing - database might already be initialized
+    
+    try:
+        warm_pool()
+    except Exception as e:
+        print(f"Warning: Could not warm database connections: {e}")
+    
+    db = SessionLocal()
+    try:
+        load_document_frequencies(db)
+    except Exception as e:
+        print(f"Warning: Could not load text similarity statistics: {e}")
+    finally:
+        db.close()
+    
+    try:
+        remove_stale_versions()
+        prune_disk_cache()
+    except Exception as e:
+        print(f"Warning: Could not prune the report cache: {e}")
+    
+    register_handler(ANALYSIS_JOB, run_analysis_job)
+    start_workers()
+    token_sweeper.start()
+
+@app.on_event("shutdown")
+def shutdown_event():
+    token_sweeper.stop()
+    stop_workers()
+    skill_writer.stop()
+    shutdown_executor()
 
 @app.get("/")
 def read_root():
     return {"message": "Resume Analytics Platform API", "version": "2.0", "status": "Authentication Enabled"}
 
+@app.get("/internal/pool-stats", dependencies=[Depends(require_internal_token)])
+def get_pool_stats():
+    """Database connection pool usage (internal)."""
+    return pool_stats()
+
+@app.get("/internal/latency", dependencies=[Depends(require_internal_token)])
+def get_latency_stats():
+    """Request latency with /register and /login kept apart from the rest of the API, plus bcrypt executor load."""
+    return {
+        "latency": latency_stats.snapshot(),
+        "password_hasher": password_hasher_stats()
+    }
+
+@app.get("/internal/profiles", dependencies=[Depends(require_internal_token)])
+def get_profiles():
+    """Recently captured request profiles, newest first (internal)."""
+    return {"profiles": list_captures()}
+
+@app.get("/internal/profiles/{profile_id}", dependencies=[Depends(require_internal_token)])
+def download_profile(profile_id: str):
+    """Download a captured profile as .pstats (cprofile) or speedscope JSON (sample) (internal)."""
+    capture = get_capture(profile_id)
+    if not capture:
+        raise HTTPException(status_code=404, detail="Profile not found")
+    
+    if capture["mode"] == CPROFILE:
+        filename, media_type = f"profile_{profile_id}.pstats", "application/octet-stream"
+    else:
+        filename, media_type = f"profile_{profile_id}.speedscope.json", "application/json"
+    return Response(
+        content=capture["data"],
+        media_type=media_type,
+        headers={"Content-Disposition": f"attachment; filename={filename}"}
+    )
+
+@app.get("/metrics", dependencies=[Depends(require_internal_token)])
+def get_metrics():
+    """Per-route request and pipeline stage histograms in the Prometheus text format (internal)."""
+    return PlainTextResponse(render_metrics(), media_type="text/plain; version=0.0.4")
+
 # ==================== AUTH ENDPOINTS ====================
 
+def password_hasher_busy():
+    # A fresh exception per request: re-raising one shared instance would grow
+    # its traceback and keep every earlier request's frames (and passwords) alive
+    return HTTPException(
+        status_code=503,
+        detail="Authentication is busy. Please try again shortly.",
+        headers={"Retry-After": "1"}
+    )
+
 @app.post("/register")
-def register(request: RegisterRequest, db: Session = Depends(get_db)):
+async def register(request: RegisterRequest, db: Session = Depends(get_db)):
     """Register a new user."""
     
     # Validate email format
@@ -139,7 +314,7 @@ def register(request: RegisterRequest, db: Session = Depends(get_db)):
         raise HTTPException(status_code=400, detail="Invalid email format")
     
     # Check if email already exists
-    existing_user = db.query(User).filter(User.email == request.email).first()
+    existing_user = await run_in_threadpool(lambda: db.query(User).filter(User.email == request.email).first())
     if existing_user:
         raise HTTPException(status_code=400, detail="Email already registered")
     
@@ -148,9 +323,13 @@ def register(request: RegisterRequest, db: Session = Depends(get_db)):
     if not is_valid:
         raise HTTPException(status_code=400, detail=message)
     
+    # Hash password on the dedicated bcrypt executor
     try:
-        # Hash password and create user
-        password_hash = hash_password(request.password)
+        password_hash = await hash_password_async(request.password)
+    except PasswordHasherBusy:
+        raise password_hasher_busy() from None
+    
+    def create_user():
         user = User(
             email=request.email,
             password_hash=password_hash
@@ -158,6 +337,10 @@ def register(request: RegisterRequest, db: Session = Depends(get_db)):
         db.add(user)
         db.commit()
         db.refresh(user)
+        return user
+    
+    try:
+        user = await run_in_threadpool(create_user)
         
         return {
             "message": "Registration successful",
@@ -169,42 +352,45 @@ def register(request: RegisterRequest, db: Session = Depends(get_db)):
         raise HTTPException(status_code=500, detail=f"Registration failed: {str(e)}")
 
 @app.post("/login", response_model=TokenResponse)
-def login(request: LoginRequest, db: Session = Depends(get_db)):
+async def login(request: LoginRequest, db: Session = Depends(get_db)):
     """Login user and return access and refresh tokens."""
     
-    # Check rate limiting
-    can_attempt, message = check_rate_limit(request.email)
+    # Check rate limiting; the SQLite limiter backend blocks, so it runs in the threadpool
+    can_attempt, message = await run_in_threadpool(check_rate_limit, request.email)
     if not can_attempt:
         raise HTTPException(status_code=429, detail=message)
     
     # Find user
-    user = db.query(User).filter(User.email == request.email).first()
+    user = await run_in_threadpool(lambda: db.query(User).filter(User.email == request.email).first())
     
     if not user:
-        record_login_attempt(request.email)
+        await run_in_threadpool(record_login_attempt, request.email)
         raise HTTPException(status_code=401, detail="Invalid email or password")
     
-    # Verify password
-    if not verify_password(request.password, user.password_hash):
-        record_login_attempt(request.email)
+    # Verify password on the dedicated bcrypt executor
+    try:
+        verified, new_hash = await verify_and_update_password(request.password, user.password_hash)
+    except PasswordHasherBusy:
+        raise password_hasher_busy() from None
+    if not verified:
+        await run_in_threadpool(record_login_attempt, request.email)
         raise HTTPException(status_code=401, detail="Invalid email or password")
     
     # Clear login attempts after successful login
-    clear_login_attempts(request.email)
+    await run_in_threadpool(clear_login_attempts, request.email)
     
-    try:
+    def issue_tokens():
+        # Stored with a different bcrypt cost; save the rehash made while verifying
+        if new_hash:
+            user.password_hash = new_hash
+        
         # Create tokens with string user_id
         access_token = create_access_token({"sub": str(user.id)})
         refresh_token = create_refresh_token({"sub": str(user.id)})
         
-        # Store refresh token in database
-        token_expires = datetime.utcnow() + timedelta(days=7)
-        db_refresh_token = RefreshToken(
-            user_id=user.id,
-            token=refresh_token,
-            expires_at=token_expires
-        )
-        db.add(db_refresh_token)
+        # Store the refresh token's digest, dropping sessions beyond the per-user cap
+        token_expires = datetime.utcnow() + timedelta(days=REFRESH_TOKEN_EXPIRE_DAYS)
+        store_refresh_token(db, user.id, refresh_token, token_expires)
         db.commit()
         
         return {
@@ -212,6 +398,9 @@ def login(request: LoginRequest, db: Session = Depends(get_db)):
             "refresh_token": refresh_token,
             "token_type": "bearer"
         }
+    
+    try:
+        return await run_in_threadpool(issue_tokens)
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Login failed: {str(e)}")
 
@@ -227,12 +416,7 @@ def refresh(request: RefreshTokenRequest, db: Session = Depends(get_db)):
     user_id = payload.get("sub")
     
     # Check if refresh token exists in database
-    db_token = db.query(RefreshToken).filter(
-        RefreshToken.token == request.refresh_token,
-        RefreshToken.user_id == user_id
-    ).first()
-    
-    if not db_token or db_token.expires_at < datetime.utcnow():
+    if not active_refresh_token(db, int(user_id), request.refresh_token):
         raise HTTPException(status_code=401, detail="Refresh token expired")
     
     try:
@@ -248,22 +432,34 @@ def refresh(request: RefreshTokenRequest, db: Session = Depends(get_db)):
         raise HTTPException(status_code=500, detail=f"Token refresh failed: {str(e)}")
 
 @app.post("/logout")
-def logout(refresh_token: str, db: Session = Depends(get_db), current_user: User = Depends(get_current_user)):
+def logout(refresh_token: str, authorization: Optional[str] = Header(None), db: Session = Depends(get_db), current_user_id: int = Depends(get_current_user_id)):
     """Logout user by deleting refresh token."""
     
+    forget_token(bearer_token(authorization))
     try:
-        db.query(RefreshToken).filter(
-            RefreshToken.token == refresh_token,
-            RefreshToken.user_id == current_user.id
-        ).delete()
+        revoke_refresh_token(db, current_user_id, refresh_token)
         db.commit()
         
         return {"message": "Logout successful"}
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Logout failed: {str(e)}")
 
+@app.post("/logout-all")
+def logout_all(db: Session = Depends(get_db), current_user_id: int = Depends(get_current_user_id)):
+    """Revoke every refresh token of the current user, signing out all devices."""
+    
+    try:
+        revoked = revoke_all_sessions(db, current_user_id)
+        db.commit()
+    except Exception as e:
+        db.rollback()
+        raise HTTPException(status_code=500, detail=f"Logout failed: {str(e)}")
+    evict_user(current_user_id)
+    
+    return {"message": "Logged out of all sessions", "revoked_sessions": revoked}
+
 @app.get("/me")
-def get_me(current_user: User = Depends(get_current_user)):
+def get_me(current_user: UserPrincipal = Depends(get_current_user)):
     """Get current user info."""
     return {
         "user_id": current_user.id,
@@ -273,8 +469,8 @@ def get_me(current_user: User = Depends(get_current_user)):
 
 # ==================== PROTECTED RESUME ENDPOINTS ====================
 
-@app.post("/upload")
-async def upload_resume(file: UploadFile = File(...), db: Session = Depends(get_db), current_user: User = Depends(get_current_user)):
+@app.post("/upload", dependencies=[Depends(rate_limited(upload_limiter))])
+async def upload_resume(file: UploadFile = File(...), db: Session = Depends(get_db), current_user_id: int = Depends(get_current_user_id)):
     """Upload resume (protected)."""
     if file.filename == "":
         raise HTTPException(status_code=400, detail="No file selected")
@@ -285,28 +481,49 @@ async def upload_resume(file: UploadFile = File(...), db: Session = Depends(get_
     if file_ext not in allowed_extensions:
         raise HTTPException(status_code=400, detail="File must be PDF or DOCX")
     
+    file_type = "pdf" if file_ext == ".pdf" else "docx"
     try:
-        file_path = os.path.join(UPLOAD_DIR, f"{current_user.id}_{file.filename}")
-        with open(file_path, "wb") as buffer:
-            shutil.copyfileobj(file.file, buffer)
-        
-        file_type = "pdf" if file_ext == ".pdf" else "docx"
-        parsed_data = parse_resume(file_path, file_type)
-        
+        # Small files stay in memory; larger ones go to a temp file removed below
+        upload = await run_in_threadpool(spool_upload, file.file, file_type)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    upload_bytes.observe(upload.size, current_endpoint.get(), file_type)
+    
+    def save_resume(parsed_data):
         resume_record = Resume(
-            user_id=current_user.id,
+            user_id=current_user_id,
             filename=file.filename,
             original_text=parsed_data["raw_text"],
             cleaned_text=parsed_data["cleaned_text"],
             role="data_analyst",
             level="intermediate"
         )
+        apply_resume_features(resume_record, parsed_data)
+        text_vector = resume_record.text_vector
         db.add(resume_record)
         db.commit()
+        count_documents([text_vector])
         db.refresh(resume_record)
+        return resume_record.id
+    
+    try:
+        # The endpoint is async, so database work and anything CPU-bound must
+        # leave the event loop: queries go to the threadpool, parsing and
+        # feature extraction to the worker pool
+        parsed_data = await run_in_threadpool(get_cached_parse, db, upload.content_hash)
+        if parsed_data is None:
+            if upload.data is not None:
+                parsed_data = await parse_resume_bytes_async(upload.data, file_type)
+            else:
+                parsed_data = await parse_resume_async(upload.path, file_type)
+            await run_in_threadpool(store_parse, db, upload.content_hash, parsed_data)
+        if KEEP_UPLOADS:
+            await run_in_threadpool(keep_original, upload, file_type)
+        
+        resume_id = await run_in_threadpool(save_resume, parsed_data)
         
         return {
-            "resume_id": resume_record.id,
+            "resume_id": resume_id,
             "filename": file.filename,
             "word_count": parsed_data["word_count"],
             "email": parsed_data["email"],
@@ -314,116 +531,252 @@ async def upload_resume(file: UploadFile = File(...), db: Session = Depends(get_
             "message": "Resume uploaded successfully"
         }
     
+    except asyncio.TimeoutError:
+        raise HTTPException(status_code=504, detail="Timed out while parsing the resume")
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error processing file: {str(e)}")
+    finally:
+        upload.close()
+
+@app.post("/upload/batch")
+async def upload_resume_batch(files: List[UploadFile] = File(...), db: Session = Depends(get_db), current_user_id: int = Depends(get_current_user_id)):
+    """Upload many resumes, or ZIP archives of resumes, in one request (protected)."""
+    if not files:
+        raise HTTPException(status_code=400, detail="No files selected")
+    
+    # Batches have their own per-file budget; every file, archive entries included, counts once
+    cost = await run_in_threadpool(count_batch_entries, files)
+    if cost > batch_upload_limiter.limit:
+        # Could never fit the window, so retrying would not help
+        raise HTTPException(
+            status_code=413,
+            detail=f"A batch may hold at most {min(BATCH_MAX_FILES, batch_upload_limiter.limit)} files"
+        )
+    await run_in_threadpool(enforce_rate_limit, batch_upload_limiter, current_user_id, cost)
+    
+    results, truncated = await ingest_batch(db, current_user_id, files)
+    uploaded = sum(1 for result in results if result["status"] == "uploaded")
+    
+    return {
+        "total": len(results),
+        "uploaded": uploaded,
+        "failed": len(results) - uploaded,
+        "truncated": truncated,
+        "max_files": BATCH_MAX_FILES,
+        "results": results
+    }
 
-@app.post("/analyze")
-def analyze_resume_endpoint(request: AnalyzeRequest, db: Session = Depends(get_db), current_user: User = Depends(get_current_user)):
-    """Analyze resume (protected)."""
+@app.post("/analyze", dependencies=[Depends(rate_limited(analyze_limiter))])
+def analyze_resume_endpoint(
+    request: AnalyzeRequest,
+    async_: bool = Query(False, alias="async"),
+    db: Session = Depends(get_db),
+    current_user_id: int = Depends(get_current_user_id)
+):
+    """
+    Analyze resume (protected).
+    
+    With ?async=1 the analysis is queued and a job ID is returned at once;
+    poll GET /jobs/{job_id} for the result.
+    """
     resume_id = request.resume_id
     role = request.role
     level = request.level
-    resume = db.query(Resume).filter(Resume.id == resume_id, Resume.user_id == current_user.id).first()
+    resume = db.query(Resume).filter(Resume.id == resume_id, Resume.user_id == current_user_id).first()
     
     if not resume:
         raise HTTPException(status_code=404, detail="Resume not found")
     
-    try:
-        skills = extract_skills(resume.original_text)
-        extracted_data = {
-            "raw_text": resume.original_text,
-            "cleaned_text": resume.cleaned_text,
-            "skills": skills,
-            "word_count": len(resume.cleaned_text.split())
-        }
-        
-        analysis_results = analyze_resume(extracted_data, role=role, level=level)
-        
-        analysis_record = Analysis(
-            resume_id=resume.id,
-            overall_score=analysis_results["overall_score"],
-            skill_match_score=analysis_results["skill_match_score"],
-            ats_score=analysis_results["ats_score"],
-            role=role,
-            level=level,
-            extracted_skills=json.dumps(analysis_results["all_extracted_skills"]),
-            missing_skills=json.dumps(analysis_results["missing_skills"]),
-            ats_issues=json.dumps({"status": "checked"})
+    if async_:
+        job_id = enqueue(
+            ANALYSIS_JOB,
+            {"resume_id": resume.id, "user_id": current_user_id, "role": role, "level": level},
+            user_id=current_user_id
         )
-        db.add(analysis_record)
-        db.commit()
-        db.refresh(analysis_record)
-        
-        for skill_name in analysis_results["found_required_skills"]:
-            skill = Skill(
-                analysis_id=analysis_record.id,
-                skill_name=skill_name,
-                category="required",
-                proficiency="found"
-            )
-            db.add(skill)
-        
-        for skill_name in analysis_results["found_preferred_skills"]:
-            skill = Skill(
-                analysis_id=analysis_record.id,
-                skill_name=skill_name,
-                category="preferred",
-                proficiency="found"
-            )
-            db.add(skill)
+        return JSONResponse(status_code=202, content={"job_id": job_id, "status": "queued"})
+    
+    try:
+        return store_analysis(db, resume, role, level)
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Error analyzing resume: {str(e)}")
+
+@app.get("/jobs/{job_id}")
+def get_job_status(job_id: str, current_user_id: int = Depends(get_current_user_id)):
+    """Status of a background job, with its result once it has succeeded (protected)."""
+    job = get_job(job_id)
+    if not job or job["user_id"] != current_user_id:
+        raise HTTPException(status_code=404, detail="Job not found")
+    
+    return {
+        "job_id": job["job_id"],
+        "kind": job["kind"],
+        "status": job["status"],
+        "attempts": job["attempts"],
+        "result": job["result"],
+        "error": job["error"],
+        "created_at": datetime.utcfromtimestamp(job["created_at"]).isoformat(),
+        "updated_at": datetime.utcfromtimestamp(job["updated_at"]).isoformat()
+    }
+
+@app.post("/analyze/all-roles", dependencies=[Depends(rate_limited(analyze_limiter))])
+def analyze_all_roles(request: AllRolesRequest, db: Session = Depends(get_db), current_user_id: int = Depends(get_current_user_id)):
+    """Rank every role and level for one resume in a single pass (protected)."""
+    resume = db.query(Resume).filter(Resume.id == request.resume_id, Resume.user_id == current_user_id).first()
+    
+    if not resume:
+        raise HTTPException(status_code=404, detail="Resume not found")
+    
+    try:
+        extracted_data = resume_extracted_data(resume)
+        levels = [request.level] if request.level else None
+        with score_seconds.time(current_endpoint.get(), "all"):
+            rankings = rank_roles(extracted_data, levels=levels, limit=request.limit)
         
-        db.commit()
+        for entry in rankings:
+            entry["overall_score"] = round(entry["overall_score"], 2)
+            entry["skill_match_score"] = round(entry["skill_match_score"], 2)
+            entry["ats_score"] = round(entry["ats_score"], 2)
         
         return {
-            "analysis_id": analysis_record.id,
             "resume_id": resume.id,
-            "overall_score": round(analysis_results["overall_score"], 2),
-            "skill_match_score": round(analysis_results["skill_match_score"], 2),
-            "ats_score": round(analysis_results["ats_score"], 2),
-            "found_required_skills": analysis_results["found_required_skills"],
-            "found_preferred_skills": analysis_results["found_preferred_skills"],
-            "missing_skills": analysis_results["missing_skills"],
-            "word_count": analysis_results["word_count"],
-            "role": role,
-            "level": level,
-            "timestamp": analysis_record.created_at.isoformat()
+            "filename": resume.filename,
+            "word_count": extracted_data["word_count"],
+            "best_match": rankings[0] if rankings else None,
+            "rankings": rankings
         }
     
     except Exception as e:
-        raise HTTPException(status_code=500, detail=f"Error analyzing resume: {str(e)}")
+        raise HTTPException(status_code=500, detail=f"Error ranking roles: {str(e)}")
+
+HISTORY_PAGE_SIZE = 50
+HISTORY_MAX_PAGE_SIZE = 200
+
+def encode_history_cursor(created_at, analysis_id):
+    return base64.urlsafe_b64encode(f"{created_at.isoformat()}|{analysis_id}".encode()).decode()
+
+def decode_history_cursor(cursor):
+    try:
+        created_at, analysis_id = base64.urlsafe_b64decode(cursor.encode()).decode().split("|")
+        return datetime.fromisoformat(created_at), int(analysis_id)
+    except Exception:
+        raise HTTPException(status_code=400, detail="Invalid cursor")
 
 @app.get("/history")
-def get_history(db: Session = Depends(get_db), current_user: User = Depends(get_current_user)):
-    """Get user's analysis history (protected)."""
-    # Get all resumes for this user
-    user_resumes = db.query(Resume).filter(Resume.user_id == current_user.id).all()
-    resume_ids = [r.id for r in user_resumes]
-    
-    # Get all analyses for those resumes
-    if resume_ids:
-        analyses = db.query(Analysis).filter(Analysis.resume_id.in_(resume_ids)).order_by(Analysis.created_at.desc()).all()
-    else:
-        analyses = []
-    
-    history = []
-    for analysis in analyses:
-        resume = db.query(Resume).filter(Resume.id == analysis.resume_id).first()
-        history.append({
-            "analysis_id": analysis.id,
-            "resume_id": analysis.resume_id,
-            "filename": resume.filename if resume else "Unknown",
-            "role": analysis.role,
-            "level": analysis.level,
-            "overall_score": analysis.overall_score,
-            "skill_match_score": analysis.skill_match_score,
-            "ats_score": analysis.ats_score,
-            "timestamp": analysis.created_at.isoformat()
+def get_history(
+    limit: int = HISTORY_PAGE_SIZE,
+    cursor: Optional[str] = None,
+    role: Optional[str] = None,
+    level: Optional[str] = None,
+    date_from: Optional[datetime] = None,
+    date_to: Optional[datetime] = None,
+    current_user_id: int = Depends(get_current_user_id)
+):
+    """
+    Get user's analysis history, newest first, one keyset page at a time (protected).
+    "total" counts every analysis matching the filters; "count" is the size of this page.
+    """
+    limit = max(1, min(limit, HISTORY_MAX_PAGE_SIZE))
+    
+    conditions = [Resume.user_id == current_user_id]
+    if role:
+        conditions.append(Analysis.role == role)
+    if level:
+        conditions.append(Analysis.level == level)
+    if date_from:
+        conditions.append(Analysis.created_at >= date_from)
+    if date_to:
+        conditions.append(Analysis.created_at <= date_to)
+    total_query = (
+        select(func.count()).select_from(Analysis)
+        .join(Resume, Resume.id == Analysis.resume_id).where(*conditions)
+    )
+    
+    # One joined query for only the columns the response uses
+    query = select(
+        Analysis.id, Analysis.resume_id, Resume.filename, Analysis.role, Analysis.level,
+        Analysis.overall_score, Analysis.skill_match_score, Analysis.ats_score, Analysis.created_at
+    ).join(Resume, Resume.id == Analysis.resume_id).where(*conditions)
+    if cursor:
+        cursor_created_at, cursor_id = decode_history_cursor(cursor)
+        query = query.where(or_(
+            Analysis.created_at < cursor_created_at,
+            and_(Analysis.created_at == cursor_created_at, Analysis.id < cursor_id)
+        ))
+    
+    # Fetch one extra row to learn whether another page exists
+    query = query.order_by(Analysis.created_at.desc(), Analysis.id.desc()).limit(limit + 1)
+    
+    def stream_history():
+        # Own session: the response body is produced after the endpoint returns
+        db = SessionLocal()
+        try:
+            yield '{"analyses": ['
+            count = 0
+            last_row = None
+            has_more = False
+            for row in db.execute(query.execution_options(yield_per=100)):
+                if count == limit:
+                    has_more = True
+                    break
+                yield ("," if count else "") + json.dumps({
+                    "analysis_id": row.id,
+                    "resume_id": row.resume_id,
+                    "filename": row.filename,
+                    "role": row.role,
+                    "level": row.level,
+                    "overall_score": row.overall_score,
+                    "skill_match_score": row.skill_match_score,
+                    "ats_score": row.ats_score,
+                    "timestamp": row.created_at.isoformat()
+                })
+                count += 1
+                last_row = row
+            
+            next_cursor = encode_history_cursor(last_row.created_at, last_row.id) if has_more else None
+            total = db.execute(total_query).scalar_one()
+            yield f'], "total": {total}, "count": {count}, "next_cursor": {json.dumps(next_cursor)}}}'
+        finally:
+            db.close()
+    
+    return StreamingResponse(stream_history(), media_type="application/json")
+
+@app.get("/resumes/search")
+def search_resumes_by_skill(skills: str, match: str = "all", db: Session = Depends(get_db), current_user_id: int = Depends(get_current_user_id)):
+    """Find the user's resumes containing all (or any) of a comma-separated list of skills (protected)."""
+    requested = [skill.strip().lower() for skill in skills.split(",") if skill.strip()]
+    # Role-requirement-only skills are never set on a resume, so searching for them could only come back empty
+    unknown = [skill for skill in requested if skill not in RESUME_SKILLS]
+    if not requested or unknown:
+        raise HTTPException(status_code=400, detail=f"Unknown skills: {', '.join(unknown)}" if unknown else "No skills given")
+    if match not in ("all", "any"):
+        raise HTTPException(status_code=400, detail="match must be 'all' or 'any'")
+    
+    query_mask = skills_to_mask(requested)
+    # The bitwise filter runs in the database; only matching rows come back
+    resumes = db.query(
+        Resume.id, Resume.filename, Resume.created_at,
+        Resume.skill_mask_0, Resume.skill_mask_1, Resume.skill_mask_2, Resume.skill_mask_3
+    ).filter(
+        Resume.user_id == current_user_id,
+        skill_mask_filter(Resume, query_mask, match_all=(match == "all"))
+    ).order_by(Resume.created_at.desc()).all()
+    
+    results = []
+    for resume in resumes:
+        mask = row_mask(resume)
+        results.append({
+            "resume_id": resume.id,
+            "filename": resume.filename,
+            "matched_skills": mask_to_skills(mask & query_mask),
+            "matched_count": skill_overlap(mask, query_mask),
+            "total_skills": mask.bit_count(),
+            "created_at": resume.created_at.isoformat()
         })
     
-    return {"total": len(history), "analyses": history}
+    return {"skills": requested, "match": match, "total": len(results), "resumes": results}
 
 @app.get("/analysis/{analysis_id}")
-def get_analysis_detail(analysis_id: int, db: Session = Depends(get_db), current_user: User = Depends(get_current_user)):
+def get_analysis_detail(analysis_id: int, db: Session = Depends(get_db), current_user_id: int = Depends(get_current_user_id)):
     """Get analysis detail (protected)."""
     analysis = db.query(Analysis).filter(Analysis.id == analysis_id).first()
     
@@ -433,9 +786,11 @@ def get_analysis_detail(analysis_id: int, db: Session = Depends(get_db), current
     resume = db.query(Resume).filter(Resume.id == analysis.resume_id).first()
     
     # Ensure user owns this resume
-    if not resume or resume.user_id != current_user.id:
+    if not resume or resume.user_id != current_user_id:
         raise HTTPException(status_code=403, detail="Access denied")
     
+    if skill_writer.has_pending(analysis_id):
+        skill_writer.flush()
     skills = db.query(Skill).filter(Skill.analysis_id == analysis_id).all()
     
     return {
@@ -453,9 +808,19 @@ def get_analysis_detail(analysis_id: int, db: Session = Depends(get_db), current
         "timestamp": analysis.created_at.isoformat()
     }
 
-@app.get("/report/{analysis_id}")
-def download_report(analysis_id: int, db: Session = Depends(get_db), current_user: User = Depends(get_current_user)):
-    """Download PDF report (protected)."""
+@app.get("/report/{analysis_id}", dependencies=[Depends(rate_limited(report_limiter))])
+def download_report(
+    analysis_id: int,
+    if_none_match: Optional[str] = Header(None),
+    db: Session = Depends(get_db),
+    current_user_id: int = Depends(get_current_user_id)
+):
+    """
+    Download PDF report (protected).
+    
+    Reports are rendered once and cached; a request whose If-None-Match
+    matches the report's ETag gets 304 Not Modified.
+    """
     analysis = db.query(Analysis).filter(Analysis.id == analysis_id).first()
     
     if not analysis:
@@ -464,62 +829,78 @@ def download_report(analysis_id: int, db: Session = Depends(get_db), current_use
     resume = db.query(Resume).filter(Resume.id == analysis.resume_id).first()
     
     # Ensure user owns this resume
-    if not resume or resume.user_id != current_user.id:
+    if not resume or resume.user_id != current_user_id:
         raise HTTPException(status_code=403, detail="Access denied")
     
-    analysis_data = {
-        "overall_score": analysis.overall_score,
-        "skill_match_score": analysis.skill_match_score,
-        "ats_score": analysis.ats_score,
-        "extracted_skills": json.loads(analysis.extracted_skills),
-        "missing_skills": json.loads(analysis.missing_skills),
-        "role_display": analysis.role.replace("_", " ").title(),
-        "level_display": analysis.level.title(),
-        "word_count": len(resume.cleaned_text.split())
-    }
+    analysis_data = analysis_report_data(analysis, resume)
+    
+    def render():
+        with report_render_seconds.time(current_endpoint.get()):
+            return render_analysis_report(analysis_data, resume.filename, generated_at=analysis.created_at)
+    
+    etag, pdf_bytes = cached_report(report_key(analysis, resume, analysis_data), render)
+    # Browsers may keep the report but must revalidate it on every download
+    cache_headers = {"ETag": etag, "Cache-Control": "private, no-cache"}
+    
+    if etag_matches(if_none_match, etag):
+        return Response(status_code=304, headers=cache_headers)
     
-    pdf_buffer = generate_analysis_report(analysis_data, resume.filename)
     filename = f"Resume_Analysis_{analysis.id}_{datetime.now().strftime('%Y%m%d_%H%M%S')}.pdf"
+    return Response(
+        content=pdf_bytes,
+        media_type="application/pdf",
+        headers={
+            "Content-Disposition": f"attachment; filename={filename}",
+            **cache_headers
+        }
+    )
+
+@app.get("/reports/export", dependencies=[Depends(rate_limited(report_limiter))])
+async def export_reports(
+    role: Optional[str] = None,
+    level: Optional[str] = None,
+    date_from: Optional[datetime] = None,
+    date_to: Optional[datetime] = None,
+    ids: Optional[str] = None,
+    current_user_id: int = Depends(get_current_user_id)
+):
+    """Download the PDF reports of the user's analyses as one streamed ZIP, optionally filtered (protected)."""
+    analysis_ids = None
+    if ids:
+        try:
+            analysis_ids = [int(value) for value in ids.split(",") if value.strip()]
+        except ValueError:
+            raise HTTPException(status_code=400, detail="ids must be a comma-separated list of analysis IDs")
+    
+    filters = {"role": role, "level": level, "date_from": date_from, "date_to": date_to, "analysis_ids": analysis_ids}
+    count, truncated = await run_in_threadpool(count_export_reports, current_user_id, **filters)
+    if not count:
+        raise HTTPException(status_code=404, detail="No analyses match the filters")
     
+    filename = f"Resume_Reports_{datetime.now().strftime('%Y%m%d_%H%M%S')}.zip"
     return StreamingResponse(
-        iter([pdf_buffer.getvalue()]),
-        media_type="application/pdf",
+        stream_report_zip(iter_export_reports(current_user_id, count, **filters)),
+        media_type="application/zip",
         headers={
             "Content-Disposition": f"attachment; filename={filename}",
-            "Cache-Control": "no-cache, no-store, must-revalidate",
-            "Pragma": "no-cache",
-            "Expires": "0"
+            "X-Export-Count": str(count),
+            "X-Export-Truncated": "true" if truncated else "false"
         }
     )
 
 @app.post("/compare")
-def compare_resumes(request: CompareRequest, db: Session = Depends(get_db), current_user: User = Depends(get_current_user)):
+def compare_resumes(request: CompareRequest, db: Session = Depends(get_db), current_user_id: int = Depends(get_current_user_id)):
     """Compare two resumes (protected)."""
     
-    resume1 = db.query(Resume).filter(Resume.id == request.resume_id_1, Resume.user_id == current_user.id).first()
-    resume2 = db.query(Resume).filter(Resume.id == request.resume_id_2, Resume.user_id == current_user.id).first()
+    resume1 = db.query(Resume).filter(Resume.id == request.resume_id_1, Resume.user_id == current_user_id).first()
+    resume2 = db.query(Resume).filter(Resume.id == request.resume_id_2, Resume.user_id == current_user_id).first()
     
     if not resume1 or not resume2:
         raise HTTPException(status_code=404, detail="One or both resumes not found")
     
     try:
-        skills1 = extract_skills(resume1.original_text)
-        extracted_data1 = {
-            "raw_text": resume1.original_text,
-            "cleaned_text": resume1.cleaned_text,
-            "skills": skills1,
-            "word_count": len(resume1.cleaned_text.split())
-        }
-        analysis1 = analyze_resume(extracted_data1, role=request.role, level=request.level)
-        
-        skills2 = extract_skills(resume2.original_text)
-        extracted_data2 = {
-            "raw_text": resume2.original_text,
-            "cleaned_text": resume2.cleaned_text,
-            "skills": skills2,
-            "word_count": len(resume2.cleaned_text.split())
-        }
-        analysis2 = analyze_resume(extracted_data2, role=request.role, level=request.level)
+        analysis1 = analysis_result(db, resume1, request.role, request.level)
+        analysis2 = analysis_result(db, resume2, request.role, request.level)
         
         tech_skills1 = set(analysis1["all_extracted_skills"].get("technical", []))
         tech_skills2 = set(analysis2["all_extracted_skills"].get("technical", []))
@@ -535,7 +916,7 @@ def compare_resumes(request: CompareRequest, db: Session = Depends(get_db), curr
                 "overall_score": analysis1["overall_score"],
                 "skill_match_score": analysis1["skill_match_score"],
                 "ats_score": analysis1["ats_score"],
-                "word_count": len(resume1.cleaned_text.split()),
+                "word_count": analysis1["word_count"],
                 "skills": analysis1["all_extracted_skills"]
             },
             "resume2": {
@@ -544,7 +925,7 @@ def compare_resumes(request: CompareRequest, db: Session = Depends(get_db), curr
                 "overall_score": analysis2["overall_score"],
                 "skill_match_score": analysis2["skill_match_score"],
                 "ats_score": analysis2["ats_score"],
-                "word_count": len(resume2.cleaned_text.split()),
+                "word_count": analysis2["word_count"],
                 "skills": analysis2["all_extracted_skills"]
             },
             "comparison": {
@@ -564,65 +945,78 @@ def compare_resumes(request: CompareRequest, db: Session = Depends(get_db), curr
         raise HTTPException(status_code=500, detail=f"Error comparing resumes: {str(e)}")
 
 @app.post("/match-job-description")
-def match_job_description(request: JobDescriptionRequest, db: Session = Depends(get_db), current_user: User = Depends(get_current_user)):
+def match_job_description(request: JobDescriptionRequest, db: Session = Depends(get_db), current_user_id: int = Depends(get_current_user_id)):
     """Match resume against job description (protected)."""
     
-    resume = db.query(Resume).filter(Resume.id == request.resume_id, Resume.user_id == current_user.id).first()
+    resume = db.query(Resume).filter(Resume.id == request.resume_id, Resume.user_id == current_user_id).first()
     
     if not resume:
         raise HTTPException(status_code=404, detail="Resume not found")
     
     try:
-        resume_skills = extract_skills(resume.original_text)
+        resume_skills = resume_extracted_data(resume)["skills"]
         job_desc_skills = extract_skills(request.job_description)
         
-        resume_tech = set(resume_skills.get("technical", []))
-        job_tech = set(job_desc_skills.get("technical", []))
-        
-        resume_business = set(resume_skills.get("business", []))
-        job_business = set(job_desc_skills.get("business", []))
-        
-        tech_match = len(resume_tech & job_tech)
-        tech_required = len(job_tech)
-        business_match = len(resume_business & job_business)
-        business_required = len(job_business)
-        
-        total_job_skills = tech_required + business_required
-        matched_skills = tech_match + business_match
-        
-        match_percentage = (matched_skills / total_job_skills * 100) if total_job_skills > 0 else 0
-        
-        if match_percentage >= 80:
-            fit_level = "Excellent Match"
-        elif match_percentage >= 60:
-            fit_level = "Good Match"
-        elif match_percentage >= 40:
-            fit_level = "Moderate Match"
-        else:
-            fit_level = "Poor Match"
-        
-        missing_tech = job_tech - resume_tech
-        missing_business = job_business - resume_business
+        match = match_job_skills(resume_skills, job_desc_skills)
+        match_percentage = match["match_percentage"]
+        missing_tech = match["technical_skills"]["missing"]
+        text_similarity = float(similarity_scores(request.job_description, [resume_term_vector(resume)])[0])
         
         return {
             "job_title": request.job_title,
             "resume_id": resume.id,
             "resume_filename": resume.filename,
             "match_percentage": round(match_percentage, 2),
-            "fit_level": fit_level,
-            "technical_skills": {
-                "matched": list(resume_tech & job_tech),
-                "missing": list(missing_tech),
-                "match_count": tech_match,
-                "required_count": tech_required
-            },
-            "business_skills": {
-                "matched": list(resume_business & job_business),
-                "missing": list(missing_business),
-                "match_count": business_match,
-                "required_count": business_required
-            },
-            "recommendation": f"You match {match_percentage:.0f}% of the job requirements. Focus on acquiring: {', '.join(list(missing_tech)[:5]) if missing_tech else 'none'}",
+            "fit_level": match["fit_level"],
+            "text_similarity": round(text_similarity, 2),
+            "combined_match": round(combined_job_match(match_percentage, text_similarity), 2),
+            "technical_skills": match["technical_skills"],
+            "business_skills": match["business_skills"],
+            "recommendation": f"You match {match_percentage:.0f}% of the job requirements. Focus on acquiring: {', '.join(missing_tech[:5]) if missing_tech else 'none'}",
+            "timestamp": datetime.now().isoformat()
+        }
+    
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Error matching job description: {str(e)}")
+
+@app.post("/match-job-description/portfolio")
+def match_job_description_portfolio(request: PortfolioJobDescriptionRequest, db: Session = Depends(get_db), current_user_id: int = Depends(get_current_user_id)):
+    """Match one job description against all (or selected) resumes of the user (protected)."""
+    
+    query = db.query(Resume).filter(Resume.user_id == current_user_id)
+    if request.resume_ids:
+        query = query.filter(Resume.id.in_(request.resume_ids))
+    resumes = query.options(undefer(Resume.text_vector)).all()
+    
+    if not resumes:
+        raise HTTPException(status_code=404, detail="No resumes found")
+    
+    try:
+        job_desc_skills = extract_skills(request.job_description)
+        similarities = similarity_scores(request.job_description, [resume_term_vector(resume) for resume in resumes])
+        
+        results = []
+        for resume, text_similarity in zip(resumes, similarities):
+            match = match_job_skills(resume_extracted_data(resume)["skills"], job_desc_skills)
+            text_similarity = float(text_similarity)
+            results.append({
+                "resume_id": resume.id,
+                "resume_filename": resume.filename,
+                "match_percentage": round(match["match_percentage"], 2),
+                "fit_level": match["fit_level"],
+                "text_similarity": round(text_similarity, 2),
+                "combined_match": round(combined_job_match(match["match_percentage"], text_similarity), 2),
+                "technical_skills": match["technical_skills"],
+                "business_skills": match["business_skills"]
+            })
+        
+        results.sort(key=lambda result: result["combined_match"], reverse=True)
+        
+        return {
+            "job_title": request.job_title,
+            "total": len(results),
+            "best_match": results[0],
+            "results": results,
             "timestamp": datetime.now().isoformat()
         }
     
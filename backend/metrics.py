@@ -0,0 +1,213 @@
+"""
+Prometheus metrics for the request pipeline, served at /metrics.
+
+Histograms and counters keep one series table per thread, so recording a
+value takes no lock and only touches memory owned by the calling thread; the
+tables are summed when /metrics is scraped. That keeps instrumentation cheap
+enough to leave on in production.
+
+Stage metrics are labelled with the route of the request that caused them
+(e.g. "/report/{analysis_id}"), taken from a context variable set by
+MetricsMiddleware and inherited by threadpool calls. Work outside a request,
+such as background jobs, is labelled "background". Parsing runs in worker
+processes, so parse_resume returns its stage timings and the caller records
+them here with observe_parse_timings.
+"""
+import threading
+import time
+from bisect import bisect_left
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from sqlalchemy import event
+from starlette.routing import Match
+
+DURATION_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30)
+BYTE_BUCKETS = (10_000, 50_000, 100_000, 250_000, 500_000, 1_000_000, 2_500_000, 5_000_000, 10_000_000, 25_000_000)
+
+current_endpoint = ContextVar("metrics_endpoint", default="background")
+
+_registry = []
+
+def _escape(value):
+    return str(value).replace("\\", "\\\\").replace("\"", "\\\"").replace("\n", "\\n")
+
+def _format_labels(names, values, extra=""):
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+def _format_number(value):
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+class _ShardedMetric:
+    """Per-thread series tables, created on a thread's first observation."""
+
+    kind = None
+
+    def __init__(self, name, documentation, labelnames=()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._local = threading.local()
+        self._shards = []
+        self._lock = threading.Lock()
+        _registry.append(self)
+
+    def _series_table(self):
+        table = getattr(self._local, "table", None)
+        if table is None:
+            table = self._local.table = {}
+            with self._lock:
+                self._shards.append(table)
+        return table
+
+    def _merged(self, merge, empty):
+        with self._lock:
+            shards = list(self._shards)
+        merged = {}
+        for table in shards:
+            for labels, series in list(table.items()):
+                merged[labels] = merge(merged.get(labels, empty()), series)
+        return merged
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.kind}"]
+        lines.extend(self._render_samples())
+        return lines
+
+class Counter(_ShardedMetric):
+    kind = "counter"
+
+    def inc(self, *labels, amount=1):
+        table = self._series_table()
+        table[labels] = table.get(labels, 0) + amount
+
+    def values(self):
+        return self._merged(lambda total, value: total + value, int)
+
+    def _render_samples(self):
+        for labels, value in sorted(self.values().items()):
+            yield f"{self.name}_total{_format_labels(self.labelnames, labels)} {_format_number(value)}"
+
+class Histogram(_ShardedMetric):
+    kind = "histogram"
+
+    def __init__(self, name, documentation, labelnames=(), buckets=DURATION_BUCKETS):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(buckets)
+
+    def observe(self, value, *labels):
+        table = self._series_table()
+        series = table.get(labels)
+        if series is None:
+            # Per-bucket counts, the +Inf bucket, then the sum
+            series = table[labels] = [0] * (len(self.buckets) + 1) + [0.0]
+        series[bisect_left(self.buckets, value)] += 1
+        series[-1] += value
+
+    @contextmanager
+    def time(self, *labels):
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - started, *labels)
+
+    def values(self):
+        size = len(self.buckets) + 2
+        return self._merged(lambda total, series: [a + b for a, b in zip(total, series)], lambda: [0] * size)
+
+    def _render_samples(self):
+        bounds = [_format_number(float(bound)) for bound in self.buckets] + ["+Inf"]
+        for labels, series in sorted(self.values().items()):
+            cumulative = 0
+            for bound, count in zip(bounds, series):
+                cumulative += count
+                le = f'le="{bound}"'
+                yield f"{self.name}_bucket{_format_labels(self.labelnames, labels, le)} {cumulative}"
+            label_text = _format_labels(self.labelnames, labels)
+            yield f"{self.name}_sum{label_text} {_format_number(series[-1])}"
+            yield f"{self.name}_count{label_text} {cumulative}"
+
+request_seconds = Histogram(
+    "http_request_duration_seconds", "Time to send the full response, by route", ("endpoint", "method", "status")
+)
+upload_bytes = Histogram(
+    "resume_upload_bytes", "Size of uploaded resume files", ("endpoint", "file_type"), buckets=BYTE_BUCKETS
+)
+parse_stage_seconds = Histogram(
+    "resume_parse_stage_seconds",
+    "Time spent in each parsing stage: extract (pdfplumber/python-docx), clean, skills, contacts and features",
+    ("endpoint", "stage", "file_type")
+)
+score_seconds = Histogram("resume_score_seconds", "Time to score a resume against a role", ("endpoint", "role"))
+db_commit_seconds = Histogram("db_commit_seconds", "Time to flush and commit a database session", ("endpoint",))
+report_render_seconds = Histogram("report_render_seconds", "Time to render a PDF report", ("endpoint",))
+password_hash_seconds = Histogram(
+    "password_hash_seconds", "Time spent in bcrypt, excluding the wait for an executor slot", ("operation",)
+)
+password_hash_rejected = Counter(
+    "password_hash_rejected", "Requests turned away because the bcrypt executor was full", ("operation",)
+)
+
+def observe_parse_timings(timings, file_type):
+    """Record the stage timings returned by parse_resume."""
+    endpoint = current_endpoint.get()
+    for stage, seconds in (timings or {}).items():
+        parse_stage_seconds.observe(seconds, endpoint, stage, file_type)
+
+def instrument_sessions(session_factory):
+    """Record every commit of sessions from session_factory, flush included, in db_commit_seconds."""
+    @event.listens_for(session_factory, "before_commit")
+    def _commit_started(session):
+        session.info["commit_started"] = time.perf_counter()
+
+    @event.listens_for(session_factory, "after_commit")
+    def _commit_finished(session):
+        started = session.info.pop("commit_started", None)
+        if started is not None:
+            db_commit_seconds.observe(time.perf_counter() - started, current_endpoint.get())
+
+def render_metrics():
+    """Every registered metric in the Prometheus text exposition format."""
+    lines = []
+    for metric in _registry:
+        lines.extend(metric.render())
+    return "\n".join(lines) + "\n"
+
+def route_template(scope):
+    """Path template of the route that serves scope, so IDs do not become label values."""
+    app = scope.get("app")
+    for route in getattr(app, "routes", ()):
+        match, _ = route.matches(scope)
+        if match == Match.FULL:
+            return route.path
+    return "unmatched"
+
+class MetricsMiddleware:
+    """Times each HTTP request and exposes its route to stage metrics via current_endpoint."""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        endpoint = route_template(scope)
+        token = current_endpoint.set(endpoint)
+        status = [500]
+
+        async def send_with_status(message):
+            if message["type"] == "http.response.start":
+                status[0] = message["status"]
+            await send(message)
+
+        started = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_with_status)
+        finally:
+            request_seconds.observe(time.perf_counter() - started, endpoint, scope["method"], str(status[0]))
+            current_endpoint.reset(token)
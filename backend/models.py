@@ -1,8 +1,8 @@
-from sqlalchemy import Column, Integer, String, Float, DateTime, Text, JSON, ForeignKey
-from sqlalchemy.ext.declarative import declarative_base
+from sqlalchemy import Column, Integer, String, Float, DateTime, Text, JSON, ForeignKey, UniqueConstraint, Boolean, BigInteger, LargeBinary, Index
+from sqlalchemy.orm import deferred
 from datetime import datetime
 
-Base = declarative_base()
+from database import Base
 
 class User(Base):
     __tablename__ = "users"
@@ -17,8 +17,24 @@ class RefreshToken(Base):
     
     id = Column(Integer, primary_key=True, index=True)
     user_id = Column(Integer, ForeignKey("users.id"), index=True)
-    token = Column(String, unique=True, index=True)
-    expires_at = Column(DateTime)
+    # SHA-256 hex digest of the refresh JWT, kept in the original "token" column
+    token_hash = Column("token", String(64), unique=True, index=True)
+    expires_at = Column(DateTime, index=True)
+    created_at = Column(DateTime, default=datetime.utcnow)
+
+class ParsedDocument(Base):
+    __tablename__ = "parsed_documents"
+    __table_args__ = (UniqueConstraint("content_hash", "parser_version", name="uq_parsed_documents_hash_version"),)
+    
+    id = Column(Integer, primary_key=True, index=True)
+    content_hash = Column(String(64), index=True)
+    parser_version = Column(String(16))
+    raw_text = Column(Text)
+    cleaned_text = Column(Text)
+    skills = Column(Text)
+    email = Column(String)
+    phone = Column(Text)
+    word_count = Column(Integer)
     created_at = Column(DateTime, default=datetime.utcnow)
 
 class Resume(Base):
@@ -27,14 +43,31 @@ class Resume(Base):
     id = Column(Integer, primary_key=True, index=True)
     user_id = Column(Integer, ForeignKey("users.id"), index=True)
     filename = Column(String, index=True)
-    original_text = Column(Text)
-    cleaned_text = Column(Text)
+    # Full text is only loaded on access; scoring reads the feature columns below
+    original_text = deferred(Column(Text))
+    cleaned_text = deferred(Column(Text))
     role = Column(String, default="data_analyst")
     level = Column(String, default="intermediate")
+    skills = Column(Text)
+    word_count = Column(Integer)
+    has_email = Column(Boolean)
+    has_phone = Column(Boolean)
+    ats_features = Column(Text)
+    # Skill set as a bitmask over skill_bitmask.SKILL_ID_ORDER, low word first
+    skill_mask_0 = Column(BigInteger)
+    skill_mask_1 = Column(BigInteger)
+    skill_mask_2 = Column(BigInteger)
+    skill_mask_3 = Column(BigInteger)
+    # Sparse term-frequency vector, see text_similarity.serialize_vector
+    text_vector = deferred(Column(LargeBinary))
     created_at = Column(DateTime, default=datetime.utcnow, index=True)
 
 class Analysis(Base):
     __tablename__ = "analyses"
+    __table_args__ = (
+        Index("ix_analyses_resume_id_created_at", "resume_id", "created_at"),
+        Index("ix_analyses_resume_role_level_version", "resume_id", "role", "level", "engine_version"),
+    )
     
     id = Column(Integer, primary_key=True, index=True)
     resume_id = Column(Integer, index=True)
@@ -46,6 +79,13 @@ class Analysis(Base):
     extracted_skills = Column(Text)
     missing_skills = Column(Text)
     ats_issues = Column(Text)
+    # Skill set as a bitmask over skill_bitmask.SKILL_ID_ORDER, low word first
+    skill_mask_0 = Column(BigInteger)
+    skill_mask_1 = Column(BigInteger)
+    skill_mask_2 = Column(BigInteger)
+    skill_mask_3 = Column(BigInteger)
+    # analytics_engine.ENGINE_VERSION that produced the scores
+    engine_version = Column(String(16))
     created_at = Column(DateTime, default=datetime.utcnow, index=True)
 
 class Skill(Base):
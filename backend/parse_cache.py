@@ -0,0 +1,92 @@
+"""
+Content-addressed cache of parsed resumes.
+
+Uploads are keyed by the SHA-256 of their bytes plus PARSER_VERSION, so a
+re-upload of the same file skips text extraction. Lookups go through an
+in-process LRU first and fall back to the parsed_documents table, which
+survives restarts. A change to SKILL_DICTIONARY changes PARSER_VERSION and
+leaves old entries unreachable.
+"""
+import json
+import os
+
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.exc import IntegrityError
+
+from cache import LRUCache
+from models import ParsedDocument
+from resume_parser import PARSER_VERSION
+
+PARSE_CACHE_SIZE = int(os.getenv("PARSE_CACHE_SIZE", "256"))
+
+_parse_cache = LRUCache(maxsize=PARSE_CACHE_SIZE)
+
+def get_cached_parse(db, content_hash):
+    """Return the cached parse for content_hash under the current parser version, or None."""
+    key = (content_hash, PARSER_VERSION)
+    parsed = _parse_cache.get(key)
+    if parsed is not None:
+        return parsed
+
+    row = db.query(ParsedDocument).filter(
+        ParsedDocument.content_hash == content_hash,
+        ParsedDocument.parser_version == PARSER_VERSION
+    ).first()
+    if not row:
+        return None
+
+    parsed = {
+        "raw_text": row.raw_text,
+        "cleaned_text": row.cleaned_text,
+        "skills": json.loads(row.skills),
+        "email": row.email,
+        "phone": json.loads(row.phone),
+        "word_count": row.word_count
+    }
+    _parse_cache.set(key, parsed)
+    return parsed
+
+def _parsed_document_values(content_hash, parsed):
+    return {
+        "content_hash": content_hash,
+        "parser_version": PARSER_VERSION,
+        "raw_text": parsed["raw_text"],
+        "cleaned_text": parsed["cleaned_text"],
+        "skills": json.dumps(parsed["skills"]),
+        "email": parsed["email"],
+        "phone": json.dumps(parsed["phone"]),
+        "word_count": parsed["word_count"]
+    }
+
+def store_parse(db, content_hash, parsed):
+    """Remember a fresh parse in the LRU and the parsed_documents table."""
+    _parse_cache.set((content_hash, PARSER_VERSION), parsed)
+
+    db.add(ParsedDocument(**_parsed_document_values(content_hash, parsed)))
+    try:
+        db.commit()
+    except IntegrityError:
+        # A concurrent upload of the same file stored it first
+        db.rollback()
+
+def store_parses(db, parses):
+    """
+    Bulk form of store_parse for batch uploads: one multi-row INSERT that skips
+    hashes already stored. Runs in the caller's transaction without committing,
+    so the rows land together with the resumes that use them.
+    """
+    if not parses:
+        return
+    for content_hash, parsed in parses.items():
+        _parse_cache.set((content_hash, PARSER_VERSION), parsed)
+
+    rows = [_parsed_document_values(content_hash, parsed) for content_hash, parsed in parses.items()]
+    dialect = db.get_bind().dialect.name
+    if dialect == "postgresql":
+        statement = postgresql.insert(ParsedDocument).on_conflict_do_nothing()
+    elif dialect == "sqlite":
+        statement = sqlite.insert(ParsedDocument).on_conflict_do_nothing()
+    else:
+        # No portable upsert; the LRU still holds the parses for this process
+        return
+    db.execute(statement, rows)
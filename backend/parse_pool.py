@@ -0,0 +1,149 @@
+"""
+Process pools for CPU-bound resume parsing and report rendering.
+
+pdfplumber layout analysis and python-docx loading hold the GIL for seconds
+on large files, so they run in worker processes and the event loop only
+awaits the result. Parse workers are replaced after a fixed number of tasks
+to return memory that pdfminer never gives back. Bulk report rendering has
+its own pool so an export does not queue ahead of uploads.
+
+Every task runs under the caller's deadline inside its worker as well.
+SIGALRM interrupts it when the caller stops waiting, so a pathological PDF frees its worker instead of holding
+it while the caller has already been answered with a timeout. A task stuck in
+C code that never returns to the interpreter cannot be interrupted; for
+that, faulthandler exits the worker PARSE_KILL_GRACE_SECONDS later and the
+broken pool is replaced. A dead worker breaks the whole ProcessPoolExecutor,
+failing the tasks other callers had in flight as well, so run_in_pool retries
+those once on the replacement pool; a task that breaks the pool twice fails
+with BrokenProcessPool.
+"""
+import asyncio
+import faulthandler
+import multiprocessing
+import os
+import signal
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+
+from metrics import observe_parse_timings
+from resume_features import resume_feature_values
+from resume_parser import parse_resume, parse_resume_bytes
+
+PARSE_POOL_SIZE = int(os.getenv("PARSE_POOL_SIZE", "2"))
+PARSE_TIMEOUT_SECONDS = float(os.getenv("PARSE_TIMEOUT_SECONDS", "30"))
+PARSE_MAX_TASKS_PER_WORKER = int(os.getenv("PARSE_MAX_TASKS_PER_WORKER", "50"))
+RENDER_POOL_SIZE = int(os.getenv("RENDER_POOL_SIZE", str(PARSE_POOL_SIZE)))
+PARSE_KILL_GRACE_SECONDS = float(os.getenv("PARSE_KILL_GRACE_SECONDS", "5"))
+
+PARSE_POOL = "parse"
+RENDER_POOL = "render"
+
+_executors = {}
+_executor_lock = threading.Lock()
+
+def _create_executor(pool):
+    # Recycled workers fork from a server that has already imported the
+    # parser and renderer, so a replacement starts without re-importing them
+    context = multiprocessing.get_context("forkserver")
+    context.set_forkserver_preload(["parse_pool", "resume_parser", "resume_features", "report_generator"])
+    if pool == RENDER_POOL:
+        # ReportLab does not hold on to memory the way pdfminer does, and
+        # recycling workers stalls a pool that is kept busy
+        return ProcessPoolExecutor(max_workers=RENDER_POOL_SIZE, mp_context=context)
+    return ProcessPoolExecutor(
+        max_workers=PARSE_POOL_SIZE,
+        mp_context=context,
+        max_tasks_per_child=PARSE_MAX_TASKS_PER_WORKER
+    )
+
+def get_executor(pool=PARSE_POOL):
+    """Return the shared pool (PARSE_POOL or RENDER_POOL), creating it on first use."""
+    with _executor_lock:
+        if pool not in _executors:
+            _executors[pool] = _create_executor(pool)
+        return _executors[pool]
+
+def shutdown_executor(wait=True, pool=None):
+    """Stop one pool, or all of them; the next call to get_executor starts a fresh one."""
+    with _executor_lock:
+        names = [pool] if pool else list(_executors)
+        executors = [_executors.pop(name) for name in names if name in _executors]
+    for executor in executors:
+        executor.shutdown(wait=wait, cancel_futures=True)
+
+def _discard_executor(pool, executor):
+    """Drop a broken pool, unless another request has already replaced it."""
+    with _executor_lock:
+        if _executors.get(pool) is executor:
+            del _executors[pool]
+    executor.shutdown(wait=False, cancel_futures=True)
+
+class _DeadlineExceeded(BaseException):
+    """Raised by SIGALRM; a BaseException so parsers' "except Exception" cannot swallow it."""
+
+def _raise_deadline_exceeded(signum, frame):
+    raise _DeadlineExceeded
+
+def _run_with_deadline(deadline, grace, func, *args):
+    """Run func(*args) in a worker, raising TimeoutError at deadline (a time.time() value)."""
+    remaining = deadline - time.time()
+    if remaining <= 0:
+        # The caller gave up while the task was queued
+        raise TimeoutError("Task expired before it started")
+    previous_handler = signal.signal(signal.SIGALRM, _raise_deadline_exceeded)
+    signal.setitimer(signal.ITIMER_REAL, remaining)
+    faulthandler.dump_traceback_later(remaining + grace, exit=True)
+    try:
+        return func(*args)
+    except _DeadlineExceeded:
+        raise TimeoutError("Task exceeded its time limit") from None
+    finally:
+        faulthandler.cancel_dump_traceback_later()
+        signal.setitimer(signal.ITIMER_REAL, 0)
+        signal.signal(signal.SIGALRM, previous_handler)
+
+async def run_in_pool(func, *args, timeout=PARSE_TIMEOUT_SECONDS, pool=PARSE_POOL):
+    """
+    Run func(*args) in a worker pool without blocking the event loop.
+
+    Raises asyncio.TimeoutError if the task takes longer than timeout, and
+    the worker abandons the task at the same moment. A pool broken by a dead
+    worker (killed for memory, or exited by faulthandler) fails every task in
+    it; the pool is discarded and the task is retried once on a fresh one
+    within what is left of its deadline.
+    """
+    loop = asyncio.get_running_loop()
+    deadline = time.time() + timeout
+    retried = False
+    while True:
+        executor = get_executor(pool)
+        try:
+            future = loop.run_in_executor(executor, _run_with_deadline, deadline, PARSE_KILL_GRACE_SECONDS, func, *args)
+            return await asyncio.wait_for(future, timeout=deadline - time.time())
+        except BrokenProcessPool:
+            _discard_executor(pool, executor)
+            if retried or time.time() >= deadline:
+                raise
+            retried = True
+
+def _parse_with_features(parse, source, file_type):
+    """Parse in the worker and compute the Resume feature columns there too (parsed_data["features"])."""
+    parsed_data = parse(source, file_type)
+    started = time.perf_counter()
+    parsed_data["features"] = resume_feature_values(parsed_data)
+    parsed_data["timings"]["features"] = time.perf_counter() - started
+    return parsed_data
+
+def _record_timings(parsed_data, file_type):
+    observe_parse_timings(parsed_data.pop("timings", None), file_type)
+    return parsed_data
+
+async def parse_resume_async(file_path, file_type, timeout=PARSE_TIMEOUT_SECONDS):
+    parsed_data = await run_in_pool(_parse_with_features, parse_resume, file_path, file_type, timeout=timeout)
+    return _record_timings(parsed_data, file_type)
+
+async def parse_resume_bytes_async(data, file_type, timeout=PARSE_TIMEOUT_SECONDS):
+    parsed_data = await run_in_pool(_parse_with_features, parse_resume_bytes, data, file_type, timeout=timeout)
+    return _record_timings(parsed_data, file_type)
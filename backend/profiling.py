@@ -0,0 +1,311 @@
+"""
+Opt-in profiling of single requests.
+
+A request carrying X-Profile (or ?profile=) together with a valid
+X-Internal-Token is run under a profiler; every other request passes through
+after a scan of its headers and query string. Two modes are available:
+
+- cprofile: deterministic cProfile, downloaded as a .pstats file
+  (python -m pstats, snakeviz)
+- sample: stacks sampled every PROFILE_SAMPLE_INTERVAL_MS, downloaded as
+  speedscope JSON (https://www.speedscope.app)
+
+Sync endpoints and dependencies run in the threadpool, so the request's
+threadpool calls are profiled as well as the event loop. To see them,
+anyio.to_thread.run_sync is wrapped for as long as a capture runs and
+restored afterwards; meanwhile, other requests' threadpool calls pay one
+context variable lookup. Only one request is profiled at a time. The event
+loop is shared, so coroutines of other requests that run in the meantime
+show up in the profile too. Parsing and rendering run in the parse_pool
+worker processes and are not profiled; each capture says so.
+
+The last PROFILE_RING_SIZE captures are kept in memory. The response's
+X-Profile-Id header names the capture to fetch from /internal/profiles/{id}.
+"""
+import cProfile
+import hmac
+import json
+import marshal
+import os
+import pstats
+import sys
+import threading
+import time
+import uuid
+from collections import deque
+from contextlib import contextmanager
+from contextvars import ContextVar
+from datetime import datetime
+from urllib.parse import parse_qs
+
+import anyio.to_thread
+
+PROFILE_RING_SIZE = int(os.getenv("PROFILE_RING_SIZE", "20"))
+PROFILE_SAMPLE_INTERVAL_MS = float(os.getenv("PROFILE_SAMPLE_INTERVAL_MS", "1"))
+PROFILE_DEFAULT_MODE = os.getenv("PROFILE_DEFAULT_MODE", "cprofile")
+
+CPROFILE = "cprofile"
+SAMPLE = "sample"
+PROFILE_MODES = {CPROFILE, SAMPLE}
+NOT_PROFILED = "work run in the parse_pool worker processes (parsing, report rendering)"
+
+_active_capture = ContextVar("active_profile_capture", default=None)
+_capture_slot = threading.Lock()
+_captures = deque(maxlen=PROFILE_RING_SIZE)
+_captures_lock = threading.Lock()
+
+class CProfileCapture:
+    """cProfile in each thread that runs part of the request, merged into one pstats table."""
+
+    mode = CPROFILE
+
+    def __init__(self):
+        self._profiles = []
+        self._lock = threading.Lock()
+        self._loop_profile = None
+
+    def _finish_profile(self, profile):
+        profile.disable()
+        with self._lock:
+            self._profiles.append(profile)
+
+    def start(self):
+        self._loop_profile = cProfile.Profile()
+        self._loop_profile.enable()
+
+    def stop(self):
+        self._finish_profile(self._loop_profile)
+
+    def wrap(self, func):
+        def profiled(*args):
+            profile = cProfile.Profile()
+            profile.enable()
+            try:
+                return func(*args)
+            finally:
+                self._finish_profile(profile)
+        return profiled
+
+    def export(self, name="request"):
+        stats = pstats.Stats(*self._profiles)
+        return marshal.dumps(stats.stats)
+
+class SampleCapture:
+    """
+    A sampler thread reading the stacks of the threads currently working on
+    the request: the event loop throughout, and threadpool threads while they
+    run one of its calls.
+    """
+
+    mode = SAMPLE
+
+    def __init__(self, interval=PROFILE_SAMPLE_INTERVAL_MS / 1000):
+        self.interval = interval
+        self._threads = {}
+        self._lock = threading.Lock()
+        self._frames = {}
+        self._samples = {}
+        self._stop = threading.Event()
+        self._sampler = None
+        self._started = None
+        self._elapsed = 0.0
+
+    def _enter(self, name):
+        with self._lock:
+            self._threads[threading.get_ident()] = name
+
+    def _leave(self):
+        with self._lock:
+            self._threads.pop(threading.get_ident(), None)
+
+    def start(self):
+        self._enter("event loop")
+        self._started = time.perf_counter()
+        self._sampler = threading.Thread(target=self._run, name="profile-sampler", daemon=True)
+        self._sampler.start()
+
+    def stop(self):
+        self._leave()
+        self._stop.set()
+        self._sampler.join()
+        self._elapsed = time.perf_counter() - self._started
+
+    def wrap(self, func):
+        def sampled(*args):
+            self._enter(threading.current_thread().name)
+            try:
+                return func(*args)
+            finally:
+                self._leave()
+        return sampled
+
+    def _frame_index(self, code):
+        key = (code.co_qualname, code.co_filename, code.co_firstlineno)
+        index = self._frames.get(key)
+        if index is None:
+            index = self._frames[key] = len(self._frames)
+        return index
+
+    def _run(self):
+        last = time.perf_counter()
+        while not self._stop.wait(self.interval):
+            now = time.perf_counter()
+            weight, last = now - last, now
+            with self._lock:
+                threads = dict(self._threads)
+            frames = sys._current_frames()
+            for thread_id, name in threads.items():
+                frame = frames.get(thread_id)
+                stack = []
+                while frame is not None:
+                    stack.append(self._frame_index(frame.f_code))
+                    frame = frame.f_back
+                if stack:
+                    samples, weights = self._samples.setdefault((thread_id, name), ([], []))
+                    samples.append(stack[::-1])
+                    weights.append(weight)
+
+    def export(self, name="request"):
+        frames = [None] * len(self._frames)
+        for (function, filename, line), index in self._frames.items():
+            frames[index] = {"name": function, "file": filename, "line": line}
+        profiles = [
+            {
+                "type": "sampled",
+                "name": f"{thread_name} ({thread_id})",
+                "unit": "seconds",
+                "startValue": 0,
+                "endValue": self._elapsed,
+                "samples": samples,
+                "weights": weights
+            }
+            for (thread_id, thread_name), (samples, weights) in self._samples.items()
+        ]
+        return json.dumps({
+            "$schema": "https://www.speedscope.app/file-format-schema.json",
+            "name": name,
+            "exporter": "resume-analytics-profiler",
+            "shared": {"frames": frames},
+            "profiles": profiles
+        }).encode()
+
+@contextmanager
+def _threadpool_hook():
+    """
+    Wrap anyio.to_thread.run_sync while a capture runs, so it follows its
+    request into the threadpool. Callers hold _capture_slot.
+    """
+    original_run_sync = anyio.to_thread.run_sync
+
+    async def run_sync(func, *args, **kwargs):
+        capture = _active_capture.get()
+        if capture is not None:
+            func = capture.wrap(func)
+        return await original_run_sync(func, *args, **kwargs)
+
+    anyio.to_thread.run_sync = run_sync
+    try:
+        yield
+    finally:
+        anyio.to_thread.run_sync = original_run_sync
+
+def _store_capture(record):
+    with _captures_lock:
+        _captures.append(record)
+
+def list_captures():
+    """Metadata of the kept captures, newest first."""
+    with _captures_lock:
+        records = list(_captures)
+    return [{key: value for key, value in record.items() if key != "data"} for record in reversed(records)]
+
+def get_capture(capture_id):
+    with _captures_lock:
+        return next((record for record in _captures if record["id"] == capture_id), None)
+
+def requested_mode(scope):
+    """The profile mode a request asks for, or None; cheap enough to run on every request."""
+    value = None
+    for name, header_value in scope["headers"]:
+        if name == b"x-profile":
+            value = header_value.decode("latin-1")
+            break
+    if value is None:
+        query_string = scope.get("query_string", b"")
+        if b"profile=" not in query_string:
+            return None
+        value = parse_qs(query_string.decode("latin-1")).get("profile", [None])[0]
+    if not value or value.lower() in {"0", "false"}:
+        return None
+    value = value.lower()
+    return value if value in PROFILE_MODES else PROFILE_DEFAULT_MODE
+
+def _send_with_headers(send, headers):
+    async def wrapped(message):
+        if message["type"] == "http.response.start":
+            message = {**message, "headers": [*message.get("headers", []), *headers]}
+        await send(message)
+    return wrapped
+
+class ProfilingMiddleware:
+    """Runs flagged requests from callers holding the internal token under a profiler."""
+
+    def __init__(self, app, token=None):
+        self.app = app
+        self.token = token
+
+    def _authorized(self, scope):
+        if not self.token:
+            return False
+        for name, value in scope["headers"]:
+            if name == b"x-internal-token":
+                return hmac.compare_digest(value.decode("latin-1"), self.token)
+        return False
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        mode = requested_mode(scope)
+        if mode is None or not self._authorized(scope):
+            await self.app(scope, receive, send)
+            return
+        if not _capture_slot.acquire(blocking=False):
+            await self.app(scope, receive, _send_with_headers(send, [(b"x-profile-status", b"busy")]))
+            return
+
+        try:
+            capture = CProfileCapture() if mode == CPROFILE else SampleCapture()
+            capture_id = uuid.uuid4().hex[:12]
+            status = [None]
+            send_with_profile_id = _send_with_headers(send, [(b"x-profile-id", capture_id.encode())])
+
+            async def send_recording_status(message):
+                if message["type"] == "http.response.start":
+                    status[0] = message["status"]
+                await send_with_profile_id(message)
+
+            token = _active_capture.set(capture)
+            started = time.perf_counter()
+            capture.start()
+            try:
+                with _threadpool_hook():
+                    await self.app(scope, receive, send_recording_status)
+            finally:
+                capture.stop()
+                duration = time.perf_counter() - started
+                _active_capture.reset(token)
+
+            request_name = f"{scope['method']} {scope['path']}"
+            _store_capture({
+                "id": capture_id,
+                "mode": mode,
+                "request": request_name,
+                "status": status[0],
+                "duration_ms": round(duration * 1000, 3),
+                "created_at": datetime.utcnow().isoformat(),
+                "not_profiled": NOT_PROFILED,
+                "data": capture.export(request_name)
+            })
+        finally:
+            _capture_slot.release()
@@ -0,0 +1,187 @@
+"""
+Sliding-window rate limiting with bounded memory and pluggable storage.
+
+Each key keeps two counters, for the current and the previous fixed window,
+and the previous one is weighted by how much of it still overlaps the
+sliding window. A check is O(1) whatever the traffic. The backend is chosen
+with RATE_LIMIT_BACKEND:
+
+- memory: per process, capped at RATE_LIMIT_MAX_KEYS keys with least
+  recently used keys evicted first
+- sqlite: a local SQLite file (RATE_LIMIT_SQLITE_PATH) shared by every
+  worker on the host, pruned of expired keys and held to the same cap
+
+Limits are given as "count/seconds", e.g. RATE_LIMIT_LOGIN=5/300.
+"""
+import math
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+
+RATE_LIMIT_BACKEND = os.getenv("RATE_LIMIT_BACKEND", "memory")
+RATE_LIMIT_SQLITE_PATH = os.getenv("RATE_LIMIT_SQLITE_PATH", "rate_limits.sqlite")
+RATE_LIMIT_MAX_KEYS = int(os.getenv("RATE_LIMIT_MAX_KEYS", "100000"))
+SQLITE_PRUNE_EVERY = 500
+
+def parse_limit(value):
+    """Parse "count/seconds" into (count, seconds)."""
+    count, seconds = value.split("/")
+    return int(count), float(seconds)
+
+def _sliding_count(window_start, current, previous, window, now):
+    """Return the weighted request count and the advanced (window_start, current, previous)."""
+    elapsed_windows = int((now - window_start) // window)
+    if elapsed_windows >= 2:
+        window_start, current, previous = window_start + elapsed_windows * window, 0, 0
+    elif elapsed_windows == 1:
+        window_start, current, previous = window_start + window, 0, current
+    overlap = 1 - (now - window_start) / window
+    return previous * overlap + current, (window_start, current, previous)
+
+def _retry_after(window_start, window, now):
+    return max(1, math.ceil(window_start + window - now))
+
+class MemoryBackend:
+    """Per-process counters in an LRU-ordered dict of at most max_keys keys."""
+
+    def __init__(self, max_keys=RATE_LIMIT_MAX_KEYS):
+        self.max_keys = max_keys
+        self._counters = OrderedDict()
+        self._lock = threading.Lock()
+
+    def hit(self, key, limit, window, cost=1, force=False):
+        now = time.time()
+        with self._lock:
+            state = self._counters.get(key) or (now - now % window, 0, 0)
+            count, (window_start, current, previous) = _sliding_count(*state, window, now)
+            allowed = count + max(cost, 1) <= limit
+            if cost and (allowed or force):
+                self._counters[key] = (window_start, current + cost, previous)
+                self._counters.move_to_end(key)
+                while len(self._counters) > self.max_keys:
+                    self._counters.popitem(last=False)
+        return allowed, 0 if allowed else _retry_after(window_start, window, now)
+
+    def reset(self, key):
+        with self._lock:
+            self._counters.pop(key, None)
+
+class SQLiteBackend:
+    """Counters in a SQLite file, so every worker process on the host shares them."""
+
+    def __init__(self, path=RATE_LIMIT_SQLITE_PATH, max_keys=RATE_LIMIT_MAX_KEYS):
+        self.path = path
+        self.max_keys = max_keys
+        self._local = threading.local()
+        self._writes = 0
+        connection = self._connection()
+        connection.execute("PRAGMA journal_mode=WAL")
+        connection.execute("""
+            CREATE TABLE IF NOT EXISTS rate_limits (
+                key TEXT PRIMARY KEY,
+                window_start REAL NOT NULL,
+                current INTEGER NOT NULL,
+                previous INTEGER NOT NULL,
+                expires_at REAL NOT NULL
+            )
+        """)
+        connection.execute("CREATE INDEX IF NOT EXISTS ix_rate_limits_expires_at ON rate_limits(expires_at)")
+
+    def _connection(self):
+        connection = getattr(self._local, "connection", None)
+        if connection is None:
+            connection = sqlite3.connect(self.path, timeout=5, isolation_level=None)
+            connection.execute("PRAGMA synchronous=NORMAL")
+            self._local.connection = connection
+        return connection
+
+    def hit(self, key, limit, window, cost=1, force=False):
+        now = time.time()
+        connection = self._connection()
+        connection.execute("BEGIN IMMEDIATE")
+        try:
+            row = connection.execute(
+                "SELECT window_start, current, previous FROM rate_limits WHERE key = ?", (key,)
+            ).fetchone()
+            state = row or (now - now % window, 0, 0)
+            count, (window_start, current, previous) = _sliding_count(*state, window, now)
+            allowed = count + max(cost, 1) <= limit
+            if cost and (allowed or force):
+                connection.execute(
+                    "INSERT OR REPLACE INTO rate_limits (key, window_start, current, previous, expires_at) "
+                    "VALUES (?, ?, ?, ?, ?)",
+                    (key, window_start, current + cost, previous, window_start + 2 * window)
+                )
+            connection.execute("COMMIT")
+        except Exception:
+            connection.execute("ROLLBACK")
+            raise
+
+        self._writes += 1
+        if self._writes % SQLITE_PRUNE_EVERY == 0:
+            self.prune()
+        return allowed, 0 if allowed else _retry_after(window_start, window, now)
+
+    def reset(self, key):
+        self._connection().execute("DELETE FROM rate_limits WHERE key = ?", (key,))
+
+    def prune(self):
+        """Drop keys whose windows have both passed, then the soonest-expiring keys beyond max_keys."""
+        connection = self._connection()
+        connection.execute("DELETE FROM rate_limits WHERE expires_at < ?", (time.time(),))
+        connection.execute(
+            "DELETE FROM rate_limits WHERE key IN ("
+            "SELECT key FROM rate_limits ORDER BY expires_at "
+            "LIMIT MAX(0, (SELECT COUNT(*) FROM rate_limits) - ?))",
+            (self.max_keys,)
+        )
+
+def create_backend(name=RATE_LIMIT_BACKEND):
+    if name == "sqlite":
+        return SQLiteBackend()
+    if name != "memory":
+        print(f"Warning: Unknown RATE_LIMIT_BACKEND '{name}', using memory")
+    return MemoryBackend()
+
+backend = create_backend()
+
+class RateLimiter:
+    """A named limit of `limit` hits per `window` seconds for each key."""
+
+    def __init__(self, name, limit, window, store=None):
+        self.name = name
+        self.limit = limit
+        self.window = window
+        self.store = store or backend
+
+    @classmethod
+    def from_env(cls, name, default):
+        limit, window = parse_limit(os.getenv(f"RATE_LIMIT_{name.upper()}", default))
+        return cls(name, limit, window)
+
+    def _key(self, key):
+        return f"{self.name}:{key}"
+
+    def acquire(self, key, cost=1):
+        """Count a hit if it fits in the limit. Returns (allowed, retry_after_seconds)."""
+        return self.store.hit(self._key(key), self.limit, self.window, cost)
+
+    def check(self, key):
+        """Whether a hit would be allowed now, without counting one."""
+        return self.store.hit(self._key(key), self.limit, self.window, cost=0)
+
+    def record(self, key):
+        """Count a hit even past the limit, e.g. a failed login."""
+        self.store.hit(self._key(key), self.limit, self.window, force=True)
+
+    def reset(self, key):
+        self.store.reset(self._key(key))
+
+login_limiter = RateLimiter.from_env("login", "5/300")
+upload_limiter = RateLimiter.from_env("upload", "30/60")
+# Files uploaded through /upload/batch, counted per file; one full batch (BATCH_MAX_FILES) must fit the window
+batch_upload_limiter = RateLimiter.from_env("batch_upload", "1000/3600")
+analyze_limiter = RateLimiter.from_env("analyze", "60/60")
+report_limiter = RateLimiter.from_env("report", "60/60")
@@ -0,0 +1,199 @@
+"""
+Cache of rendered PDF analysis reports.
+
+An analysis never changes once stored, so its report is rendered once per
+REPORT_VERSION and kept in a size-bounded in-process LRU, plus an optional
+on-disk tier (REPORT_CACHE_DIR) shared by workers and kept across restarts.
+Reports are keyed by analysis ID plus a digest of everything the report
+shows (report_key), so after a database reset or restore reuses an ID, the
+new analysis never gets an old report from disk. Each report carries a
+strong ETag, the SHA-256 of its bytes.
+
+The disk tier is capped at REPORT_CACHE_DISK_BYTES. A disk hit touches the
+file's mtime, and pruning deletes the oldest files by mtime until the tier is
+back under 90% of the cap. Each process prunes at startup and again after
+every tenth of the cap it has written. Directories of other REPORT_VERSIONs
+are deleted at startup, since their reports can never be served again.
+"""
+import hashlib
+import json
+import os
+import shutil
+import tempfile
+import threading
+import time
+
+from cache import SizedLRUCache
+from report_generator import REPORT_VERSION
+from resume_features import resume_extracted_data
+
+REPORT_CACHE_BYTES = int(os.getenv("REPORT_CACHE_BYTES", str(32 * 1024 * 1024)))
+REPORT_CACHE_DIR = os.getenv("REPORT_CACHE_DIR")
+REPORT_CACHE_DISK_BYTES = int(os.getenv("REPORT_CACHE_DISK_BYTES", str(1024 * 1024 * 1024)))
+# Temporary files this old were left behind by a crashed writer
+STALE_TEMP_SECONDS = 3600
+
+_report_cache = SizedLRUCache(max_size=REPORT_CACHE_BYTES, sizeof=lambda entry: len(entry[1]))
+_prune_lock = threading.Lock()
+_written_since_prune = 0
+
+def report_etag(pdf_bytes):
+    return '"' + hashlib.sha256(pdf_bytes).hexdigest()[:32] + '"'
+
+def _disk_path(key):
+    return os.path.join(REPORT_CACHE_DIR, REPORT_VERSION, f"{key}.pdf")
+
+def _read_disk(key):
+    path = _disk_path(key)
+    try:
+        with open(path, "rb") as f:
+            pdf_bytes = f.read()
+    except OSError:
+        return None
+    try:
+        # Recently served reports are the last to be pruned
+        os.utime(path)
+    except OSError:
+        pass
+    return pdf_bytes
+
+def _write_disk(key, pdf_bytes):
+    path = _disk_path(key)
+    try:
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        # Write then rename, so a concurrent reader never sees a partial file
+        fd, temp_path = tempfile.mkstemp(dir=os.path.dirname(path), suffix=".tmp")
+        with os.fdopen(fd, "wb") as f:
+            f.write(pdf_bytes)
+        os.replace(temp_path, path)
+    except OSError as e:
+        print(f"Warning: Could not write report cache file {path}: {e}")
+        return
+
+    global _written_since_prune
+    with _prune_lock:
+        _written_since_prune += len(pdf_bytes)
+        due = _written_since_prune >= REPORT_CACHE_DISK_BYTES // 10
+        if due:
+            _written_since_prune = 0
+    if due:
+        prune_disk_cache()
+
+def remove_stale_versions():
+    """Delete the disk tier's directories for every REPORT_VERSION but the current one."""
+    if not REPORT_CACHE_DIR:
+        return
+    try:
+        entries = list(os.scandir(REPORT_CACHE_DIR))
+    except OSError:
+        return
+    for entry in entries:
+        if entry.is_dir(follow_symlinks=False) and entry.name != REPORT_VERSION:
+            print(f"Removing report cache for version {entry.name}")
+            shutil.rmtree(entry.path, ignore_errors=True)
+
+def prune_disk_cache():
+    """Delete the least recently used disk tier files until it is under 90% of REPORT_CACHE_DISK_BYTES."""
+    if not REPORT_CACHE_DIR:
+        return
+    files = []
+    total = 0
+    now = time.time()
+    try:
+        with os.scandir(os.path.join(REPORT_CACHE_DIR, REPORT_VERSION)) as entries:
+            for entry in entries:
+                try:
+                    stat = entry.stat(follow_symlinks=False)
+                except OSError:
+                    continue
+                if entry.name.endswith(".tmp"):
+                    if now - stat.st_mtime > STALE_TEMP_SECONDS:
+                        _remove(entry.path)
+                    continue
+                files.append((stat.st_mtime, stat.st_size, entry.path))
+                total += stat.st_size
+    except OSError:
+        return
+    if total <= REPORT_CACHE_DISK_BYTES:
+        return
+
+    target = REPORT_CACHE_DISK_BYTES * 9 // 10
+    files.sort()
+    for _, size, path in files:
+        if total <= target:
+            break
+        if _remove(path):
+            total -= size
+
+def _remove(path):
+    try:
+        os.remove(path)
+        return True
+    except OSError:
+        return False
+
+def analysis_report_data(analysis, resume):
+    """Fields of an Analysis and its Resume that generate_analysis_report renders."""
+    return {
+        "overall_score": analysis.overall_score,
+        "skill_match_score": analysis.skill_match_score,
+        "ats_score": analysis.ats_score,
+        "extracted_skills": json.loads(analysis.extracted_skills),
+        "missing_skills": json.loads(analysis.missing_skills),
+        "role_display": analysis.role.replace("_", " ").title(),
+        "level_display": analysis.level.title(),
+        "word_count": resume_extracted_data(resume)["word_count"]
+    }
+
+def report_key(analysis, resume, analysis_data=None):
+    """Cache key of an analysis report: "<analysis id>-<digest of the report's content>"."""
+    if analysis_data is None:
+        analysis_data = analysis_report_data(analysis, resume)
+    content = json.dumps([analysis_data, resume.filename, str(analysis.created_at)], sort_keys=True)
+    return f"{analysis.id}-{hashlib.sha256(content.encode()).hexdigest()[:32]}"
+
+def lookup_report(key, promote=True):
+    """
+    Return (etag, pdf_bytes) from the memory or disk tier, or None. A disk hit
+    is copied into memory unless promote is False.
+    """
+    entry = _report_cache.get((key, REPORT_VERSION))
+    if entry is not None or not REPORT_CACHE_DIR:
+        return entry
+
+    pdf_bytes = _read_disk(key)
+    if pdf_bytes is None:
+        return None
+    entry = (report_etag(pdf_bytes), pdf_bytes)
+    if promote:
+        _report_cache.set((key, REPORT_VERSION), entry)
+    return entry
+
+def store_report(key, pdf_bytes, keep_in_memory=True):
+    """Cache freshly rendered report bytes and return (etag, pdf_bytes)."""
+    if REPORT_CACHE_DIR:
+        _write_disk(key, pdf_bytes)
+    entry = (report_etag(pdf_bytes), pdf_bytes)
+    if keep_in_memory:
+        _report_cache.set((key, REPORT_VERSION), entry)
+    return entry
+
+def cached_report(key, render):
+    """
+    Return (etag, pdf_bytes) for the report under key (see report_key),
+    calling render() for the bytes only when neither the memory nor the disk
+    tier has them.
+    """
+    entry = lookup_report(key)
+    if entry is not None:
+        return entry
+    return store_report(key, render())
+
+def etag_matches(if_none_match, etag):
+    """True if an If-None-Match header value matches etag (weak comparison, per RFC 9110)."""
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == "*":
+        return True
+    candidates = [tag.strip() for tag in if_none_match.split(",")]
+    return any(tag.removeprefix("W/") == etag for tag in candidates)
@@ -0,0 +1,182 @@
+"""
+Bulk export of analysis reports as a streamed ZIP archive.
+
+The archive is written to a write-only sink and sent chunk by chunk as each
+report is added, so memory stays flat however many reports are exported.
+Reports are rendered in the render process pool, at most EXPORT_RENDER_AHEAD
+ahead of the one being written; the next render is only scheduled once the
+client has taken the previous chunk, which keeps a slow download from piling
+up rendered PDFs. Cached reports are reused; fresh renders go to the disk tier
+only, so an export does not evict interactively downloaded reports.
+
+The analyses to export are read in keyset pages of EXPORT_PAGE_SIZE as the
+archive is written, so a large export never holds all of its rows or report
+data at once. PDFs are already compressed, so archive members are stored
+rather than deflated, and no compression runs on the event loop.
+"""
+import asyncio
+import os
+import zipfile
+from collections import deque
+
+from sqlalchemy import and_, func, or_, select
+from starlette.concurrency import run_in_threadpool
+
+from database import SessionLocal
+from metrics import current_endpoint, report_render_seconds
+from models import Analysis, Resume
+from parse_pool import RENDER_POOL, RENDER_POOL_SIZE, run_in_pool
+from report_cache import analysis_report_data, lookup_report, report_key, store_report
+from report_generator import render_analysis_report
+
+EXPORT_MAX_REPORTS = int(os.getenv("EXPORT_MAX_REPORTS", "2000"))
+EXPORT_RENDER_AHEAD = int(os.getenv("EXPORT_RENDER_AHEAD", str(RENDER_POOL_SIZE * 2)))
+EXPORT_PAGE_SIZE = int(os.getenv("EXPORT_PAGE_SIZE", "100"))
+
+class _ZipChunkSink:
+    """Write-only file object for ZipFile; collects written bytes until taken."""
+
+    def __init__(self):
+        self._chunks = []
+
+    def write(self, data):
+        self._chunks.append(bytes(data))
+        return len(data)
+
+    def flush(self):
+        pass
+
+    def take(self):
+        data = b"".join(self._chunks)
+        self._chunks.clear()
+        return data
+
+def _export_conditions(user_id, role=None, level=None, date_from=None, date_to=None, analysis_ids=None):
+    conditions = [Resume.user_id == user_id]
+    if role:
+        conditions.append(Analysis.role == role)
+    if level:
+        conditions.append(Analysis.level == level)
+    if date_from:
+        conditions.append(Analysis.created_at >= date_from)
+    if date_to:
+        conditions.append(Analysis.created_at <= date_to)
+    if analysis_ids:
+        conditions.append(Analysis.id.in_(analysis_ids))
+    return conditions
+
+def count_export_reports(user_id, **filters):
+    """
+    Number of the user's reports an export with these filters contains, and
+    whether EXPORT_MAX_REPORTS truncated it.
+    """
+    query = (
+        select(func.count()).select_from(Analysis)
+        .join(Resume, Resume.id == Analysis.resume_id)
+        .where(*_export_conditions(user_id, **filters))
+    )
+    db = SessionLocal()
+    try:
+        total = db.execute(query).scalar_one()
+    finally:
+        db.close()
+    return min(total, EXPORT_MAX_REPORTS), total > EXPORT_MAX_REPORTS
+
+def load_export_page(user_id, filters, after=None, limit=EXPORT_PAGE_SIZE):
+    """
+    Everything needed to render the next limit matching reports, oldest first,
+    after the (created_at, id) position of the previous page.
+    """
+    query = (
+        select(Analysis, Resume).join(Resume, Resume.id == Analysis.resume_id)
+        .where(*_export_conditions(user_id, **filters))
+    )
+    if after is not None:
+        after_created_at, after_id = after
+        query = query.where(or_(
+            Analysis.created_at > after_created_at,
+            and_(Analysis.created_at == after_created_at, Analysis.id > after_id)
+        ))
+    query = query.order_by(Analysis.created_at, Analysis.id).limit(limit)
+
+    db = SessionLocal()
+    try:
+        reports = []
+        for analysis, resume in db.execute(query):
+            stem = os.path.splitext(os.path.basename(resume.filename or "resume"))[0]
+            analysis_data = analysis_report_data(analysis, resume)
+            reports.append({
+                "analysis_id": analysis.id,
+                "cache_key": report_key(analysis, resume, analysis_data),
+                "archive_name": f"{analysis.id}_{analysis.role}_{analysis.level}_{stem}.pdf",
+                "analysis_data": analysis_data,
+                "filename": resume.filename,
+                "generated_at": analysis.created_at
+            })
+    finally:
+        db.close()
+    return reports
+
+async def iter_export_reports(user_id, count, **filters):
+    """Yield the first count matching reports, loading one page at a time."""
+    after = None
+    while count > 0:
+        page = await run_in_threadpool(load_export_page, user_id, filters, after, min(EXPORT_PAGE_SIZE, count))
+        if not page:
+            return
+        for report in page:
+            yield report
+        count -= len(page)
+        after = (page[-1]["generated_at"], page[-1]["analysis_id"])
+
+async def _report_bytes(report):
+    entry = await run_in_threadpool(lookup_report, report["cache_key"], False)
+    if entry is not None:
+        return entry[1]
+    with report_render_seconds.time(current_endpoint.get()):
+        pdf_bytes = await run_in_pool(
+            render_analysis_report, report["analysis_data"], report["filename"], report["generated_at"],
+            pool=RENDER_POOL
+        )
+    await run_in_threadpool(store_report, report["cache_key"], pdf_bytes, False)
+    return pdf_bytes
+
+async def stream_report_zip(reports, render_ahead=EXPORT_RENDER_AHEAD):
+    """Yield a ZIP archive of the reports from an async iterator, chunk by chunk."""
+    sink = _ZipChunkSink()
+    pending = deque()
+    remaining = aiter(reports)
+    errors = []
+
+    async def schedule():
+        while len(pending) < render_ahead:
+            report = await anext(remaining, None)
+            if report is None:
+                return
+            pending.append((report, asyncio.ensure_future(_report_bytes(report))))
+
+    try:
+        with zipfile.ZipFile(sink, "w", compression=zipfile.ZIP_STORED) as archive:
+            await schedule()
+            while pending:
+                report, task = pending.popleft()
+                try:
+                    pdf_bytes = await task
+                except Exception as e:
+                    errors.append(f"{report['archive_name']}: {str(e) or type(e).__name__}")
+                    continue
+                finally:
+                    await schedule()
+
+                entry = zipfile.ZipInfo(report["archive_name"], date_time=report["generated_at"].timetuple()[:6])
+                entry.compress_type = zipfile.ZIP_STORED
+                archive.writestr(entry, pdf_bytes)
+                yield sink.take()
+
+            if errors:
+                archive.writestr("export_errors.txt", "\n".join(errors) + "\n")
+        # Closing the archive wrote the central directory
+        yield sink.take()
+    finally:
+        for _, task in pending:
+            task.cancel()
@@ -6,54 +6,99 @@ from reportlab.lib import colors
 from reportlab.lib.enums import TA_CENTER, TA_LEFT, TA_RIGHT
 from datetime import datetime
 from io import BytesIO
+import hashlib
+import inspect
+import sys
 
+# Styles are immutable once built, so every report shares one set
+styles = getSampleStyleSheet()
 
-def generate_analysis_report(analysis_data, resume_filename):
-    """Generate a PDF report for a single resume analysis."""
+analysis_title_style = ParagraphStyle(
+    'CustomTitle',
+    parent=styles['Heading1'],
+    fontSize=24,
+    textColor=colors.HexColor('#1e40af'),
+    spaceAfter=6,
+    alignment=TA_CENTER,
+)
+
+comparison_title_style = ParagraphStyle(
+    'CustomTitle',
+    parent=styles['Heading1'],
+    fontSize=22,
+    textColor=colors.HexColor('#1e40af'),
+    spaceAfter=6,
+    alignment=TA_CENTER,
+)
+
+heading_style = ParagraphStyle(
+    'CustomHeading',
+    parent=styles['Heading2'],
+    fontSize=14,
+    textColor=colors.HexColor('#1e40af'),
+    spaceAfter=12,
+    spaceBefore=12,
+)
+
+metadata_table_style = TableStyle([
+    ('FONT', (0, 0), (-1, -1), 'Helvetica', 10),
+    ('FONT', (0, 0), (0, -1), 'Helvetica-Bold', 10),
+    ('VALIGN', (0, 0), (-1, -1), 'TOP'),
+    ('TEXTCOLOR', (0, 0), (0, -1), colors.HexColor('#1e40af')),
+])
+
+scores_table_style = TableStyle([
+    ('BACKGROUND', (0, 0), (-1, 0), colors.HexColor('#1e40af')),
+    ('TEXTCOLOR', (0, 0), (-1, 0), colors.whitesmoke),
+    ('ALIGN', (0, 0), (-1, -1), 'CENTER'),
+    ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
+    ('FONTSIZE', (0, 0), (-1, 0), 11),
+    ('BOTTOMPADDING', (0, 0), (-1, 0), 12),
+    ('BACKGROUND', (0, 1), (-1, -1), colors.beige),
+    ('GRID', (0, 0), (-1, -1), 1, colors.HexColor('#d1d5db')),
+    ('FONT', (0, 1), (-1, -1), 'Helvetica', 10),
+])
+
+comparison_table_style = TableStyle([
+    ('BACKGROUND', (0, 0), (-1, 0), colors.HexColor('#1e40af')),
+    ('TEXTCOLOR', (0, 0), (-1, 0), colors.whitesmoke),
+    ('ALIGN', (0, 0), (-1, -1), 'CENTER'),
+    ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
+    ('FONTSIZE', (0, 0), (-1, 0), 10),
+    ('BOTTOMPADDING', (0, 0), (-1, 0), 12),
+    ('BACKGROUND', (0, 1), (-1, -1), colors.beige),
+    ('GRID', (0, 0), (-1, -1), 1, colors.HexColor('#d1d5db')),
+    ('FONT', (0, 1), (-1, -1), 'Helvetica', 9),
+])
+
+
+def generate_analysis_report(analysis_data, resume_filename, generated_at=None):
+    """
+    Generate a PDF report for a single resume analysis.
+    
+    With a fixed generated_at the output is byte-for-byte reproducible, so the
+    rendered report can be cached and served with a strong ETag.
+    """
+    generated_at = generated_at or datetime.now()
     
     buffer = BytesIO()
-    doc = SimpleDocTemplate(buffer, pagesize=letter, topMargin=0.5*inch, bottomMargin=0.5*inch)
-    styles = getSampleStyleSheet()
+    doc = SimpleDocTemplate(buffer, pagesize=letter, topMargin=0.5*inch, bottomMargin=0.5*inch, invariant=1)
     story = []
     
-    # Custom styles
-    title_style = ParagraphStyle(
-        'CustomTitle',
-        parent=styles['Heading1'],
-        fontSize=24,
-        textColor=colors.HexColor('#1e40af'),
-        spaceAfter=6,
-        alignment=TA_CENTER,
-    )
-    
-    heading_style = ParagraphStyle(
-        'CustomHeading',
-        parent=styles['Heading2'],
-        fontSize=14,
-        textColor=colors.HexColor('#1e40af'),
-        spaceAfter=12,
-        spaceBefore=12,
-    )
-    
     # Title
-    story.append(Paragraph("Resume Analysis Report", title_style))
+    story.append(Paragraph("Resume Analysis Report", analysis_title_style))
     story.append(Spacer(1, 0.2*inch))
     
     # Report metadata
     metadata = [
         ['File Name:', resume_filename],
-        ['Generated:', datetime.now().strftime("%B %d, %Y at %I:%M %p")],
+        ['Generated:', generated_at.strftime("%B %d, %Y at %I:%M %p")],
         ['Role:', analysis_data.get('role_display', 'N/A')],
         ['Level:', analysis_data.get('level_display', 'N/A')],
     ]
     
     metadata_table = Table(metadata, colWidths=[1.5*inch, 4*inch])
-    metadata_table.setStyle(TableStyle([
-        ('FONT', (0, 0), (-1, -1), 'Helvetica', 10),
-        ('FONT', (0, 0), (0, -1), 'Helvetica-Bold', 10),
-        ('VALIGN', (0, 0), (-1, -1), 'TOP'),
-        ('TEXTCOLOR', (0, 0), (0, -1), colors.HexColor('#1e40af')),
-    ]))
+    metadata_table.setStyle(metadata_table_style)
     story.append(metadata_table)
     story.append(Spacer(1, 0.3*inch))
     
@@ -68,17 +113,7 @@ def generate_analysis_report(analysis_data, resume_filename):
     ]
     
     scores_table = Table(scores_data, colWidths=[2*inch, 2*inch, 1*inch])
-    scores_table.setStyle(TableStyle([
-        ('BACKGROUND', (0, 0), (-1, 0), colors.HexColor('#1e40af')),
-        ('TEXTCOLOR', (0, 0), (-1, 0), colors.whitesmoke),
-        ('ALIGN', (0, 0), (-1, -1), 'CENTER'),
-        ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
-        ('FONTSIZE', (0, 0), (-1, 0), 11),
-        ('BOTTOMPADDING', (0, 0), (-1, 0), 12),
-        ('BACKGROUND', (0, 1), (-1, -1), colors.beige),
-        ('GRID', (0, 0), (-1, -1), 1, colors.HexColor('#d1d5db')),
-        ('FONT', (0, 1), (-1, -1), 'Helvetica', 10),
-    ]))
+    scores_table.setStyle(scores_table_style)
     story.append(scores_table)
     story.append(Spacer(1, 0.3*inch))
     
@@ -155,7 +190,7 @@ def generate_analysis_report(analysis_data, resume_filename):
     
     # Footer
     story.append(Spacer(1, 0.2*inch))
-    footer_text = "Resume Analytics Platform | Generated on " + datetime.now().strftime("%B %d, %Y")
+    footer_text = "Resume Analytics Platform | Generated on " + generated_at.strftime("%B %d, %Y")
     story.append(Paragraph(footer_text, styles['Normal']))
     
     # Build PDF
@@ -164,34 +199,20 @@ def generate_analysis_report(analysis_data, resume_filename):
     return buffer
 
 
+def render_analysis_report(analysis_data, resume_filename, generated_at=None):
+    """generate_analysis_report as bytes; a module-level entry point for worker processes."""
+    return generate_analysis_report(analysis_data, resume_filename, generated_at).getvalue()
+
+
 def generate_comparison_report(resume1_data, resume2_data, resume1_name, resume2_name):
     """Generate a PDF report comparing two resumes."""
     
     buffer = BytesIO()
     doc = SimpleDocTemplate(buffer, pagesize=letter, topMargin=0.5*inch, bottomMargin=0.5*inch)
-    styles = getSampleStyleSheet()
     story = []
     
-    title_style = ParagraphStyle(
-        'CustomTitle',
-        parent=styles['Heading1'],
-        fontSize=22,
-        textColor=colors.HexColor('#1e40af'),
-        spaceAfter=6,
-        alignment=TA_CENTER,
-    )
-    
-    heading_style = ParagraphStyle(
-        'CustomHeading',
-        parent=styles['Heading2'],
-        fontSize=14,
-        textColor=colors.HexColor('#1e40af'),
-        spaceAfter=12,
-        spaceBefore=12,
-    )
-    
     # Title
-    story.append(Paragraph("Resume Comparison Report", title_style))
+    story.append(Paragraph("Resume Comparison Report", comparison_title_style))
     story.append(Spacer(1, 0.2*inch))
     
     # Comparison metrics
@@ -206,17 +227,7 @@ def generate_comparison_report(resume1_data, resume2_data, resume1_name, resume2
     ]
     
     comparison_table = Table(comparison_data, colWidths=[2*inch, 2*inch, 2*inch])
-    comparison_table.setStyle(TableStyle([
-        ('BACKGROUND', (0, 0), (-1, 0), colors.HexColor('#1e40af')),
-        ('TEXTCOLOR', (0, 0), (-1, 0), colors.whitesmoke),
-        ('ALIGN', (0, 0), (-1, -1), 'CENTER'),
-        ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
-        ('FONTSIZE', (0, 0), (-1, 0), 10),
-        ('BOTTOMPADDING', (0, 0), (-1, 0), 12),
-        ('BACKGROUND', (0, 1), (-1, -1), colors.beige),
-        ('GRID', (0, 0), (-1, -1), 1, colors.HexColor('#d1d5db')),
-        ('FONT', (0, 1), (-1, -1), 'Helvetica', 9),
-    ]))
+    comparison_table.setStyle(comparison_table_style)
     story.append(comparison_table)
     story.append(Spacer(1, 0.3*inch))
     
@@ -259,3 +270,7 @@ def generate_comparison_report(resume1_data, resume2_data, resume1_name, resume2
     doc.build(story)
     buffer.seek(0)
     return buffer
+
+
+# Cached reports are keyed by this, so any change to this module re-renders them
+REPORT_VERSION = hashlib.sha256(inspect.getsource(sys.modules[__name__]).encode()).hexdigest()[:16]
@@ -0,0 +1,71 @@
+"""
+Request latency by endpoint group.
+
+/register and /login are dominated by bcrypt, so they are timed as their own
+group and cannot hide or inflate the latency of the rest of the API. The
+middleware is plain ASGI, so streamed responses pass through untouched and
+are timed until their last body chunk is sent.
+"""
+import threading
+import time
+from collections import deque
+
+LATENCY_SAMPLES = 2048
+AUTH_PATHS = {"/register", "/login"}
+
+def endpoint_group(path):
+    return "auth" if path in AUTH_PATHS else "api"
+
+class LatencyStats:
+    """Request count, total and max per group, with percentiles over the most recent samples."""
+
+    def __init__(self, samples=LATENCY_SAMPLES):
+        self.samples = samples
+        self._groups = {}
+        self._lock = threading.Lock()
+
+    def record(self, group, seconds):
+        with self._lock:
+            stats = self._groups.get(group)
+            if stats is None:
+                stats = self._groups[group] = {"count": 0, "total": 0.0, "max": 0.0, "recent": deque(maxlen=self.samples)}
+            stats["count"] += 1
+            stats["total"] += seconds
+            stats["max"] = max(stats["max"], seconds)
+            stats["recent"].append(seconds)
+
+    def snapshot(self):
+        with self._lock:
+            groups = {name: (stats["count"], stats["total"], stats["max"], sorted(stats["recent"])) for name, stats in self._groups.items()}
+
+        def percentile(values, q):
+            return values[min(len(values) - 1, int(q * len(values)))] * 1000 if values else 0.0
+
+        return {
+            name: {
+                "requests": count,
+                "avg_ms": round(total / count * 1000, 3) if count else 0.0,
+                "max_ms": round(maximum * 1000, 3),
+                "p50_ms": round(percentile(recent, 0.5), 3),
+                "p95_ms": round(percentile(recent, 0.95), 3),
+                "p99_ms": round(percentile(recent, 0.99), 3)
+            }
+            for name, (count, total, maximum, recent) in groups.items()
+        }
+
+latency_stats = LatencyStats()
+
+class LatencyMiddleware:
+    def __init__(self, app, stats=latency_stats):
+        self.app = app
+        self.stats = stats
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        started = time.perf_counter()
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            self.stats.record(endpoint_group(scope["path"]), time.perf_counter() - started)
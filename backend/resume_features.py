@@ -0,0 +1,73 @@
+"""
+Per-resume features computed once at upload and stored on the Resume row.
+
+Scoring endpoints build analyze_resume input from these columns instead of
+re-running skill extraction over the full text on every request. Uploads
+compute them in the parse worker (parse_pool), next to the parse itself, so
+the vectorizer does not run on the event loop.
+"""
+import json
+
+from analytics_engine import extract_ats_features
+from resume_parser import extract_skills, extract_email, extract_phone
+from skill_bitmask import mask_to_words, skills_to_mask
+from text_similarity import serialize_vector, term_vector
+
+def resume_feature_values(parsed_data):
+    """Resume column values for the scoring features of a parse_resume result."""
+    values = {
+        "skills": json.dumps(parsed_data["skills"]),
+        "word_count": parsed_data["word_count"],
+        "has_email": parsed_data["email"] is not None,
+        "has_phone": parsed_data["phone"] is not None,
+        "ats_features": json.dumps(extract_ats_features(parsed_data["raw_text"])),
+        "text_vector": serialize_vector(term_vector(parsed_data["cleaned_text"]))
+    }
+    for index, word in enumerate(mask_to_words(skills_to_mask(parsed_data["skills"]))):
+        values[f"skill_mask_{index}"] = word
+    return values
+
+def apply_resume_features(resume, parsed_data):
+    """
+    Copy the scoring features of a parse_resume result onto a Resume row,
+    using the values the parse worker computed when they are present.
+    """
+    features = parsed_data.get("features") or resume_feature_values(parsed_data)
+    for name, value in features.items():
+        setattr(resume, name, value)
+
+def stored_text_features(resume):
+    """Feature column values of an older row, computed from its stored text."""
+    raw_text = resume.original_text or ""
+    cleaned_text = resume.cleaned_text or ""
+    return resume_feature_values({
+        "raw_text": raw_text,
+        "cleaned_text": cleaned_text,
+        "skills": extract_skills(raw_text),
+        "email": extract_email(raw_text),
+        "phone": extract_phone(raw_text),
+        "word_count": len(cleaned_text.split())
+    })
+
+def compute_resume_features(resume):
+    """Fill the feature columns of an older row from its stored text."""
+    apply_resume_features(resume, {"features": stored_text_features(resume)})
+
+def resume_extracted_data(resume):
+    """
+    Return analyze_resume input for a Resume, computing features for rows not
+    yet backfilled. The row itself is left untouched: read endpoints commit
+    their own writes (e.g. /analyze), and a vector stored that way would never
+    be counted in the document frequencies. Run backfill_resume_features to
+    store them.
+    """
+    if resume.skills is None or resume.ats_features is None or resume.word_count is None:
+        features = stored_text_features(resume)
+    else:
+        features = {"skills": resume.skills, "word_count": resume.word_count, "ats_features": resume.ats_features}
+
+    return {
+        "skills": json.loads(features["skills"]),
+        "word_count": features["word_count"],
+        "ats_features": json.loads(features["ats_features"])
+    }
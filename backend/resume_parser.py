@@ -1,7 +1,19 @@
 import pdfplumber
 from docx import Document
+from pdfminer.pdfpage import PDFPage
+from pdfplumber.page import Page
+import hashlib
+import io
+import itertools
+import json
+import os
 import re
 import string
+import time
+
+# Upper bounds on how much of a document is read; long portfolios are cut off
+PDF_MAX_PAGES = int(os.getenv("PDF_MAX_PAGES", "50"))
+MAX_TEXT_CHARS = int(os.getenv("MAX_TEXT_CHARS", "200000"))
 
 SKILL_DICTIONARY = {
     "technical": [
@@ -46,50 +58,170 @@ SKILL_DICTIONARY = {
     ]
 }
 
-def extract_text_from_pdf(file_path):
-    text = ""
+# Bump when parsing logic changes; dictionary and cap changes are picked up automatically
+PARSER_REVISION = 1
+
+def _parser_version():
+    fingerprint = json.dumps([PARSER_REVISION, SKILL_DICTIONARY, PDF_MAX_PAGES, MAX_TEXT_CHARS], sort_keys=True)
+    return hashlib.sha256(fingerprint.encode()).hexdigest()[:16]
+
+PARSER_VERSION = _parser_version()
+
+def iter_pdf_pages(file_path, max_pages=PDF_MAX_PAGES, max_chars=MAX_TEXT_CHARS):
+    """
+    Yield the text of a PDF one page at a time.
+
+    Stops once max_pages pages or max_chars characters have been read, and
+    releases each page's cached layout objects as soon as its text is taken.
+    Pages are taken from the page tree one at a time rather than through
+    pdf.pages, which builds every page of the file before any filtering, so
+    pages past the cap are never loaded. PDF.close() goes through pdf.pages
+    as well, so the PDF is not closed; only the file under it is.
+    """
+    remaining = max_chars
+    opened = None
     try:
-        with pdfplumber.open(file_path) as pdf:
-            for page in pdf.pages:
-                text += page.extract_text() + "\n"
+        if isinstance(file_path, (str, os.PathLike)):
+            opened = open(file_path, "rb")
+        pdf = pdfplumber.PDF(opened or file_path)
+        doctop = 0
+        page_objs = itertools.islice(PDFPage.create_pages(pdf.doc), max_pages)
+        for page_number, page_obj in enumerate(page_objs, start=1):
+            if remaining <= 0:
+                break
+            page = Page(pdf, page_obj, page_number=page_number, initial_doctop=doctop)
+            doctop += page.height
+            # Image-only pages have no text layer and return None
+            page_text = (page.extract_text() or "")[:remaining] + "\n"
+            page.close()
+            remaining -= len(page_text)
+            yield page_text
     except Exception as e:
         raise ValueError(f"Error reading PDF: {str(e)}")
-    return text
+    finally:
+        if opened is not None:
+            opened.close()
 
-def extract_text_from_docx(file_path):
-    text = ""
+def iter_docx_paragraphs(file_path, max_chars=MAX_TEXT_CHARS):
+    """Yield the text of a DOCX one paragraph at a time, up to max_chars."""
+    remaining = max_chars
     try:
         doc = Document(file_path)
         for paragraph in doc.paragraphs:
-            text += paragraph.text + "\n"
+            if remaining <= 0:
+                break
+            paragraph_text = paragraph.text[:remaining] + "\n"
+            remaining -= len(paragraph_text)
+            yield paragraph_text
     except Exception as e:
         raise ValueError(f"Error reading DOCX: {str(e)}")
-    return text
 
-def extract_text(file_path, file_type):
+def iter_text(file_path, file_type):
     if file_type == "pdf":
-        return extract_text_from_pdf(file_path)
+        return iter_pdf_pages(file_path)
     elif file_type == "docx":
-        return extract_text_from_docx(file_path)
+        return iter_docx_paragraphs(file_path)
     else:
         raise ValueError("Unsupported file type. Use PDF or DOCX.")
 
+def extract_text_from_pdf(file_path):
+    return "".join(iter_pdf_pages(file_path))
+
+def extract_text_from_docx(file_path):
+    return "".join(iter_docx_paragraphs(file_path))
+
+def extract_text(file_path, file_type):
+    return "".join(iter_text(file_path, file_type))
+
 def clean_text(text):
     text = re.sub(r'\s+', ' ', text)
     text = text.lower()
     return text.strip()
 
-def extract_skills(text):
+def _trie_pattern(words):
+    """Build a regex alternation factored by common prefixes, so the engine
+    branches once per character instead of retrying every word in turn."""
+    trie = {}
+    for word in words:
+        node = trie
+        for char in word:
+            node = node.setdefault(char, {})
+        node[""] = True
+
+    def render(node):
+        terminal = "" in node
+        branches = [re.escape(char) + render(child) for char, child in sorted(node.items()) if char]
+        if not branches:
+            return ""
+        body = branches[0] if len(branches) == 1 and not terminal else "(?:" + "|".join(branches) + ")"
+        # Longer skills are tried first; the bare prefix only matches if they fail
+        return body + "?" if terminal else body
+
+    return render(trie)
+
+def _build_skill_matcher(skill_dictionary):
+    """
+    Compile the skill dictionary into a single-pass matcher.
+
+    All skills share one prefix-factored alternation inside a lookahead, so
+    overlapping matches ("react", "react native") are visited in one scan.
+    The regex reports the longest skill at each position; shorter skills at
+    the same position are prefixes of it and only need a boundary check.
+    """
+    skills = {skill for category_skills in skill_dictionary.values() for skill in category_skills}
+    pattern = re.compile(r'\b(?=(' + _trie_pattern(skills) + r')\b)')
+
+    prefixes = {
+        skill: [other for other in skills if other != skill and skill.startswith(other)]
+        for skill in skills
+    }
+
+    return pattern, prefixes
+
+# Built once at import so every request reuses the compiled matcher
+SKILL_PATTERN, SKILL_PREFIXES = _build_skill_matcher(SKILL_DICTIONARY)
+WORD_CHAR = re.compile(r'\w')
+
+def _is_word_boundary(text, pos):
+    before = pos > 0 and WORD_CHAR.match(text[pos - 1]) is not None
+    after = pos < len(text) and WORD_CHAR.match(text[pos]) is not None
+    return before != after
+
+def extract_skill_matches(text):
+    """Return {skill: [(start, end), ...]} for every skill occurrence in text."""
     text_lower = text.lower()
-    found_skills = {"technical": [], "business": [], "soft_skills": []}
-    
+    matches = {}
+
+    for match in SKILL_PATTERN.finditer(text_lower):
+        start = match.start()
+        skill = match.group(1)
+        matches.setdefault(skill, []).append((start, start + len(skill)))
+
+        for prefix in SKILL_PREFIXES[skill]:
+            end = start + len(prefix)
+            if _is_word_boundary(text_lower, end):
+                matches.setdefault(prefix, []).append((start, end))
+
+    return matches
+
+def extract_skill_counts(text):
+    """Return {skill: occurrence_count} for every skill found in text."""
+    return {skill: len(offsets) for skill, offsets in extract_skill_matches(text).items()}
+
+def skills_from_matches(matches):
+    """Group matched skill names by category, in SKILL_DICTIONARY order."""
+    found_skills = {category: [] for category in SKILL_DICTIONARY}
+
     for category, skills in SKILL_DICTIONARY.items():
         for skill in skills:
-            if re.search(r'\b' + re.escape(skill) + r'\b', text_lower):
+            if skill in matches:
                 found_skills[category].append(skill)
-    
+
     return found_skills
 
+def extract_skills(text):
+    return skills_from_matches(extract_skill_matches(text))
+
 def extract_email(text):
     email_pattern = r'[a-zA-Z0-9._%+-]+@[a-zA-Z0-9.-]+\.[a-zA-Z]{2,}'
     emails = re.findall(email_pattern, text)
@@ -101,17 +233,57 @@ def extract_phone(text):
     return phones[0] if phones else None
 
 def parse_resume(file_path, file_type):
-    raw_text = extract_text(file_path, file_type)
-    cleaned_text = clean_text(raw_text)
-    skills = extract_skills(raw_text)
-    email = extract_email(raw_text)
-    phone = extract_phone(raw_text)
-    
+    """
+    Parse a resume (path or binary file object) by consuming its text stream chunk by chunk.
+
+    The result includes "timings", seconds spent per stage, for the caller to
+    record; parsing usually runs in a worker process that keeps no metrics.
+    """
+    chunks = []
+    cleaned_chunks = []
+    found_skills = set()
+    email = None
+    phone = None
+    timings = {"extract": 0.0, "clean": 0.0, "skills": 0.0, "contacts": 0.0}
+
+    def lap(stage):
+        nonlocal mark
+        now = time.perf_counter()
+        timings[stage] += now - mark
+        mark = now
+
+    mark = time.perf_counter()
+    for chunk in iter_text(file_path, file_type):
+        lap("extract")
+        chunks.append(chunk)
+        cleaned_chunk = clean_text(chunk)
+        if cleaned_chunk:
+            cleaned_chunks.append(cleaned_chunk)
+        lap("clean")
+        found_skills.update(extract_skill_matches(chunk))
+        lap("skills")
+        if email is None:
+            email = extract_email(chunk)
+        if phone is None:
+            phone = extract_phone(chunk)
+        lap("contacts")
+    lap("extract")
+
+    raw_text = "".join(chunks)
+    cleaned_text = " ".join(cleaned_chunks)
+    skills = skills_from_matches(found_skills)
+    lap("skills")
+
     return {
         "raw_text": raw_text,
         "cleaned_text": cleaned_text,
         "skills": skills,
         "email": email,
         "phone": phone,
-        "word_count": len(cleaned_text.split())
+        "word_count": len(cleaned_text.split()),
+        "timings": timings
     }
+
+def parse_resume_bytes(data, file_type):
+    """Parse a resume held in memory, e.g. an entry read from a ZIP archive."""
+    return parse_resume(io.BytesIO(data), file_type)
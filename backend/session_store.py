@@ -0,0 +1,114 @@
+"""
+Refresh-token sessions.
+
+Only a SHA-256 digest of each refresh token is stored, so the unique index
+holds fixed 64-character keys rather than full JWTs and a leaked table cannot
+be replayed. Each user keeps at most MAX_SESSIONS_PER_USER tokens; logging in
+past the cap drops the oldest. A background sweeper deletes expired tokens
+every REFRESH_TOKEN_SWEEP_INTERVAL_SECONDS, REFRESH_TOKEN_SWEEP_BATCH rows per
+transaction so it never holds long locks on the table.
+"""
+import os
+import threading
+from datetime import datetime
+
+from sqlalchemy import delete, select
+
+from auth import token_digest
+from database import SessionLocal
+from models import RefreshToken
+
+MAX_SESSIONS_PER_USER = int(os.getenv("MAX_SESSIONS_PER_USER", "10"))
+REFRESH_TOKEN_SWEEP_INTERVAL_SECONDS = float(os.getenv("REFRESH_TOKEN_SWEEP_INTERVAL_SECONDS", "3600"))
+REFRESH_TOKEN_SWEEP_BATCH = int(os.getenv("REFRESH_TOKEN_SWEEP_BATCH", "1000"))
+
+def store_refresh_token(db, user_id, token, expires_at, max_sessions=MAX_SESSIONS_PER_USER):
+    """Add a session for user_id and drop the oldest beyond max_sessions; the caller commits."""
+    db.add(RefreshToken(user_id=user_id, token_hash=token_digest(token), expires_at=expires_at))
+    db.flush()
+    if max_sessions > 0:
+        newest = (
+            select(RefreshToken.id)
+            .where(RefreshToken.user_id == user_id)
+            .order_by(RefreshToken.id.desc())
+            .limit(max_sessions)
+        )
+        db.execute(delete(RefreshToken).where(
+            RefreshToken.user_id == user_id,
+            RefreshToken.id.not_in(newest)
+        ))
+
+def active_refresh_token(db, user_id, token):
+    """The unexpired session for token, or None."""
+    return db.query(RefreshToken).filter(
+        RefreshToken.token_hash == token_digest(token),
+        RefreshToken.user_id == user_id,
+        RefreshToken.expires_at >= datetime.utcnow()
+    ).first()
+
+def revoke_refresh_token(db, user_id, token):
+    return db.execute(delete(RefreshToken).where(
+        RefreshToken.token_hash == token_digest(token),
+        RefreshToken.user_id == user_id
+    )).rowcount
+
+def revoke_all_sessions(db, user_id):
+    """Delete every session of user_id in one statement; returns how many there were."""
+    return db.execute(delete(RefreshToken).where(RefreshToken.user_id == user_id)).rowcount
+
+def purge_expired_refresh_tokens(session_factory=SessionLocal, batch_size=REFRESH_TOKEN_SWEEP_BATCH, stop=None):
+    """Delete expired sessions batch by batch, committing each; returns the number deleted."""
+    total = 0
+    db = session_factory()
+    try:
+        while stop is None or not stop.is_set():
+            expired = (
+                select(RefreshToken.id)
+                .where(RefreshToken.expires_at < datetime.utcnow())
+                .limit(batch_size)
+            )
+            deleted = db.execute(delete(RefreshToken).where(RefreshToken.id.in_(expired))).rowcount
+            db.commit()
+            total += deleted
+            if deleted < batch_size:
+                break
+    except Exception:
+        db.rollback()
+        raise
+    finally:
+        db.close()
+    return total
+
+class RefreshTokenSweeper:
+    """Background thread running purge_expired_refresh_tokens every interval seconds."""
+
+    def __init__(self, interval=REFRESH_TOKEN_SWEEP_INTERVAL_SECONDS, batch_size=REFRESH_TOKEN_SWEEP_BATCH):
+        self.interval = interval
+        self.batch_size = batch_size
+        self._stop = threading.Event()
+        self._thread = None
+
+    def _run(self):
+        while not self._stop.is_set():
+            try:
+                deleted = purge_expired_refresh_tokens(batch_size=self.batch_size, stop=self._stop)
+                if deleted:
+                    print(f"Purged {deleted} expired refresh tokens")
+            except Exception as e:
+                print(f"Warning: Could not purge expired refresh tokens: {str(e)}")
+            self._stop.wait(self.interval)
+
+    def start(self):
+        if self._thread is not None or self.interval <= 0:
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="refresh-token-sweeper", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        thread, self._thread = self._thread, None
+        if thread is not None:
+            self._stop.set()
+            thread.join()
+
+token_sweeper = RefreshTokenSweeper()
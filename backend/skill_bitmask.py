@@ -0,0 +1,137 @@
+"""
+Fixed-width bitmask encoding of skill sets.
+
+Every known skill has a permanent integer ID (its position in SKILL_ID_ORDER).
+A skill set becomes a SKILL_MASK_BITS-bit mask stored as SKILL_MASK_WORDS signed
+BIGINT columns, so "has spark and kafka" is a bitwise AND in SQL, and overlap
+between two sets is a popcount in Python.
+"""
+from sqlalchemy import and_, or_
+
+from analytics_engine import ROLE_REQUIREMENTS
+from resume_parser import SKILL_DICTIONARY
+
+# Append-only: a skill's position is its stored bit. Never reorder or remove entries.
+SKILL_ID_ORDER = [
+    "python", "sql", "r", "java", "javascript", "typescript", "c++", "c#", "golang", "rust",
+    "kotlin", "swift", "nodejs", "node", "react", "angular", "vue", "express", "django", "flask",
+    "spring", "fastapi", "html", "css", "scss", "sass", "bootstrap", "tailwind", "material ui",
+    "excel", "power bi", "tableau", "looker", "qlik", "informatica", "aws", "azure", "gcp",
+    "google cloud", "kubernetes", "docker", "terraform", "ansible", "spark", "hadoop", "airflow",
+    "etl", "data pipeline", "kafka", "rabbitmq", "machine learning", "ml", "deep learning", "nlp",
+    "tensorflow", "pytorch", "keras", "scikit-learn", "pandas", "numpy", "matplotlib", "seaborn",
+    "plotly", "postgresql", "mysql", "mongodb", "cassandra", "elasticsearch", "redis", "dynamodb",
+    "linux", "unix", "git", "jenkins", "gitlab", "github", "bitbucket", "api", "rest", "graphql",
+    "microservices", "soap", "websockets", "testing", "unittest", "jest", "mocha", "pytest",
+    "selenium", "ci", "cd", "devops", "monitoring", "prometheus", "grafana", "datadog",
+    "design patterns", "oop", "solid", "mvc", "mvvm", "architecture", "database", "nosql", "orm",
+    "sqlalchemy", "sequelize", "security", "encryption", "authentication", "oauth", "jwt", "ssl",
+    "tls", "performance", "optimization", "scaling", "load balancing", "caching", "mobile",
+    "android", "ios", "flutter", "react native", "xamarin", "responsive design", "ui", "ux",
+    "accessibility", "seo", "webpack", "vite", "junit", "testng", "rspec", "cypress", "pupperteer",
+    "appium", "xcode", "gradle", "maven", "analytics", "business intelligence", "data analysis",
+    "statistical analysis", "reporting", "dashboard", "visualization", "kpi", "metrics",
+    "forecasting", "modeling", "ab testing", "experimental design", "requirement gathering",
+    "stakeholder management", "process improvement", "project management", "agile", "scrum", "jira",
+    "kanban", "documentation", "technical writing", "communication", "api documentation",
+    "incident response", "troubleshooting", "debugging", "root cause analysis",
+    "performance tuning", "cost optimization", "infrastructure", "compliance", "disaster recovery",
+    "leadership", "teamwork", "problem solving", "critical thinking", "time management",
+    "collaboration", "presentation", "mentoring", "strategic thinking", "customer focus",
+    "attention to detail", "analytical thinking", "adaptability", "creativity", "reliability",
+    "responsibility", "accountability", "initiative", "predictive", "data", "data warehouse",
+    "statistics", "data modeling", "mlops", "research", "publications", "dbt", "snowflake",
+    "bigquery", "ci/cd", "computer vision", "deployment", "system design", "scala", "hive",
+    "data architecture", "backup", "sql server", "oracle", "replication", "high availability",
+    "requirements", "business", "strategy", "performance optimization", "ui/ux", "data structures",
+    "algorithms", "system architecture", "qa", "test automation", "bug tracking", "manual testing",
+    "api testing", "performance testing", "mobile testing", "test strategy", "bash",
+    "infrastructure as code", "cloud design", "ec2", "s3", "auto-scaling", "cloud architecture",
+    "penetration testing", "firewalls", "network", "vulnerability assessment", "security tools",
+    "api security", "siem", "secure coding", "security architecture", "vulnerability management",
+    "risk assessment"
+]
+
+SKILL_MASK_WORDS = 4
+SKILL_MASK_BITS = SKILL_MASK_WORDS * 64
+WORD_MASK = (1 << 64) - 1
+
+SKILL_IDS = {skill: skill_id for skill_id, skill in enumerate(SKILL_ID_ORDER)}
+# The skills extract_skills can find in a resume; the rest of SKILL_IDS only occur in role requirements
+RESUME_SKILLS = frozenset(skill for skills in SKILL_DICTIONARY.values() for skill in skills)
+
+def _check_skill_ids():
+    known = {skill for skills in SKILL_DICTIONARY.values() for skill in skills}
+    for levels in ROLE_REQUIREMENTS.values():
+        for requirements in levels.values():
+            known.update(requirements["required_skills"])
+            known.update(requirements["preferred_skills"])
+
+    missing = sorted(known - SKILL_IDS.keys())
+    if missing:
+        raise RuntimeError(f"Skills without a bitmask ID, append them to SKILL_ID_ORDER: {missing}")
+    if len(SKILL_ID_ORDER) > SKILL_MASK_BITS:
+        raise RuntimeError("SKILL_ID_ORDER no longer fits the skill mask; add a skill_mask column")
+
+_check_skill_ids()
+
+def skills_to_mask(skills):
+    """Encode skill names, or an extracted-skills dict of lists, as an int bitmask."""
+    if isinstance(skills, dict):
+        skills = [skill for category in skills.values() for skill in category]
+
+    mask = 0
+    for skill in skills:
+        skill_id = SKILL_IDS.get(skill)
+        if skill_id is not None:
+            mask |= 1 << skill_id
+    return mask
+
+def mask_to_skills(mask):
+    return [skill for skill_id, skill in enumerate(SKILL_ID_ORDER) if mask >> skill_id & 1]
+
+def mask_to_words(mask):
+    """Split a mask into signed 64-bit words, the form BIGINT columns can hold."""
+    words = []
+    for index in range(SKILL_MASK_WORDS):
+        word = (mask >> (64 * index)) & WORD_MASK
+        words.append(word - (1 << 64) if word >= 1 << 63 else word)
+    return words
+
+def words_to_mask(words):
+    mask = 0
+    for index, word in enumerate(words):
+        mask |= ((word or 0) & WORD_MASK) << (64 * index)
+    return mask
+
+def skill_overlap(mask_a, mask_b):
+    return (mask_a & mask_b).bit_count()
+
+def mask_columns(model):
+    return [getattr(model, f"skill_mask_{index}") for index in range(SKILL_MASK_WORDS)]
+
+def row_mask(row):
+    return words_to_mask([getattr(row, f"skill_mask_{index}") for index in range(SKILL_MASK_WORDS)])
+
+def apply_skill_mask(row, skills):
+    """Store the mask of skills on a Resume or Analysis row."""
+    for index, word in enumerate(mask_to_words(skills_to_mask(skills))):
+        setattr(row, f"skill_mask_{index}", word)
+
+def skill_mask_filter(model, mask, match_all=True):
+    """
+    SQL condition on model's mask columns: rows having every skill in mask
+    (match_all) or at least one of them.
+    """
+    conditions = []
+    for column, word in zip(mask_columns(model), mask_to_words(mask)):
+        if word == 0:
+            continue
+        if match_all:
+            conditions.append(column.op("&")(word) == word)
+        else:
+            conditions.append(column.op("&")(word) != 0)
+
+    if not conditions:
+        return None
+    return and_(*conditions) if match_all else or_(*conditions)
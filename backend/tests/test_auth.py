@@ -0,0 +1,35 @@
+import pytest
+from fastapi.testclient import TestClient
+
+import auth
+from main import app, get_db
+
+class NoUsers:
+    """Session stand-in for /register: no email is taken yet."""
+
+    def query(self, *entities):
+        return self
+
+    def filter(self, *conditions):
+        return self
+
+    def first(self):
+        return None
+
+@pytest.fixture
+def client():
+    app.dependency_overrides[get_db] = lambda: NoUsers()
+    yield TestClient(app)
+    app.dependency_overrides.clear()
+
+def test_busy_password_hasher_answers_503(client, monkeypatch):
+    monkeypatch.setattr(auth, "_hash_slots_in_use", auth.PASSWORD_HASH_SLOTS)
+    responses = [
+        client.post("/register", json={"email": "busy@example.com", "password": "Passw0rdX"})
+        for _ in range(2)
+    ]
+    for response in responses:
+        assert response.status_code == 503
+        assert response.headers["Retry-After"] == "1"
+    # Turned away without taking a slot
+    assert auth.password_hasher_stats()["in_use"] == auth.PASSWORD_HASH_SLOTS
@@ -0,0 +1,40 @@
+import pytest
+from fastapi.testclient import TestClient
+
+import main
+from main import app, get_current_user_id, get_db
+from rate_limit import MemoryBackend, RateLimiter
+
+def pdf_files(count):
+    return [("files", (f"resume_{index}.pdf", b"%PDF-1.4", "application/pdf")) for index in range(count)]
+
+@pytest.fixture
+def client(monkeypatch):
+    monkeypatch.setattr(main, "batch_upload_limiter", RateLimiter("batch_upload", 3, 60, store=MemoryBackend()))
+
+    async def ingest_batch(db, user_id, files):
+        return [{"filename": file.filename, "status": "uploaded"} for file in files], False
+
+    # The limit is checked before anything is parsed or stored
+    monkeypatch.setattr(main, "ingest_batch", ingest_batch)
+    app.dependency_overrides[get_current_user_id] = lambda: 1
+    app.dependency_overrides[get_db] = lambda: None
+    yield TestClient(app)
+    app.dependency_overrides.clear()
+
+def test_batch_larger_than_the_window_is_rejected_with_its_maximum(client):
+    response = client.post("/upload/batch", files=pdf_files(4))
+    assert response.status_code == 413
+    assert response.json()["detail"] == "A batch may hold at most 3 files"
+
+def test_batches_are_charged_per_file(client):
+    response = client.post("/upload/batch", files=pdf_files(2))
+    assert response.status_code == 200
+    assert response.json()["uploaded"] == 2
+    # One file left in the window
+    response = client.post("/upload/batch", files=pdf_files(2))
+    assert response.status_code == 429
+    assert "Retry-After" in response.headers
+
+def test_default_batch_budget_fits_a_full_batch():
+    assert main.batch_upload_limiter.limit >= main.BATCH_MAX_FILES
@@ -0,0 +1,58 @@
+import time
+
+import pytest
+
+import job_queue
+
+@pytest.fixture
+def queue(tmp_path, monkeypatch):
+    monkeypatch.setattr(job_queue, "JOB_QUEUE_PATH", str(tmp_path / "jobs.sqlite"))
+    monkeypatch.setattr(job_queue, "_initialized", False)
+    monkeypatch.setattr(job_queue, "JOB_LEASE_SECONDS", 0.2)
+    monkeypatch.setattr(job_queue, "JOB_RETRY_BASE_SECONDS", 0.1)
+    monkeypatch.setattr(job_queue, "_handlers", {})
+    yield job_queue
+
+def test_expired_lease_is_reclaimed_and_stale_owner_ignored(queue):
+    queue.register_handler("echo", lambda payload: payload)
+    job_id = queue.enqueue("echo", {"value": 1})
+
+    first = queue.claim_job()
+    assert first["id"] == job_id
+    assert queue.claim_job() is None
+    # The first worker dies without renewing its lease
+    time.sleep(0.3)
+    second = queue.claim_job()
+    assert second["id"] == job_id
+    assert second["lease_owner"] != first["lease_owner"]
+
+    queue.run_job(second)
+    assert not queue._finish(job_id, first["lease_owner"], queue.FAILED, error="too late")
+    job = queue.get_job(job_id)
+    assert job["status"] == queue.SUCCEEDED
+    assert job["attempts"] == 2
+    assert job["result"] == {"value": 1}
+
+def test_failed_job_is_retried_after_backoff(queue):
+    calls = []
+
+    def flaky(payload):
+        calls.append(payload)
+        if len(calls) == 1:
+            raise RuntimeError("transient")
+        return "done"
+
+    queue.register_handler("flaky", flaky)
+    job_id = queue.enqueue("flaky", {})
+
+    queue.run_job(queue.claim_job())
+    job = queue.get_job(job_id)
+    assert job["status"] == queue.QUEUED
+    assert job["error"] == "transient"
+    assert queue.claim_job() is None
+
+    time.sleep(0.15)
+    queue.run_job(queue.claim_job())
+    job = queue.get_job(job_id)
+    assert job["status"] == queue.SUCCEEDED
+    assert job["attempts"] == 2
@@ -0,0 +1,74 @@
+import asyncio
+import os
+import signal
+import time
+
+import pytest
+
+import parse_pool
+
+def hang():
+    time.sleep(3600)
+
+def hang_uninterruptibly():
+    # Stands in for C code that never returns to the interpreter
+    signal.pthread_sigmask(signal.SIG_BLOCK, {signal.SIGALRM})
+    time.sleep(3600)
+
+def slow_pid():
+    time.sleep(2)
+    return os.getpid()
+
+@pytest.fixture
+def single_worker_pool(monkeypatch):
+    monkeypatch.setattr(parse_pool, "PARSE_POOL_SIZE", 1)
+    parse_pool.shutdown_executor()
+    yield
+    parse_pool.shutdown_executor(wait=False)
+
+def test_timed_out_task_frees_its_worker(single_worker_pool):
+    async def scenario():
+        worker_pid = await parse_pool.run_in_pool(os.getpid, timeout=30)
+        with pytest.raises(asyncio.TimeoutError):
+            await parse_pool.run_in_pool(hang, timeout=0.5)
+        started = time.perf_counter()
+        pid = await parse_pool.run_in_pool(os.getpid, timeout=5)
+        return worker_pid, pid, time.perf_counter() - started
+
+    worker_pid, pid, elapsed = asyncio.run(scenario())
+    # Same worker, reclaimed instead of sleeping for an hour
+    assert pid == worker_pid
+    assert elapsed < 2
+
+def test_uninterruptible_task_is_killed_and_pool_replaced(single_worker_pool, monkeypatch):
+    monkeypatch.setattr(parse_pool, "PARSE_KILL_GRACE_SECONDS", 0.5)
+
+    async def scenario():
+        worker_pid = await parse_pool.run_in_pool(os.getpid, timeout=30)
+        with pytest.raises(asyncio.TimeoutError):
+            await parse_pool.run_in_pool(hang_uninterruptibly, timeout=0.5)
+        # Give faulthandler time to exit the worker
+        await asyncio.sleep(1.5)
+        pid = await parse_pool.run_in_pool(os.getpid, timeout=30)
+        return worker_pid, pid
+
+    worker_pid, pid = asyncio.run(scenario())
+    assert pid != worker_pid
+
+def test_tasks_in_a_killed_pool_are_retried(monkeypatch):
+    monkeypatch.setattr(parse_pool, "PARSE_POOL_SIZE", 2)
+    monkeypatch.setattr(parse_pool, "PARSE_KILL_GRACE_SECONDS", 0.5)
+    parse_pool.shutdown_executor()
+
+    async def scenario():
+        stuck = asyncio.ensure_future(parse_pool.run_in_pool(hang_uninterruptibly, timeout=0.5))
+        # Runs next to the stuck task when faulthandler takes the pool down
+        innocent = asyncio.ensure_future(parse_pool.run_in_pool(slow_pid, timeout=30))
+        with pytest.raises(asyncio.TimeoutError):
+            await stuck
+        return await innocent
+
+    try:
+        assert asyncio.run(scenario()) > 0
+    finally:
+        parse_pool.shutdown_executor(wait=False)
@@ -0,0 +1,60 @@
+import json
+from datetime import datetime
+from types import SimpleNamespace
+
+import pytest
+
+import report_cache
+
+def make_analysis(**fields):
+    values = {
+        "id": 7,
+        "overall_score": 72.5,
+        "skill_match_score": 60.0,
+        "ats_score": 80.0,
+        "extracted_skills": json.dumps({"technical": ["python"]}),
+        "missing_skills": json.dumps(["sql"]),
+        "role": "data_analyst",
+        "level": "fresher",
+        "created_at": datetime(2024, 1, 1, 12, 0),
+        **fields
+    }
+    return SimpleNamespace(**values)
+
+RESUME = SimpleNamespace(filename="resume.pdf", skills="[]", word_count=420, ats_features="{}")
+
+@pytest.fixture
+def cache(tmp_path, monkeypatch):
+    monkeypatch.setattr(report_cache, "REPORT_CACHE_DIR", str(tmp_path))
+    report_cache._report_cache.clear()
+    yield report_cache
+    report_cache._report_cache.clear()
+
+def cached_pdf(cache, analysis, renders):
+    def render():
+        renders.append(analysis)
+        return f"pdf {len(renders)}".encode()
+    return cache.cached_report(cache.report_key(analysis, RESUME), render)
+
+def test_unchanged_report_is_rendered_once(cache):
+    renders = []
+    first = cached_pdf(cache, make_analysis(), renders)
+    # Memory tier, then disk tier after a restart
+    assert cached_pdf(cache, make_analysis(), renders) == first
+    cache._report_cache.clear()
+    assert cached_pdf(cache, make_analysis(), renders) == first
+    assert len(renders) == 1
+
+@pytest.mark.parametrize("change", [
+    {"overall_score": 90.0},
+    {"missing_skills": json.dumps([])},
+    # A restored database reusing the analysis ID
+    {"created_at": datetime(2024, 2, 1, 9, 30)},
+])
+def test_changed_content_gets_a_new_report(cache, change):
+    renders = []
+    etag, _ = cached_pdf(cache, make_analysis(), renders)
+    cache._report_cache.clear()
+    new_etag, _ = cached_pdf(cache, make_analysis(**change), renders)
+    assert len(renders) == 2
+    assert new_etag != etag
@@ -0,0 +1,25 @@
+import pytest
+from fastapi.testclient import TestClient
+
+from main import app, get_current_user_id, get_db
+from skill_bitmask import RESUME_SKILLS, SKILL_IDS
+
+ROLE_ONLY_SKILLS = sorted(SKILL_IDS.keys() - RESUME_SKILLS)
+
+@pytest.fixture
+def client():
+    # Skill validation happens before any query, so no database is needed
+    app.dependency_overrides[get_current_user_id] = lambda: 1
+    app.dependency_overrides[get_db] = lambda: None
+    yield TestClient(app)
+    app.dependency_overrides.clear()
+
+def test_role_requirement_only_skill_is_rejected(client):
+    skill = ROLE_ONLY_SKILLS[0]
+    response = client.get("/resumes/search", params={"skills": f"python,{skill}"})
+    assert response.status_code == 400
+    assert response.json()["detail"] == f"Unknown skills: {skill}"
+
+def test_unknown_skill_is_rejected(client):
+    response = client.get("/resumes/search", params={"skills": "cobol-on-cogs"})
+    assert response.status_code == 400
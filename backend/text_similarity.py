@@ -0,0 +1,118 @@
+"""
+TF-IDF text similarity between job descriptions and stored resumes.
+
+Terms are hashed into a fixed feature space, so the vectorizer never needs
+fitting and a resume's term-frequency vector is computed once at upload and
+stored as a compact sparse blob. Document frequencies are counted
+incrementally as resume rows are committed, and IDF weights are applied at query time,
+so stored vectors never go stale. Scoring a job description against a whole
+portfolio is a single sparse matrix product.
+
+The counts live in process memory, seeded from the stored vectors at startup.
+Each worker process only sees the uploads it committed itself until it
+restarts, and vectors written by backfill_resume_features are picked up on
+the next restart as well.
+"""
+import threading
+
+import numpy as np
+import scipy.sparse as sp
+from sklearn.feature_extraction.text import HashingVectorizer
+from sklearn.preprocessing import normalize
+
+from models import Resume
+
+N_FEATURES = 2 ** 18
+LOAD_BATCH_SIZE = 1000
+
+_hasher = HashingVectorizer(
+    n_features=N_FEATURES,
+    ngram_range=(1, 2),
+    stop_words="english",
+    alternate_sign=False,
+    norm=None
+)
+
+def term_vector(text):
+    """Sublinear term-frequency vector (1 x N_FEATURES CSR) of a text."""
+    vector = _hasher.transform([text or ""]).astype(np.float32)
+    np.log(vector.data, out=vector.data)
+    vector.data += 1
+    return vector
+
+def serialize_vector(vector):
+    """Pack a 1-row sparse vector as int32 indices followed by float32 values."""
+    vector = vector.tocsr()
+    return (
+        np.int32(vector.nnz).tobytes() +
+        vector.indices.astype(np.int32).tobytes() +
+        vector.data.astype(np.float32).tobytes()
+    )
+
+def deserialize_vector(blob):
+    nnz = int(np.frombuffer(blob, dtype=np.int32, count=1)[0])
+    indices = np.frombuffer(blob, dtype=np.int32, count=nnz, offset=4)
+    data = np.frombuffer(blob, dtype=np.float32, count=nnz, offset=4 + 4 * nnz)
+    return sp.csr_matrix((data, indices, np.array([0, nnz])), shape=(1, N_FEATURES))
+
+class DocumentFrequencies:
+    """Running document-frequency counts over the hashed feature space."""
+
+    def __init__(self):
+        self.counts = np.zeros(N_FEATURES, dtype=np.int64)
+        self.documents = 0
+        self._lock = threading.Lock()
+
+    def add(self, vector):
+        with self._lock:
+            self.counts[vector.indices] += 1
+            self.documents += 1
+
+    def reset(self):
+        with self._lock:
+            self.counts[:] = 0
+            self.documents = 0
+
+    def idf(self):
+        """Smoothed IDF, matching TfidfVectorizer(smooth_idf=True)."""
+        with self._lock:
+            return np.log((1 + self.documents) / (1 + self.counts)) + 1
+
+document_frequencies = DocumentFrequencies()
+
+def load_document_frequencies(db):
+    """Seed the document-frequency counts from every stored resume vector."""
+    document_frequencies.reset()
+    rows = db.query(Resume.text_vector).filter(Resume.text_vector.isnot(None)).yield_per(LOAD_BATCH_SIZE)
+    for (blob,) in rows:
+        document_frequencies.add(deserialize_vector(blob))
+
+def count_documents(text_vectors):
+    """
+    Add the stored vectors of newly committed resumes to the document
+    frequencies. Call only after the commit succeeded, so rolled-back rows are
+    never counted.
+    """
+    for blob in text_vectors:
+        if blob is not None:
+            document_frequencies.add(deserialize_vector(blob))
+
+def resume_term_vector(resume):
+    """
+    Stored vector of a Resume, computed from its text for rows that predate
+    vectors. The computed vector is not written back to the row, since it is
+    not counted in the document frequencies.
+    """
+    if resume.text_vector is None:
+        return term_vector(resume.cleaned_text)
+    return deserialize_vector(resume.text_vector)
+
+def similarity_scores(text, resume_vectors):
+    """Cosine similarity (0-100) of text against each resume vector, in one sparse product."""
+    if not resume_vectors:
+        return np.zeros(0)
+
+    idf = sp.diags(document_frequencies.idf().astype(np.float32))
+    resumes = normalize(sp.vstack(resume_vectors, format="csr") @ idf)
+    query = normalize(term_vector(text) @ idf)
+    return (resumes @ query.T).toarray().ravel() * 100
@@ -0,0 +1,195 @@
+"""
+Upload intake: size limits, file type sniffing and optional original storage.
+
+UploadLimitMiddleware enforces the body size of upload routes while the
+request streams in. It first checks a declared Content-Length, then counts
+bytes as they arrive, and answers 413 as soon as a limit is crossed, before
+the multipart parser spools the rest.
+
+spool_upload reads an upload once while hashing it. Files up to
+UPLOAD_SPOOL_BYTES stay in memory and are parsed from bytes. Larger ones go to
+a temporary file, which close() removes once parsing is done. The first
+chunk is checked against the PDF/DOCX signature, so a mislabelled file is
+rejected before a parser starts.
+
+Uploads are not written to disk otherwise. With KEEP_UPLOADS=1 the originals
+are kept under UPLOAD_DIR named by their SHA-256, so identical files are
+stored once and uploads never overwrite each other.
+"""
+import hashlib
+import io
+import os
+import tempfile
+
+from fastapi import HTTPException
+
+MAX_UPLOAD_BYTES = int(os.getenv("MAX_UPLOAD_BYTES", str(10 * 1024 * 1024)))
+MAX_BATCH_UPLOAD_BYTES = int(os.getenv("MAX_BATCH_UPLOAD_BYTES", str(100 * 1024 * 1024)))
+UPLOAD_SPOOL_BYTES = int(os.getenv("UPLOAD_SPOOL_BYTES", str(1024 * 1024)))
+KEEP_UPLOADS = os.getenv("KEEP_UPLOADS", "0") == "1"
+UPLOAD_DIR = os.getenv("UPLOAD_DIR", "uploads")
+# Room for multipart boundaries and part headers around a single file
+MULTIPART_OVERHEAD_BYTES = 64 * 1024
+READ_CHUNK_SIZE = 64 * 1024
+
+FILE_SIGNATURES = {
+    "pdf": b"%PDF-",
+    # DOCX is a ZIP package
+    "docx": b"PK\x03\x04"
+}
+# Readers accept a PDF header anywhere in the first KB
+PDF_HEADER_WINDOW = 1024
+
+def size_limit_message(limit):
+    return f"File exceeds {limit // (1024 * 1024)} MB limit"
+
+class UploadTooLarge(HTTPException):
+    def __init__(self, limit):
+        super().__init__(status_code=413, detail=size_limit_message(limit))
+
+def matches_signature(head, file_type):
+    """Whether the first bytes of a file look like file_type."""
+    signature = FILE_SIGNATURES[file_type]
+    if file_type == "pdf":
+        return signature in head[:PDF_HEADER_WINDOW]
+    return head.startswith(signature)
+
+class SpooledUpload:
+    """A hashed upload held as bytes (data) or in a temporary file (path)."""
+
+    def __init__(self, content_hash, size, data=None, path=None):
+        self.content_hash = content_hash
+        self.size = size
+        self.data = data
+        self.path = path
+
+    def close(self):
+        if self.path:
+            try:
+                os.remove(self.path)
+            except FileNotFoundError:
+                pass
+            self.path = None
+        self.data = None
+
+def spool_upload(source, file_type, max_bytes=MAX_UPLOAD_BYTES, spool_bytes=UPLOAD_SPOOL_BYTES):
+    """
+    Read a file object into a SpooledUpload. Raises ValueError if it does not
+    start like file_type, and UploadTooLarge past max_bytes.
+    """
+    digest = hashlib.sha256()
+    buffer = io.BytesIO()
+    spill = None
+    size = 0
+    try:
+        while True:
+            chunk = source.read(READ_CHUNK_SIZE)
+            if not chunk:
+                break
+            if size == 0 and not matches_signature(chunk, file_type):
+                raise ValueError(f"File content is not a valid {file_type.upper()}")
+            size += len(chunk)
+            if size > max_bytes:
+                raise UploadTooLarge(max_bytes)
+            digest.update(chunk)
+            if spill is None and size > spool_bytes:
+                spill = tempfile.NamedTemporaryFile(prefix="upload_", suffix=f".{file_type}", delete=False)
+                spill.write(buffer.getvalue())
+                buffer = None
+            (spill or buffer).write(chunk)
+    except BaseException:
+        if spill is not None:
+            spill.close()
+            os.remove(spill.name)
+        raise
+
+    if size == 0:
+        raise ValueError("File is empty")
+    if spill is None:
+        return SpooledUpload(digest.hexdigest(), size, data=buffer.getvalue())
+    spill.close()
+    return SpooledUpload(digest.hexdigest(), size, path=spill.name)
+
+def keep_original(upload, file_type, directory=UPLOAD_DIR):
+    """Store the upload as directory/<hash[:2]>/<hash>.<type> unless that file already exists."""
+    subdirectory = os.path.join(directory, upload.content_hash[:2])
+    destination = os.path.join(subdirectory, f"{upload.content_hash}.{file_type}")
+    if os.path.exists(destination):
+        return destination
+    os.makedirs(subdirectory, exist_ok=True)
+
+    # Write under a unique name and rename, so readers never see a partial file
+    fd, partial = tempfile.mkstemp(dir=subdirectory, prefix=".partial_")
+    try:
+        with os.fdopen(fd, "wb") as f:
+            if upload.data is not None:
+                f.write(upload.data)
+            else:
+                with open(upload.path, "rb") as source:
+                    while chunk := source.read(READ_CHUNK_SIZE):
+                        f.write(chunk)
+        os.replace(partial, destination)
+    except BaseException:
+        if os.path.exists(partial):
+            os.remove(partial)
+        raise
+    return destination
+
+class UploadLimitMiddleware:
+    """Reject request bodies over the limit of their path with 413 while they stream in."""
+
+    def __init__(self, app, limits=None):
+        self.app = app
+        self.limits = limits if limits is not None else {
+            "/upload": MAX_UPLOAD_BYTES + MULTIPART_OVERHEAD_BYTES,
+            "/upload/batch": MAX_BATCH_UPLOAD_BYTES
+        }
+
+    async def _reject(self, send, limit):
+        error = UploadTooLarge(limit)
+        body = f'{{"detail":"{error.detail}"}}'.encode()
+        await send({
+            "type": "http.response.start",
+            "status": 413,
+            "headers": [(b"content-type", b"application/json"), (b"content-length", str(len(body)).encode()), (b"connection", b"close")]
+        })
+        await send({"type": "http.response.body", "body": body})
+
+    async def __call__(self, scope, receive, send):
+        limit = self.limits.get(scope["path"]) if scope["type"] == "http" else None
+        if limit is None:
+            await self.app(scope, receive, send)
+            return
+
+        for name, value in scope["headers"]:
+            if name == b"content-length":
+                if value.isdigit() and int(value) > limit:
+                    await self._reject(send, limit)
+                    return
+                break
+
+        received = 0
+        response_started = False
+
+        async def limited_receive():
+            nonlocal received
+            message = await receive()
+            if message["type"] == "http.request":
+                received += len(message.get("body", b""))
+                if received > limit:
+                    raise UploadTooLarge(limit)
+            return message
+
+        async def tracking_send(message):
+            nonlocal response_started
+            if message["type"] == "http.response.start":
+                response_started = True
+            await send(message)
+
+        try:
+            await self.app(scope, limited_receive, tracking_send)
+        except UploadTooLarge:
+            # Raised outside the app's exception handling, e.g. while the body is drained
+            if response_started:
+                raise
+            await self._reject(send, limit)
@@ -34,6 +34,9 @@ export default function HistoryView() {
   const [searchQuery, setSearchQuery] = useState('')
   const [filterRole, setFilterRole] = useState('all')
   const [sortBy, setSortBy] = useState('date')
+  const [nextCursor, setNextCursor] = useState(null)
+  const [isLoadingMore, setIsLoadingMore] = useState(false)
+  const [isExporting, setIsExporting] = useState(false)
 
   useEffect(() => {
     const fetchHistory = async () => {
@@ -41,6 +44,7 @@ export default function HistoryView() {
         setIsLoading(true)
         const response = await axios.get(`${API_BASE_URL}/history`)
         setHistory(response.data.analyses || [])
+        setNextCursor(response.data.next_cursor || null)
       } catch (err) {
         setError(err.response?.data?.detail || err.message)
       } finally {
@@ -51,6 +55,21 @@ export default function HistoryView() {
     fetchHistory()
   }, [])
 
+  const loadMore = async () => {
+    try {
+      setIsLoadingMore(true)
+      const response = await axios.get(`${API_BASE_URL}/history`, {
+        params: { cursor: nextCursor }
+      })
+      setHistory((current) => [...current, ...(response.data.analyses || [])])
+      setNextCursor(response.data.next_cursor || null)
+    } catch (err) {
+      setError(err.response?.data?.detail || err.message)
+    } finally {
+      setIsLoadingMore(false)
+    }
+  }
+
   const fetchAnalysisDetail = async (analysisId) => {
     try {
       const response = await axios.get(`${API_BASE_URL}/analysis/${analysisId}`)
@@ -81,6 +100,30 @@ export default function HistoryView() {
     }
   }
 
+  const exportReports = async () => {
+    try {
+      setIsExporting(true)
+      const response = await axios.get(`${API_BASE_URL}/reports/export`, {
+        params: filterRole === 'all' ? {} : { role: filterRole },
+        responseType: 'blob'
+      })
+
+      const blob = new Blob([response.data], { type: 'application/zip' })
+      const link = document.createElement('a')
+      link.href = URL.createObjectURL(blob)
+      link.download = 'Resume_Reports.zip'
+      document.body.appendChild(link)
+      link.click()
+      document.body.removeChild(link)
+      URL.revokeObjectURL(link.href)
+    } catch (err) {
+      const errorMsg = err.response?.data?.detail || err.message || 'Unknown error'
+      alert(`Error exporting reports: ${errorMsg}`)
+    } finally {
+      setIsExporting(false)
+    }
+  }
+
   // Filter and search logic
   let filteredHistory = history.filter((analysis) => {
     const matchesSearch = 
@@ -189,7 +232,18 @@ export default function HistoryView() {
   return (
     <div className="space-y-6">
       <div className="bg-white rounded-lg shadow-lg p-8">
-        <h2 className="text-2xl font-bold text-gray-800 mb-6">Analysis History</h2>
+        <div className="flex justify-between items-center mb-6">
+          <h2 className="text-2xl font-bold text-gray-800">Analysis History</h2>
+          {history.length > 0 && (
+            <button
+              onClick={exportReports}
+              disabled={isExporting}
+              className="px-4 py-2 bg-green-600 text-white font-semibold rounded-lg hover:bg-green-700 transition disabled:opacity-50"
+            >
+              {isExporting ? 'Exporting...' : '📦 Export Reports (ZIP)'}
+            </button>
+          )}
+        </div>
 
         {error && (
           <div className="bg-red-50 border border-red-200 rounded-lg p-4 mb-6 text-red-800">
@@ -305,6 +359,18 @@ export default function HistoryView() {
                 </tbody>
               </table>
             </div>
+
+            {nextCursor && (
+              <div className="mt-6 text-center">
+                <button
+                  onClick={loadMore}
+                  disabled={isLoadingMore}
+                  className="px-4 py-2 bg-indigo-600 text-white font-semibold rounded-lg hover:bg-indigo-700 transition disabled:opacity-50"
+                >
+                  {isLoadingMore ? 'Loading...' : 'Load more'}
+                </button>
+              </div>
+            )}
           </>
         )}
       </div>